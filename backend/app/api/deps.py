@@ -4,20 +4,35 @@ API Dependencies.
 Common dependencies used across API endpoints.
 """
 
-from fastapi import Depends, HTTPException, status
+import hmac
+import logging
+import os
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from app.core import security
-from app.database import get_db
-from app.models.user import User
+from app.core import metrics, replicas, security
+from app.core.etags import NotModified, make_etag, etag_matches, etag_headers
+from app.core.user_cache import CachedUser, user_cache
+from app.crud import aio
+from app.database import get_read_db, DbSession
 from app.schemas.token import TokenData
 
+logger = logging.getLogger(__name__)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Emails of users allowed to use the admin endpoints (comma-separated)
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+
+# Bearer token a Prometheus scraper sends to read /metrics (admins' JWTs work too)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: DbSession = Depends(get_read_db)) -> CachedUser:
     """
     Dependency to get the current authenticated user from the JWT token.
+
+    Tokens carry the user id and active flag, so the user is normally served
+    from the in-process user cache without touching the database. Tokens
+    issued before those claims existed fall back to an email lookup.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -25,19 +40,98 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        # print(f"DEBUG: Validating token: {token[:10]}...")
-        payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+        payload = security.decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
-            print("DEBUG: Token missing 'sub' (email)")
+            logger.debug("Token missing 'sub' (email)")
             raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError as e:
-        print(f"DEBUG: JWT Error: {str(e)}")
+        token_data = TokenData(email=email, user_id=payload.get("uid"), is_active=payload.get("active"))
+    except security.InvalidToken as e:
+        logger.debug("JWT error: %s", e)
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == token_data.email).first()
-    if user is None:
-        print(f"DEBUG: User not found for email: {token_data.email}")
+    if token_data.is_active is False:
         raise credentials_exception
-    return user
+
+    if token_data.user_id is not None:
+        cached = user_cache.get(token_data.user_id)
+        if cached is not None:
+            _attribute_request(cached.id)
+            return cached
+        user = await aio.get_user(db, token_data.user_id)
+    else:
+        user = await aio.get_user_by_email(db, token_data.email)
+
+    if user is None or not user.is_active:
+        logger.debug("No active user for email: %s", token_data.email)
+        raise credentials_exception
+
+    current_user = CachedUser.from_model(user)
+    user_cache.put(current_user)
+    _attribute_request(current_user.id)
+    return current_user
+
+
+async def get_current_admin(current_user: CachedUser = Depends(get_current_user)) -> CachedUser:
+    """
+    Dependency for admin endpoints: the current user must be in ADMIN_EMAILS.
+    """
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+
+async def require_metrics_access(token: str = Depends(oauth2_scheme), db: DbSession = Depends(get_read_db)):
+    """
+    Dependency for /metrics: the bearer token must be METRICS_TOKEN or an
+    admin's access token.
+    """
+    if METRICS_TOKEN and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return
+    await get_current_admin(await get_current_user(token, db))
+
+
+def _attribute_request(user_id: int):
+    """
+    Record the authenticated user for the rest of the request: its metrics
+    (e.g. slow queries) and read-replica routing.
+    """
+    replicas.set_request_user(user_id)
+    stats = metrics.current_request_stats()
+    if stats is not None:
+        stats.user_id = user_id
+
+
+async def current_data_version(
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user)
+) -> int:
+    """
+    Dependency returning the current user's data version (one primary key read).
+
+    FastAPI caches it per request, so check_etag and result caching share
+    one lookup.
+    """
+    return await aio.get_data_version(db, current_user.id)
+
+
+async def check_etag(
+    request: Request,
+    response: Response,
+    data_version: int = Depends(current_data_version),
+    current_user: CachedUser = Depends(get_current_user)
+) -> str:
+    """
+    Dependency for read endpoints: answer 304 if the client's copy is current.
+
+    Looks up the user's data version and raises NotModified when
+    If-None-Match holds the matching ETag, so the endpoint's own queries
+    never run. Otherwise sets ETag on the response and returns it.
+    Endpoints that build their own Response must copy `response.headers`
+    into it.
+    """
+    etag = make_etag(current_user.id, data_version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise NotModified(etag)
+    response.headers.update(etag_headers(etag))
+    return etag
@@ -16,7 +16,7 @@ Usage in main.py:
 """
 
 from fastapi import APIRouter
-from app.routers import categories, transactions, analytics, auth
+from app.routers import categories, transactions, analytics, auth, admin
 
 # Create the v1 API router
 # All routes registered here will be prefixed with /api/v1
@@ -54,6 +54,14 @@ api_v1_router.include_router(
     tags=["Analytics"]
 )
 
+# Register admin endpoints (ADMIN_EMAILS only)
+# Final routes: /api/v1/admin/*
+api_v1_router.include_router(
+    admin.router,
+    prefix="/admin",
+    tags=["Admin"]
+)
+
 # Future routers can be added here:
 # api_v1_router.include_router(
 #     budgets.router,
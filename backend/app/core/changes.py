@@ -0,0 +1,66 @@
+"""
+Per-user data change notifications.
+
+Caches derived from a user's transactions and categories subscribe with
+on_user_data_change() and are told, after each commit, which users' data
+changed in it. Changes are collected per session:
+
+- automatically, for every flushed ORM object with a user_id column
+  (transactions, categories, rollups)
+- explicitly via mark_user_data_changed(), for Core statements that bypass
+  the unit of work (e.g. bulk inserts)
+
+Rolled back changes are discarded without notifying anyone. Before the
+commit, pending_user_data_changes() lists the users changed so far (used to
+bump users.data_version in the same transaction, see app.models.user).
+"""
+
+from typing import Callable, List, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+ChangeListener = Callable[[Set[int]], None]
+
+_listeners: List[ChangeListener] = []
+
+_SESSION_KEY = "changed_data_user_ids"
+
+
+def on_user_data_change(listener: ChangeListener) -> ChangeListener:
+    """Register a callable taking the set of user ids changed by a commit"""
+    _listeners.append(listener)
+    return listener
+
+
+def mark_user_data_changed(session: Session, user_id: int):
+    """Record a change made without ORM objects, reported at the next commit"""
+    session.info.setdefault(_SESSION_KEY, set()).add(user_id)
+
+
+def pending_user_data_changes(session: Session) -> Set[int]:
+    """User ids whose data the session's uncommitted changes touch"""
+    return session.info.get(_SESSION_KEY, set())
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_users(session, flush_context, instances):
+    changed = {
+        obj.user_id
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if getattr(obj, "user_id", None) is not None
+    }
+    if changed:
+        session.info.setdefault(_SESSION_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_changed_users(session):
+    user_ids = session.info.pop(_SESSION_KEY, None)
+    if user_ids:
+        for listener in _listeners:
+            listener(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop(_SESSION_KEY, None)
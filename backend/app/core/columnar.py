@@ -0,0 +1,143 @@
+"""
+Columnar transaction snapshots.
+
+A ColumnarSnapshot holds one user's transactions as parallel NumPy arrays
+(date ordinals, amounts, category ids, expense flags) sorted by date, so
+insight queries run as vectorized array operations instead of SQL round
+trips. Snapshots are built lazily and kept in a bounded LRU with a TTL,
+keyed by user and data version (users.data_version), so a commit in any
+process makes older snapshots unreachable; the committing process also
+drops them eagerly (see app.core.changes) to free the memory.
+
+NumPy is optional and imported on first use (it is slow to import, and
+only the insight endpoints need it): require_numpy() returns the module, or
+raises InsightsUnavailable, which the app answers with 501.
+"""
+
+import importlib.util
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+from .changes import on_user_data_change
+
+# Optional dependency, imported by require_numpy()
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+np = None
+
+
+class InsightsUnavailable(Exception):
+    """Raised when NumPy-backed analytics are requested but NumPy is missing"""
+
+
+def require_numpy():
+    """Import and return NumPy; raise InsightsUnavailable if it is not installed"""
+    global np
+    if np is None:
+        if not NUMPY_AVAILABLE:
+            raise InsightsUnavailable("Install numpy to enable insight analytics")
+        import numpy
+
+        np = numpy
+    return np
+
+
+@dataclass(frozen=True)
+class ColumnarSnapshot:
+    """One user's transactions as date-sorted parallel arrays"""
+    dates: "np.ndarray"        # int32 proleptic Gregorian ordinals
+    amounts: "np.ndarray"      # float64, always positive
+    category_ids: "np.ndarray" # int32
+    is_expense: "np.ndarray"   # bool
+    # category id -> (name, color, icon)
+    categories: Dict[int, Tuple[str, str, str]]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays"""
+        return sum(a.nbytes for a in (self.dates, self.amounts, self.category_ids, self.is_expense))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+class SnapshotCache:
+    """
+    Thread-safe LRU + TTL cache of ColumnarSnapshot keyed by user id.
+
+    Each entry records the data version it was loaded at, and get() only
+    returns it for that version, so a snapshot is never served with the
+    ETag of newer data. Only the latest version is kept per user.
+    """
+
+    def __init__(self, maxsize: int = 64, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[int, tuple[float, int, ColumnarSnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, data_version: int) -> Optional[ColumnarSnapshot]:
+        """Return the snapshot cached at `data_version`, or None if missing, older or expired"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            expired = entry is not None and entry[0] < time.monotonic()
+            if expired or (entry is not None and entry[1] < data_version):
+                del self._entries[user_id]
+            if entry is None or expired or entry[1] != data_version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, user_id: int, data_version: int, snapshot: ColumnarSnapshot):
+        """Cache a snapshot loaded at `data_version` unless a newer one is cached"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > data_version:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl, data_version, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_ids: Set[int]):
+        """Drop users' snapshots (their data version has moved on)"""
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop every cached snapshot"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters, size and memory held"""
+        with self._lock:
+            return {
+                "enabled": NUMPY_AVAILABLE,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "bytes": sum(entry[2].nbytes for entry in self._entries.values()),
+            }
+
+
+# Process-wide snapshot cache used by app.crud.insights
+snapshot_cache = SnapshotCache(
+    maxsize=int(os.getenv("SNAPSHOT_CACHE_SIZE", "64")),
+    ttl=float(os.getenv("SNAPSHOT_CACHE_TTL_SECONDS", "300")),
+)
+
+on_user_data_change(snapshot_cache.invalidate)
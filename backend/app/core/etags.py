@@ -0,0 +1,47 @@
+"""
+Conditional GET support.
+
+Read endpoints tag their responses with an ETag derived from the user's
+data version (users.data_version), which every commit that changes the
+user's transactions or categories increments. A request whose
+If-None-Match already holds the current tag is answered 304 Not Modified
+before any of the endpoint's queries run (see app.api.deps.check_etag).
+
+The tag also carries today's date, because endpoints that default their
+range to "up to today" return different data tomorrow without any write.
+"""
+
+from datetime import date
+from typing import Dict, Optional
+
+
+class NotModified(Exception):
+    """Raised by a read dependency when the client's cached copy is current"""
+
+    def __init__(self, etag: str):
+        super().__init__(etag)
+        self.etag = etag
+
+
+def make_etag(user_id: int, data_version: int, today: Optional[date] = None) -> str:
+    """Weak ETag for every read of a user's data at a data version"""
+    today = today or date.today()
+    return f'W/"{user_id}.{data_version}.{today.toordinal()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value lists the tag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    """Headers for a tagged response: browsers may store it but must revalidate"""
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
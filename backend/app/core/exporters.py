@@ -0,0 +1,52 @@
+"""
+Transaction export encoders.
+
+Turn batches of transaction row tuples (see
+app.crud.transaction.iter_transaction_rows) into CSV or NDJSON text, one
+chunk per batch, for a StreamingResponse. The CSV columns are the ones the
+CSV importer reads, so an export can be imported again.
+"""
+
+import csv
+import io
+import json
+from typing import Iterable, Iterator, Sequence
+
+EXPORT_COLUMNS = ("id", "date", "type", "amount", "category_id", "category", "description")
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _plain(row: Sequence) -> tuple:
+    """Row values as JSON/CSV-ready scalars"""
+    id, txn_date, txn_type, amount, category_id, category, description = row
+    return (id, txn_date.isoformat(), txn_type.value, amount, category_id, category, description)
+
+
+def csv_chunks(batches: Iterable[Sequence[Sequence]]) -> Iterator[str]:
+    """Encode row batches as CSV, starting with a header row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_plain(row) for row in rows)
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(batches: Iterable[Sequence[Sequence]]) -> Iterator[str]:
+    """Encode row batches as newline-delimited JSON objects"""
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, _plain(row))), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+EXPORT_FORMATS = {"csv": csv_chunks, "ndjson": ndjson_chunks}
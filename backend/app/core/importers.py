@@ -0,0 +1,82 @@
+"""
+Bank statement parsers.
+
+Streaming readers for CSV and OFX statement files. Each yields
+(row_number, fields) pairs one transaction at a time, so a large upload is
+never loaded into memory at once. Fields are raw strings; validation
+against the user's categories happens in app.crud.imports.
+"""
+
+import codecs
+import csv
+import io
+import re
+from typing import BinaryIO, Dict, Iterator, Tuple
+
+RawRow = Tuple[int, Dict[str, str]]
+
+# OFX 1.x is SGML: closing tags for leaf elements are optional
+_OFX_TRANSACTION = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+_OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+def iter_csv_rows(stream: BinaryIO) -> Iterator[RawRow]:
+    """
+    Read transactions from a CSV file with a header row.
+
+    Recognised columns (case-insensitive): date, amount, description,
+    category (name), category_id, type. Row numbers count the header as 1.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [c.strip().lower() for c in header]
+        for line, values in enumerate(reader, start=2):
+            if not any(values):
+                continue
+            yield line, dict(zip(columns, values))
+    finally:
+        # Leave the underlying upload open for its owner to close
+        text.detach()
+
+
+def iter_ofx_rows(stream: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[RawRow]:
+    """
+    Read transactions (<STMTTRN> blocks) from an OFX 1.x/2.x statement.
+
+    Yields fields named like the CSV columns: date (YYYY-MM-DD), amount
+    (signed, as in TRNAMT) and description (NAME and MEMO). Row numbers
+    count transactions from 1.
+    """
+    # Incremental, so a character split across two chunks decodes intact
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    count = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += decoder.decode(chunk, final=not chunk)
+
+        last_end = 0
+        for match in _OFX_TRANSACTION.finditer(buffer):
+            count += 1
+            yield count, _ofx_fields(match.group(1))
+            last_end = match.end()
+        buffer = buffer[last_end:]
+
+        if not chunk:
+            return
+
+
+def _ofx_fields(block: str) -> Dict[str, str]:
+    """Map one <STMTTRN> block to import fields"""
+    tags = {name.upper(): value.strip() for name, value in _OFX_FIELD.findall(block)}
+    posted = tags.get("DTPOSTED", "")
+    description = " - ".join(v for v in (tags.get("NAME"), tags.get("MEMO")) if v)
+    return {
+        "date": f"{posted[0:4]}-{posted[4:6]}-{posted[6:8]}" if len(posted) >= 8 else posted,
+        "amount": tags.get("TRNAMT", ""),
+        "description": description,
+    }
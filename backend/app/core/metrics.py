@@ -0,0 +1,262 @@
+"""
+Request and SQL metrics.
+
+Every HTTP request gets a RequestStats object in a context variable. The
+SQLAlchemy cursor hooks installed by instrument_engine() add each
+statement's count and duration to it. That includes statements run in
+threadpool workers and in the async engine's greenlets, because both
+inherit the request's context. MetricsMiddleware then:
+
+- adds a Server-Timing header (db time and statement count, total time)
+- records per-route latency, DB time and statement count histograms,
+  keyed by the route template (/api/v1/transactions/{transaction_id}),
+  never by the raw path
+
+render() exports everything in the Prometheus text format for /metrics.
+Metrics are plain in-process counters (no prometheus_client dependency);
+each worker process reports its own.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+
+# Latency buckets in seconds, and statement-count buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+class RequestStats:
+    """SQL work done on behalf of one request, and who and what it was for"""
+    __slots__ = ("statements", "db_seconds", "scope", "user_id")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.scope = scope
+        # Set by get_current_user once the request is authenticated
+        self.user_id: Optional[int] = None
+
+    @property
+    def route(self) -> Optional[str]:
+        """'METHOD /route/{template}' once routing has matched, else None"""
+        route = self.scope.get("route") if self.scope else None
+        return f"{self.scope['method']} {route.path}" if route is not None else None
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being served, or None outside a request"""
+    return _request_stats.get()
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in values:
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (non-cumulative, +Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _labels(self.labels + ("le",), label_values + ("+Inf" if bound == float("inf") else _number(bound),))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    """Format a label set, escaping values as the text format requires"""
+    if not names:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to first response byte per route", ("method", "route"))
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "SQL execution time per request", ("method", "route"))
+REQUEST_STATEMENTS = Histogram(
+    "http_request_db_statements", "SQL statements executed per request", ("method", "route"), buckets=STATEMENT_BUCKETS
+)
+STATEMENTS = Counter("db_statements_total", "SQL statements executed, in or outside requests")
+
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def register_collector(collect: Callable[[], Iterable[str]]):
+    """Add a function returning extra exposition lines (e.g. gauges) to render()"""
+    _collectors.append(collect)
+
+
+def sample(name: str, help: str, value, kind: str = "gauge") -> List[str]:
+    """Exposition lines of one unlabelled gauge or counter (nothing if value is None)"""
+    if value is None:
+        return []
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_number(value)}"]
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    lines: List[str] = []
+    for metric in (REQUESTS, REQUEST_SECONDS, REQUEST_DB_SECONDS, REQUEST_STATEMENTS, STATEMENTS):
+        lines.extend(metric.collect())
+    for collect in _collectors:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+
+# Called as handler(conn, statement, parameters, executemany, seconds, stats)
+# for statements taking at least _slow_threshold seconds (see on_slow_statement)
+_slow_threshold = float("inf")
+_slow_handler: Optional[Callable] = None
+
+
+def on_slow_statement(threshold_seconds: float, handler: Callable):
+    """Call handler for every statement slower than threshold_seconds"""
+    global _slow_threshold, _slow_handler
+    _slow_handler = handler
+    _slow_threshold = threshold_seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    STATEMENTS.inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    if elapsed >= _slow_threshold:
+        _slow_handler(conn, statement, parameters, executemany, elapsed, stats)
+
+
+def _handle_error(exception_context):
+    # Statements that raise never reach after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+def instrument_engine(engine):
+    """Time every statement of an Engine (or an AsyncEngine's sync_engine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and SQL cost.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, which would
+    add a task and a memory stream to every request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        observed = False
+
+        async def send_with_timing(message):
+            nonlocal observed
+            if message["type"] == "http.response.start":
+                observed = True
+                elapsed = time.perf_counter() - start
+                self._observe(scope, message["status"], elapsed, stats)
+                timing = (
+                    f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.statements} queries", '
+                    f"app;dur={elapsed * 1000:.2f}"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception:
+            # The server error handler outside this middleware sends the 500
+            if not observed:
+                self._observe(scope, 500, time.perf_counter() - start, stats)
+            raise
+        finally:
+            _request_stats.reset(token)
+
+    @staticmethod
+    def _observe(scope, status: int, elapsed: float, stats: RequestStats):
+        route = scope.get("route")
+        # Unmatched paths share one label so scanners cannot blow up cardinality
+        template = getattr(route, "path", None) or "unmatched"
+        method = scope["method"]
+        REQUESTS.inc(method, template, str(status))
+        REQUEST_SECONDS.observe(elapsed, method, template)
+        REQUEST_DB_SECONDS.observe(stats.db_seconds, method, template)
+        REQUEST_STATEMENTS.observe(stats.statements, method, template)
@@ -0,0 +1,33 @@
+"""
+Pagination utilities.
+
+Handles opaque keyset (cursor) tokens for paginated list endpoints.
+A cursor encodes the sort key of the last row on a page, so the next page
+can start right after it instead of skipping rows with OFFSET.
+"""
+
+import base64
+import binascii
+from datetime import date
+from typing import Tuple
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def encode_cursor(row_date: date, row_id: int) -> str:
+    """Encode a (date, id) sort key into an opaque URL-safe cursor"""
+    raw = f"{row_date.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """Decode a cursor produced by encode_cursor back into (date, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_part, id_part = raw.split("|", 1)
+        return date.fromisoformat(date_part), int(id_part)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,148 @@
+"""
+Calendar period utilities.
+
+Turns calendar periods (year, month, quarter, ISO week) into half-open date
+ranges [start, end). Queries filter with `date >= start AND date < end`,
+which an index on the date column can serve as a range scan, unlike
+extract('year'/'month', date) comparisons that force a scan of every row.
+"""
+
+from datetime import date, timedelta
+from typing import Iterator, Optional, Tuple
+
+DateRange = Tuple[date, date]
+
+
+def year_range(year: int) -> DateRange:
+    """Return [Jan 1, next Jan 1) for a year"""
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def month_range(year: int, month: int) -> DateRange:
+    """Return [first day, first day of next month) for a month (1-12)"""
+    if not 1 <= month <= 12:
+        raise ValueError(f"month must be in 1..12, got {month}")
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def quarter_range(year: int, quarter: int) -> DateRange:
+    """Return [first day, first day of next quarter) for a quarter (1-4)"""
+    if not 1 <= quarter <= 4:
+        raise ValueError(f"quarter must be in 1..4, got {quarter}")
+    start = date(year, 3 * quarter - 2, 1)
+    end = date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+    return start, end
+
+
+def iso_week_range(year: int, week: int) -> DateRange:
+    """Return [Monday, next Monday) for an ISO 8601 week"""
+    start = date.fromisocalendar(year, week, 1)
+    return start, start + timedelta(days=7)
+
+
+def period_range(
+    year: int,
+    month: Optional[int] = None,
+    quarter: Optional[int] = None,
+    week: Optional[int] = None
+) -> DateRange:
+    """
+    Resolve a calendar period into a half-open date range.
+
+    At most one of month, quarter or week may be given; with none of them
+    the whole year is returned.
+
+    Args:
+        year: Calendar year (ISO year when week is given)
+        month: Month (1-12)
+        quarter: Quarter (1-4)
+        week: ISO week number (1-53)
+
+    Returns:
+        (start, end) with start inclusive and end exclusive
+    """
+    given = [p for p in (month, quarter, week) if p is not None]
+    if len(given) > 1:
+        raise ValueError("Specify at most one of month, quarter or week")
+    if month is not None:
+        return month_range(year, month)
+    if quarter is not None:
+        return quarter_range(year, quarter)
+    if week is not None:
+        return iso_week_range(year, week)
+    return year_range(year)
+
+
+def split_full_months(
+    start: Optional[date],
+    end: Optional[date]
+) -> Tuple[Optional[DateRange], Optional[DateRange], Optional[DateRange]]:
+    """
+    Split a half-open range into a leading partial month, whole months and a
+    trailing partial month.
+
+    Whole months can be answered from monthly aggregates; only the partial
+    edges need raw rows. A None start or end means the range is unbounded on
+    that side, in which case the middle range is unbounded there too.
+
+    Args:
+        start: Inclusive start date, or None
+        end: Exclusive end date, or None
+
+    Returns:
+        (head, months, tail); head and tail are None when the range starts or
+        ends on a month boundary, months is None when no whole month fits
+    """
+    months_start = start
+    if start is not None and start.day != 1:
+        months_start = month_range(start.year, start.month)[1]
+    months_end = end.replace(day=1) if end is not None else None
+
+    if months_start is not None and months_end is not None and months_start >= months_end:
+        return (start, end), None, None
+
+    head = (start, months_start) if start is not None and months_start != start else None
+    tail = (months_end, end) if end is not None and months_end != end else None
+    return head, (months_start, months_end), tail
+
+
+# Trend bucket sizes, smallest last
+GRANULARITIES = ("month", "week", "day")
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """Return the first day of the month / ISO week / day containing a date"""
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "day":
+        return day
+    raise ValueError(f"granularity must be one of {GRANULARITIES}, got {granularity!r}")
+
+
+def next_bucket(start: date, granularity: str) -> date:
+    """Return the start of the bucket after the one starting at `start`"""
+    if granularity == "month":
+        return month_range(start.year, start.month)[1]
+    return start + timedelta(days=7 if granularity == "week" else 1)
+
+
+def bucket_label(start: date, granularity: str) -> str:
+    """Label a bucket: YYYY-MM, ISO YYYY-Www or YYYY-MM-DD"""
+    if granularity == "month":
+        return f"{start.year}-{start.month:02d}"
+    if granularity == "week":
+        iso_year, iso_week, _ = start.isocalendar()
+        return f"{iso_year}-W{iso_week:02d}"
+    return start.isoformat()
+
+
+def iter_buckets(start: date, end: date, granularity: str) -> Iterator[date]:
+    """Yield the start of every bucket overlapping the half-open range [start, end)"""
+    current = bucket_start(start, granularity)
+    while current < end:
+        yield current
+        current = next_bucket(current, granularity)
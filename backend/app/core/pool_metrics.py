@@ -0,0 +1,104 @@
+"""
+Connection pool metrics.
+
+A PoolMetrics instance times every connection checkout of an engine's pool
+(how long a request waited for a connection, including connecting when the
+pool had none idle) and tracks how many connections are checked out, so
+/api/v1/admin/status can show checkout latency and how close the pool is
+to saturation.
+
+Timing wraps the pool's _do_get (the hook Pool subclasses implement), via a
+subclass created by pool_class(); checkouts and checkins are counted with
+the public pool events.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Optional, Type
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+
+class PoolMetrics:
+    """Thread-safe checkout latency and saturation counters for one pool"""
+
+    def __init__(self, samples: int = 1024):
+        self.checkouts = 0
+        self.failed_checkouts = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self._latencies: deque = deque(maxlen=samples)
+        self._pool: Optional[Pool] = None
+        self._lock = threading.Lock()
+
+    def pool_class(self, base: Type[Pool]) -> Type[Pool]:
+        """Subclass of a pool class whose checkouts are timed into these metrics"""
+        metrics = self
+
+        class TimedPool(base):
+            def _do_get(self):
+                start = time.perf_counter()
+                try:
+                    connection = super()._do_get()
+                except Exception:
+                    metrics._observe(time.perf_counter() - start, failed=True)
+                    raise
+                metrics._observe(time.perf_counter() - start)
+                return connection
+
+        TimedPool.__name__ = f"Timed{base.__name__}"
+        return TimedPool
+
+    def attach(self, engine):
+        """Count checkouts/checkins of an Engine (or an AsyncEngine's sync_engine)"""
+        self._pool = engine.pool
+        event.listen(engine.pool, "checkout", self._on_checkout)
+        event.listen(engine.pool, "checkin", self._on_checkin)
+
+    def _observe(self, seconds: float, failed: bool = False):
+        with self._lock:
+            if failed:
+                self.failed_checkouts += 1
+            else:
+                self._latencies.append(seconds)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def stats(self) -> dict:
+        """Return pool shape, saturation and checkout latency (ms) of recent checkouts"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "pool": type(self._pool).__name__ if self._pool is not None else None,
+                "checkouts": self.checkouts,
+                "failed_checkouts": self.failed_checkouts,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+            }
+
+        # Capacity is only defined for bounded pools (not NullPool)
+        size = getattr(self._pool, "size", None)
+        if callable(size):
+            capacity = size() + max(0, getattr(self._pool, "_max_overflow", 0))
+            stats["capacity"] = capacity
+            stats["saturation"] = round(stats["checked_out"] / capacity, 3) if capacity else None
+
+        if latencies:
+            def percentile(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+            stats["checkout_ms"] = {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(latencies[-1] * 1000, 3),
+            }
+        return stats
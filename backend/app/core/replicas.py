@@ -0,0 +1,201 @@
+"""
+Read-replica routing.
+
+With DATABASE_REPLICA_URLS set, sessions handed out by get_read_db send
+their queries to a healthy replica (round robin) instead of the primary.
+They fall back to the primary when:
+
+- the request is not authenticated yet (e.g. the user lookup behind a JWT),
+  so a replica that lags behind a new registration cannot reject the login
+- the user committed a change within READ_YOUR_WRITES_SECONDS in this
+  process, so they see their own writes (stickiness is per process; keep the
+  window above the usual replica lag)
+- no replica is healthy
+
+Replica health is checked on a background thread every
+REPLICA_CHECK_SECONDS: a replica must answer, have the primary's schema
+version and, on PostgreSQL, replay WAL within REPLICA_MAX_LAG_SECONDS.
+A replica whose connection drops is taken out of rotation at once. Until
+the first check completes, reads use the primary.
+
+Replicas are plain database URLs, so two local SQLite files (the second a
+copy of the first) or two local PostgreSQL databases work for testing.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set
+from sqlalchemy import event, text
+from .changes import on_user_data_change
+
+logger = logging.getLogger(__name__)
+
+# The authenticated user of the current request (set by get_current_user)
+_request_user_id: ContextVar[Optional[int]] = ContextVar("request_user_id", default=None)
+
+_PG_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+_SCHEMA_VERSION_SQL = text("SELECT MAX(version) FROM schema_version")
+
+
+def set_request_user(user_id: int):
+    """Record the authenticated user of the current request"""
+    _request_user_id.set(user_id)
+
+
+def request_user() -> Optional[int]:
+    """The authenticated user of the current request, or None"""
+    return _request_user_id.get()
+
+
+class Replica:
+    """One replica database: its engines and health"""
+
+    def __init__(self, name: str, engine, metrics=None):
+        self.name = name
+        self.engine = engine
+        self.async_engine = None
+        # PoolMetrics of the engine serving requests (async engine in async mode)
+        self.metrics = metrics
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reads = 0
+
+    def mark_down(self, reason: str):
+        if self.healthy:
+            logger.warning("Replica %s taken out of rotation: %s", self.name, reason)
+        self.healthy = False
+        self.last_error = reason
+
+
+class ReplicaRouter:
+    """Chooses the engine behind each read session"""
+
+    def __init__(self, sticky_seconds: float = 5.0, check_seconds: float = 10.0, max_lag_seconds: float = 10.0):
+        self.sticky_seconds = sticky_seconds
+        self.check_seconds = check_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.replicas: List[Replica] = []
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self._last_write: Dict[int, float] = {}
+        self._cycle = None
+        self._primary_engine = None
+        self._checker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def configure(self, primary_engine, replicas: List[Replica]):
+        """Set the primary (for schema checks) and the replicas to route to"""
+        self._primary_engine = primary_engine
+        self.replicas = replicas
+        self._cycle = itertools.cycle(replicas)
+        for replica in replicas:
+            self.watch(replica, replica.engine)
+        on_user_data_change(self.note_writes)
+
+    def watch(self, replica: Replica, engine):
+        """Take the replica out of rotation when a connection to it drops"""
+        @event.listens_for(engine, "handle_error")
+        def on_error(exception_context):
+            if exception_context.is_disconnect:
+                replica.mark_down(str(exception_context.original_exception))
+
+    def note_writes(self, user_ids: Set[int]):
+        """Start the read-your-writes window of users whose data just changed"""
+        now = time.monotonic()
+        with self._lock:
+            for user_id in user_ids:
+                self._last_write[user_id] = now
+            if len(self._last_write) > 10000:
+                cutoff = now - self.sticky_seconds
+                self._last_write = {uid: at for uid, at in self._last_write.items() if at > cutoff}
+
+    def is_sticky(self, user_id: int) -> bool:
+        at = self._last_write.get(user_id)
+        return at is not None and time.monotonic() - at < self.sticky_seconds
+
+    def choose(self, user_id: int) -> Optional[Replica]:
+        """
+        Replica to serve an authenticated user's reads, or None for the primary.
+        """
+        self._ensure_checker()
+        sticky = self.is_sticky(user_id)
+        with self._lock:
+            if sticky:
+                self.sticky_reads += 1
+                return None
+            for _ in range(len(self.replicas)):
+                replica = next(self._cycle)
+                if replica.healthy:
+                    replica.reads += 1
+                    return replica
+            self.primary_reads += 1
+            return None
+
+    def _ensure_checker(self):
+        if self._checker is None:
+            with self._lock:
+                if self._checker is None:
+                    self._checker = threading.Thread(target=self._check_loop, name="replica-health", daemon=True)
+                    self._checker.start()
+
+    def _check_loop(self):
+        while True:
+            self.check()
+            time.sleep(self.check_seconds)
+
+    def check(self):
+        """Probe every replica once and update its health"""
+        try:
+            with self._primary_engine.connect() as conn:
+                primary_version = conn.execute(_SCHEMA_VERSION_SQL).scalar()
+        except Exception:
+            logger.warning("Replica check could not read the primary schema version", exc_info=True)
+            return
+
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    version = conn.execute(_SCHEMA_VERSION_SQL).scalar()
+                    lag = conn.execute(_PG_LAG_SQL).scalar() if conn.dialect.name == "postgresql" else None
+            except Exception as e:
+                replica.mark_down(f"check failed: {e}")
+                continue
+            replica.lag_seconds = float(lag) if lag is not None else None
+            if version != primary_version:
+                replica.mark_down(f"schema version {version}, primary has {primary_version}")
+            elif lag is not None and lag > self.max_lag_seconds:
+                replica.mark_down(f"replication lag {float(lag):.1f}s")
+            else:
+                if not replica.healthy:
+                    logger.info("Replica %s is healthy", replica.name)
+                replica.healthy = True
+                replica.last_error = None
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "reads": replica.reads,
+                    "lag_seconds": replica.lag_seconds,
+                    "last_error": replica.last_error,
+                    **({"pool": replica.metrics.stats()} if replica.metrics is not None else {}),
+                }
+                for replica in self.replicas
+            ],
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+            "read_your_writes_seconds": self.sticky_seconds,
+        }
@@ -0,0 +1,47 @@
+"""
+Fast JSON responses.
+
+With FAST_JSON=true, hot read endpoints return FastJSONResponse built from
+plain dicts produced by row-tuple queries, skipping ORM entity loading and
+the response_model validation of data that came straight from the
+database. It encodes with orjson when installed and falls back to the
+stdlib encoder otherwise.
+"""
+
+import json
+import os
+from datetime import date
+from enum import Enum
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+
+def _encode_default(value: Any):
+    """Encode the non-JSON types our rows contain (stdlib fallback only)"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes with orjson (dates, enums natively) when available"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content,
+            default=_encode_default,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
@@ -0,0 +1,321 @@
+"""
+Per-user analytics result cache.
+
+Caches the JSON-ready results of analytics endpoints keyed by user, the
+user's data version (users.data_version), endpoint and parameters. Because
+the data version is part of the key, a commit that changes a user's
+transactions or categories makes every older entry unreachable at once, in
+every process; the in-process backend also drops them eagerly (see
+app.core.changes) to free the memory.
+
+Entries are fresh for ANALYTICS_CACHE_TTL_SECONDS. For a further
+ANALYTICS_CACHE_STALE_SECONDS they are still served (stale-while-revalidate)
+while one background refresh per key recomputes them. The TTL only bounds
+inputs the data version does not cover, such as rollup rebuilds.
+
+Backends are pluggable:
+
+- MemoryBackend (default): bounded in-process LRU
+- SharedBackend: any Redis-compatible client (get/set with ex=), so workers
+  and serverless instances share results; tests can pass a stand-in client.
+  Its calls block on the network, so ResultCache runs them in the threadpool
+- ANALYTICS_CACHE_BACKEND=none disables caching
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Protocol, Set, Tuple
+from starlette.concurrency import run_in_threadpool
+from .changes import on_user_data_change
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """A cached result and when (wall-clock seconds) it was computed"""
+    value: Any
+    stored_at: float
+
+
+class CacheBackend(Protocol):
+    """
+    Storage for CacheEntry objects, keyed per user.
+
+    Backends whose get/set do I/O set blocking = True, and are then called
+    from the threadpool instead of the event loop.
+    """
+
+    blocking: bool
+
+    def get(self, user_id: int, key: str) -> Optional[CacheEntry]: ...
+
+    def set(self, user_id: int, key: str, entry: CacheEntry, ttl: float): ...
+
+    def invalidate(self, user_ids: Set[int]): ...
+
+    def stats(self) -> dict: ...
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU of cache entries, with a per-user index"""
+
+    blocking = False
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, CacheEntry]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            item = self._entries.get((user_id, key))
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                self._remove((user_id, key))
+                return None
+            self._entries.move_to_end((user_id, key))
+            return item[1]
+
+    def set(self, user_id: int, key: str, entry: CacheEntry, ttl: float):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[(user_id, key)] = (time.monotonic() + ttl, entry)
+            self._entries.move_to_end((user_id, key))
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, user_ids: Set[int]):
+        with self._lock:
+            for user_id in user_ids:
+                for key in self._keys_by_user.pop(user_id, ()):
+                    self._entries.pop((user_id, key), None)
+
+    def _remove(self, full_key: Tuple[int, str]):
+        """Drop one entry and its index slot (lock held)"""
+        self._entries.pop(full_key, None)
+        keys = self._keys_by_user.get(full_key[0])
+        if keys is not None:
+            keys.discard(full_key[1])
+            if not keys:
+                del self._keys_by_user[full_key[0]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+class SharedBackend:
+    """
+    Cache entries in a shared key-value store (e.g. redis.Redis).
+
+    The client only needs get(name) and set(name, value, ex=seconds).
+    Invalidation is a no-op: entries of older data versions are never read
+    again and expire on their own. Store errors and values that do not
+    decode (corrupted, or written by something else) are logged and treated
+    as misses, so an outage degrades to uncached responses.
+    """
+
+    blocking = True
+
+    def __init__(self, client, prefix: str = "mm:analytics:"):
+        self.client = client
+        self.prefix = prefix
+        self.errors = 0
+
+    def get(self, user_id: int, key: str) -> Optional[CacheEntry]:
+        try:
+            raw = self.client.get(f"{self.prefix}{user_id}:{key}")
+            if raw is None:
+                return None
+            value, stored_at = json.loads(raw)
+            return CacheEntry(value=value, stored_at=float(stored_at))
+        except Exception:
+            self.errors += 1
+            logger.warning("analytics cache get failed", exc_info=True)
+            return None
+
+    def set(self, user_id: int, key: str, entry: CacheEntry, ttl: float):
+        try:
+            self.client.set(
+                f"{self.prefix}{user_id}:{key}",
+                json.dumps([entry.value, entry.stored_at], separators=(",", ":")),
+                ex=max(1, int(ttl)),
+            )
+        except Exception:
+            self.errors += 1
+            logger.warning("analytics cache set failed", exc_info=True)
+
+    def invalidate(self, user_ids: Set[int]):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "shared", "errors": self.errors}
+
+
+def cache_key(data_version: int, endpoint: str, params: Dict[str, Any]) -> str:
+    """Key of one endpoint result at a data version (params in sorted order)"""
+    encoded = json.dumps(params, sort_keys=True, default=str, separators=(",", ":"))
+    return f"{data_version}:{endpoint}:{encoded}"
+
+
+class ResultCache:
+    """
+    Read-through result cache with stale-while-revalidate.
+
+    Counts fresh hits, stale hits, misses and background refreshes on top
+    of whatever the backend reports.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: float = 300.0, stale_ttl: float = 60.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._refreshing: Set[Tuple[int, str]] = set()
+        # The event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+
+    async def get_or_compute(
+        self,
+        user_id: int,
+        data_version: int,
+        endpoint: str,
+        params: Dict[str, Any],
+        compute: Callable[[], Any],
+        refresh: Optional[Callable[[], Any]] = None,
+    ) -> Any:
+        """
+        Return the cached result, computing and storing it on a miss.
+
+        Args:
+            user_id: Owner of the data
+            data_version: The user's current data version
+            endpoint: Name of the cached endpoint
+            params: Every parameter the result depends on (after defaults)
+            compute: Awaitable factory computing the JSON-ready result with
+                the request's session
+            refresh: Sync function computing the same result with its own
+                session; enables stale-while-revalidate
+
+        Returns:
+            The JSON-ready result
+        """
+        if self.backend is None:
+            return await compute()
+
+        key = cache_key(data_version, endpoint, params)
+        entry = await self._call(self.backend.get, user_id, key)
+        age = time.time() - entry.stored_at if entry is not None else None
+
+        if entry is not None and age < self.ttl:
+            self._count("hits")
+            return entry.value
+        if entry is not None and refresh is not None and age < self.ttl + self.stale_ttl:
+            self._count("stale_hits")
+            self._start_refresh(user_id, key, refresh)
+            return entry.value
+
+        self._count("misses")
+        value = await compute()
+        await self._call(self.backend.set, user_id, key, CacheEntry(value, time.time()), self.ttl + self.stale_ttl)
+        return value
+
+    async def _call(self, method: Callable, *args):
+        """Call a backend method, in the threadpool if it blocks"""
+        if self.backend.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    def _start_refresh(self, user_id: int, key: str, refresh: Callable[[], Any]):
+        """Recompute a stale entry in the threadpool, once per key at a time"""
+        with self._lock:
+            if (user_id, key) in self._refreshing:
+                return
+            self._refreshing.add((user_id, key))
+
+        def recompute():
+            value = refresh()
+            self.backend.set(user_id, key, CacheEntry(value, time.time()), self.ttl + self.stale_ttl)
+
+        async def run():
+            try:
+                await run_in_threadpool(recompute)
+                self._count("refreshes")
+            except Exception:
+                logger.warning("analytics cache refresh failed", exc_info=True)
+            finally:
+                with self._lock:
+                    self._refreshing.discard((user_id, key))
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def invalidate(self, user_ids: Set[int]):
+        """Eagerly drop users' entries where the backend supports it"""
+        if self.backend is not None:
+            self.backend.invalidate(user_ids)
+
+    def stats(self) -> dict:
+        """Return hit ratio and counters, plus the backend's own metrics"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            stats = {
+                "enabled": self.backend is not None,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+            }
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        return stats
+
+
+def _backend_from_env() -> Optional[CacheBackend]:
+    """Build the backend selected by ANALYTICS_CACHE_BACKEND"""
+    name = os.getenv("ANALYTICS_CACHE_BACKEND", "memory").lower()
+    if name == "none":
+        return None
+    if name in ("redis", "shared"):
+        import redis  # optional dependency, only needed for the shared backend
+
+        return SharedBackend(redis.Redis.from_url(os.getenv("ANALYTICS_CACHE_URL", "redis://localhost:6379/0")))
+    return MemoryBackend(maxsize=int(os.getenv("ANALYTICS_CACHE_SIZE", "1024")))
+
+
+# Process-wide cache used by the analytics router
+analytics_cache = ResultCache(
+    _backend_from_env(),
+    ttl=float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "300")),
+    stale_ttl=float(os.getenv("ANALYTICS_CACHE_STALE_SECONDS", "60")),
+)
+
+on_user_data_change(analytics_cache.invalidate)
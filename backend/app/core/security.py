@@ -2,27 +2,152 @@
 Security utilities.
 
 Handles password hashing and JWT token creation.
+
+jose and passlib are imported on first use rather than with this module,
+so starting the app (e.g. a serverless cold start) does not pay for them.
+
+bcrypt is deliberately slow, so request handlers hash and verify passwords
+through hash_password_async / verify_password_async. These run on a small
+dedicated worker pool (processes by default) with a bounded number of
+pending jobs; when the pool is saturated new jobs are rejected immediately
+with PasswordHasherBusy instead of queueing behind a login burst and
+starving the request threadpool.
 """
 
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import jwt
-from passlib.context import CryptContext
+from typing import Optional, Tuple
 
 # Secret key to sign JWTs (in production, this should be in env vars)
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt work factor; hashes with a different factor are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Password hashing pool: "process" or "thread" (serverless runtimes such as
+# Vercel lack the shared memory process pools need), its size, and how many
+# jobs may be running or queued before new ones are rejected
+PASSWORD_HASH_POOL = os.getenv("PASSWORD_HASH_POOL", "thread" if os.getenv("VERCEL") else "process")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+_pwd_context = None
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool has no room for another job"""
+
+
+class InvalidToken(Exception):
+    """Raised when a JWT is malformed, expired or not signed with SECRET_KEY"""
+
+
+_executor: Optional[Executor] = None
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _get_pwd_context():
+    """Create the passlib context on first use"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
+
 
 def verify_password(plain_password, hashed_password):
     """Verify a plain password against a hashed password"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _get_pwd_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if its hash uses outdated settings.
+
+    Returns:
+        (valid, new_hash) where new_hash is None unless the stored hash
+        should be replaced (e.g. BCRYPT_ROUNDS changed)
+    """
+    return _get_pwd_context().verify_and_update(plain_password, hashed_password)
+
 
 def get_password_hash(password):
     """Hash a password"""
-    return pwd_context.hash(password)
+    return _get_pwd_context().hash(password)
+
+
+def _get_executor() -> Executor:
+    """Create the password hashing pool on first use"""
+    global _executor
+    if _executor is None:
+        if PASSWORD_HASH_POOL == "process":
+            # Spawn rather than fork: forked workers would inherit the
+            # server's listening socket and signal handlers and outlive it
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+def shutdown_hashing_pool():
+    """
+    Stop the password hashing pool's workers (on app shutdown).
+
+    Process workers are not stopped by interpreter exit when the server
+    dies by its signal (uvicorn re-raises SIGTERM after shutting down), and
+    would be left running without a parent.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+async def _run_hashing_job(fn, *args):
+    """Run fn on the hashing pool, rejecting it when too many jobs are pending"""
+    global _pending
+    with _pending_lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            raise PasswordHasherBusy()
+        _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the hashing pool (raises PasswordHasherBusy when saturated)"""
+    return await _run_hashing_job(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify (and maybe rehash) a password on the hashing pool; see verify_and_update_password"""
+    return await _run_hashing_job(verify_and_update_password, plain_password, hashed_password)
+
+
+def hashing_pool_stats() -> dict:
+    """Return the hashing pool configuration and current number of pending jobs"""
+    return {
+        "pool": PASSWORD_HASH_POOL,
+        "workers": PASSWORD_HASH_WORKERS,
+        "pending": _pending,
+        "max_pending": PASSWORD_HASH_MAX_PENDING,
+    }
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
@@ -33,5 +158,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=15)
 
     to_encode.update({"exp": expire})
+    from jose import jwt
+
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+def decode_access_token(token: str) -> dict:
+    """Verify a JWT access token and return its claims (raises InvalidToken)"""
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as e:
+        raise InvalidToken(str(e)) from e
@@ -0,0 +1,227 @@
+"""
+User-id based sharding.
+
+With DATABASE_SHARD_URLS set, each user's categories, transactions and
+monthly rollups live in one shard database. DATABASE_URL becomes the global
+directory: it holds the users table used for registration and login, and
+users.shard, the name of each user's shard (NULL: the directory database
+itself, named "primary", where everyone's data lived before sharding).
+
+- New users are placed by rendezvous hashing over the shard names, so adding
+  a shard only moves the users that hash to it (see rebalance.py). The
+  directory entry, not the hash, is authoritative.
+- Every shard keeps a row for each user it holds in its own users table
+  (the "shadow" row: no password). Foreign keys stay valid on PostgreSQL,
+  and the row carries the user's data_version, so ETag versions change in
+  the same transaction as the data.
+- The shadow row is also the fence for online moves: every session checks
+  it before its first per-user statement (writers lock it and also require
+  users.moving_to to be NULL). A move sets moving_to on the source and
+  commits, copies the data, then deletes it from the source. Writes during
+  the copy and requests routed by a stale directory entry fail with
+  ShardMoved (503, retry) instead of writing or reading the old copy; reads
+  keep being served from the source until the data is gone.
+- Category and transaction ids are global, so they stay the same when a
+  user moves: each database hands out counter * ID_STRIDE + ordinal from its
+  id_sequences table (see allocate_ids), its ordinal being unique among the
+  databases. migrate.py assigns the ordinals and seeds the counters above
+  every existing id (crud.shard.register_shards).
+
+Directory entries are cached per process for SHARD_DIRECTORY_CACHE_SECONDS;
+the fence makes a stale entry cost one retry, never a lost write. Read
+replicas (DATABASE_REPLICA_URLS) replicate the primary only. Shards are plain
+database URLs, so N local SQLite files work for testing.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import text
+
+# Shard name of the directory database itself (users.shard IS NULL)
+PRIMARY = "primary"
+
+# Databases (the primary included) that can hand out global ids; ids stay
+# below 2**31 (PostgreSQL INTEGER) for 2**31 / ID_STRIDE rows per database
+ID_STRIDE = 64
+
+_DIRECTORY_SQL = text("SELECT shard FROM users WHERE id = :id")
+_FENCE_SQL = "SELECT id FROM users WHERE id = :id AND COALESCE(shard, :primary) = :shard"
+_NEXT_IDS_SQL = text(
+    "UPDATE id_sequences SET next_value = next_value + :count WHERE name = :name RETURNING next_value, ordinal"
+)
+
+
+class ShardMoved(Exception):
+    """The user's data is being moved off (or is gone from) the shard this session was routed to"""
+
+    def __init__(self, user_id: int, shard: str):
+        super().__init__(f"Data of user {user_id} is moving or has moved off shard {shard}; retry the request")
+        self.user_id = user_id
+        self.shard = shard
+
+
+class Shard:
+    """One shard database: its engines per role"""
+
+    def __init__(self, name: str, engine, read_engine, metrics=None):
+        self.name = name
+        self.engine = engine
+        self.read_engine = read_engine
+        self.async_engine = None
+        self.async_read_engine = None
+        # PoolMetrics of the writer engine serving requests (async engine in async mode)
+        self.metrics = metrics
+
+    def bind(self, read: bool, is_async: bool):
+        """The sync Engine for a session's role (an AsyncEngine's sync_engine in async mode)"""
+        if is_async:
+            return (self.async_read_engine if read else self.async_engine).sync_engine
+        return self.read_engine if read else self.engine
+
+
+def rendezvous(user_id: int, names: List[str]) -> str:
+    """Highest-random-weight choice of a shard for a user"""
+    def weight(name: str) -> bytes:
+        return hashlib.blake2b(f"{name}:{user_id}".encode(), digest_size=8).digest()
+
+    return max(names, key=weight)
+
+
+def fence_statement(shard: str, lock: bool, dialect: str):
+    """
+    Select the user's row on a shard if the shard still holds their data.
+
+    With lock=True (writers) the user must not be moving either, and the row
+    stays locked until the transaction ends, so setting moving_to waits for
+    the writer. SQLite has no row locks; the performance profile's BEGIN
+    IMMEDIATE serializes writers there.
+    """
+    sql = _FENCE_SQL
+    if lock:
+        sql += " AND moving_to IS NULL" + (" FOR UPDATE" if dialect != "sqlite" else "")
+    return text(sql).bindparams(primary=PRIMARY, shard=shard)
+
+
+def allocate_ids(connection, table: str, count: int) -> List[int]:
+    """
+    Reserve `count` global ids for rows of `table` in the connection's database.
+
+    Runs in the caller's transaction, so ids of a rolled-back insert are
+    handed out again; they were never visible anywhere else.
+    """
+    row = connection.execute(_NEXT_IDS_SQL, {"name": table, "count": count}).first()
+    if row is None:
+        raise RuntimeError(f"No id sequence for {table} in this database; run `python migrate.py`")
+    end, ordinal = row
+    return [value * ID_STRIDE + ordinal for value in range(end - count, end)]
+
+
+def global_id_default(table: str) -> Callable:
+    """Primary key column default giving inserted rows global ids (one reservation per statement)"""
+
+    def default(context):
+        ids = getattr(context, "_global_ids", None)
+        if not ids:
+            count = len(context.compiled_parameters) if context.executemany else 1
+            ids = context._global_ids = allocate_ids(context.connection, table, count)
+        return ids.pop(0)
+
+    return default
+
+
+class ShardMap:
+    """Shards by name, and the cached directory of which user lives where"""
+
+    def __init__(self, cache_seconds: float = 60.0, max_cached: int = 100000):
+        self.cache_seconds = cache_seconds
+        self.max_cached = max_cached
+        self.shards: Dict[str, Shard] = {}
+        # Shards new users are placed on (every shard but the primary)
+        self.placement: List[str] = []
+        self.lookups = 0
+        self.hits = 0
+        self.moved = 0
+        self._directory: Dict[int, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.placement)
+
+    @property
+    def primary(self) -> Shard:
+        return self.shards[PRIMARY]
+
+    def configure(self, primary: Shard, shards: List[Shard]):
+        self.shards[PRIMARY] = primary
+        for shard in shards:
+            if shard.name in self.shards:
+                raise ValueError(f"Duplicate or reserved shard name: {shard.name!r}")
+            self.shards[shard.name] = shard
+        self.placement = sorted(shard.name for shard in shards)
+
+    def id_default(self, table: str) -> Optional[Callable]:
+        """Primary key default for a per-user table: global ids once sharding is enabled"""
+        return global_id_default(table) if self.enabled else None
+
+    def place(self, user_id: int) -> str:
+        """Shard a new user's data goes to"""
+        return rendezvous(user_id, self.placement)
+
+    def get(self, name: str) -> Shard:
+        try:
+            return self.shards[name]
+        except KeyError:
+            raise ValueError(f"Unknown shard {name!r} (configured: {', '.join(self.shards)})") from None
+
+    def lookup(self, user_id: int, directory) -> Shard:
+        """
+        The user's shard, from the cache or the directory.
+
+        Args:
+            user_id: User to look up
+            directory: Engine of the directory database (never the single
+                SQLite writer, which the calling session may be holding)
+        """
+        now = time.monotonic()
+        cached = self._directory.get(user_id)
+        if cached is not None and cached[1] > now:
+            self.hits += 1
+            return self.get(cached[0])
+
+        with directory.connect() as conn:
+            name = conn.execute(_DIRECTORY_SQL, {"id": user_id}).scalar() or PRIMARY
+        self.lookups += 1
+        self.remember(user_id, name)
+        return self.get(name)
+
+    def remember(self, user_id: int, name: str):
+        with self._lock:
+            if len(self._directory) >= self.max_cached:
+                self._directory.clear()
+            self._directory[user_id] = (name, time.monotonic() + self.cache_seconds)
+
+    def forget(self, user_id: int):
+        """Drop a user's directory entry (e.g. after moving them)"""
+        with self._lock:
+            self._directory.pop(user_id, None)
+
+    def stale(self, user_id: int):
+        """Drop a directory entry that routed a session to the wrong shard"""
+        self.forget(user_id)
+        self.moved += 1
+
+    def stats(self) -> dict:
+        return {
+            "shards": {
+                name: {"pool": shard.metrics.stats()} if shard.metrics is not None else {}
+                for name, shard in self.shards.items()
+            },
+            "placement": self.placement,
+            "directory_lookups": self.lookups,
+            "directory_cache_hits": self.hits,
+            "stale_routes": self.moved,
+            "directory_cache_seconds": self.cache_seconds,
+        }
@@ -0,0 +1,215 @@
+"""
+Slow-query log.
+
+Statements slower than SLOW_QUERY_MS (timed by the cursor hooks in
+app.core.metrics) are recorded with:
+
+- the SQL text and the shape (types, never values) of its parameters
+- the route template and a keyed hash of the user id of the request
+- the query plan: EXPLAIN on PostgreSQL, EXPLAIN QUERY PLAN on SQLite
+
+The plan is captured on a background thread with a connection of its own
+to the database that ran the statement (the primary, a replica or a
+shard), so the slow request is not delayed further. Plans are reused for the same
+statement text for a while, and captures are dropped when too many are
+pending, so a storm of slow queries cannot turn into a storm of EXPLAINs.
+
+The most recent entries are kept in a ring buffer shown by
+GET /api/v1/admin/slow-queries, and each entry is logged once its plan is
+known.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from . import metrics
+from .security import SECRET_KEY
+
+logger = logging.getLogger(__name__)
+
+# Statements taking at least this many milliseconds are logged (0 disables)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Capture query plans for slow statements
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+# Slow queries kept for the admin endpoint
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "100"))
+
+# Longest SQL text kept per entry, seconds a captured plan is reused for the
+# same statement, and plan captures allowed to wait at once
+MAX_STATEMENT_CHARS = 4000
+PLAN_REUSE_SECONDS = 300.0
+MAX_PENDING_EXPLAINS = 4
+
+_EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Describe bound parameters by type name only, e.g. ['int', 'date']"""
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def hash_user_id(user_id: Optional[int]) -> Optional[str]:
+    """Keyed hash of a user id, so logs can group by user without naming them"""
+    if user_id is None:
+        return None
+    return hashlib.blake2b(str(user_id).encode(), key=SECRET_KEY.encode()[:64], digest_size=8).hexdigest()
+
+
+class SlowQueryLog:
+    """Ring buffer of slow statements, with plans captured in the background"""
+
+    def __init__(self, threshold_ms: float, maxlen: int = 100, explain: bool = True):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.recorded = 0
+        self.plans_captured = 0
+        self.plans_skipped = 0
+        self._entries: deque = deque(maxlen=maxlen)
+        # Per (explain engine, statement text): shards can plan differently
+        self._plans: Dict[Tuple[object, str], Tuple[float, List[str]]] = {}
+        self._pending = 0
+        self._installed = False
+        self._explain_engines: Dict[object, object] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def install(self):
+        """Start logging slow statements of every instrumented engine."""
+        if self.threshold_ms <= 0:
+            return
+        self._installed = True
+        metrics.on_slow_statement(self.threshold_ms / 1000, self.record)
+
+    def explain_with(self, engine, explain_engine):
+        """
+        Capture plans of statements run on `engine` with `explain_engine`.
+
+        `engine` is a sync Engine or an AsyncEngine's sync_engine;
+        `explain_engine` is a sync Engine reading the same database (e.g. the
+        reader of a SQLite writer, whose BEGIN IMMEDIATE would take the write
+        lock). Unregistered sync engines explain on themselves; statements
+        of unregistered async engines, or of an engine with a different
+        parameter style (asyncpg behind psycopg2), are logged without a plan.
+        """
+        self._explain_engines[engine] = explain_engine
+
+    def record(self, conn, statement: str, parameters, executemany: bool, seconds: float, stats=None):
+        """Add a slow statement (called from the cursor hooks)"""
+        if statement.lstrip()[:7].lower() == "explain":
+            return  # our own plan captures
+
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "duration_ms": round(seconds * 1000, 3),
+            "statement": statement[:MAX_STATEMENT_CHARS],
+            "parameters": parameter_shape(parameters, executemany),
+            "route": stats.route if stats is not None else None,
+            "user": hash_user_id(stats.user_id) if stats is not None else None,
+            "plan": None,
+        }
+        with self._lock:
+            self.recorded += 1
+            self._entries.append(entry)
+
+        explain_engine = self._explain_engine(conn, statement)
+        if explain_engine is None:
+            self._log(entry)
+            return
+
+        first_row = list(parameters)[0] if executemany and parameters else parameters
+        with self._lock:
+            cached = self._plans.get((explain_engine, statement))
+            if cached is not None and time.monotonic() - cached[0] < PLAN_REUSE_SECONDS:
+                entry["plan"] = cached[1]
+            elif self._pending >= MAX_PENDING_EXPLAINS:
+                self.plans_skipped += 1
+            else:
+                self._pending += 1
+                self._get_executor().submit(self._capture_plan, explain_engine, entry, statement, first_row)
+                return
+        self._log(entry)
+
+    def _explain_engine(self, conn, statement: str):
+        """Sync engine to EXPLAIN a statement of `conn` with, or None"""
+        if not (self.explain and self._installed and statement.lstrip()[:6].lower().startswith(_EXPLAINABLE)):
+            return None
+        engine = self._explain_engines.get(conn.engine)
+        if engine is None and not conn.dialect.is_async:
+            engine = conn.engine
+        if engine is None or engine.dialect.name != conn.dialect.name \
+                or engine.dialect.paramstyle != conn.dialect.paramstyle:
+            return None
+        return engine
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        return self._executor
+
+    def _capture_plan(self, engine, entry: dict, statement: str, parameters):
+        """Run EXPLAIN for a recorded statement (background thread)"""
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            with engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+                conn.rollback()
+            if engine.dialect.name == "sqlite":
+                # (id, parent, notused, detail)
+                plan = [str(row[-1]) for row in rows]
+            else:
+                plan = [str(row[0]) for row in rows]
+            with self._lock:
+                self._plans[(engine, statement)] = (time.monotonic(), plan)
+                self.plans_captured += 1
+        except Exception as e:
+            plan = [f"EXPLAIN failed: {e}"]
+        finally:
+            with self._lock:
+                self._pending -= 1
+        entry["plan"] = plan
+        self._log(entry)
+
+    @staticmethod
+    def _log(entry: dict):
+        logger.warning(
+            "Slow query (%.1f ms) route=%s user=%s params=%s\n%s\nplan: %s",
+            entry["duration_ms"],
+            entry["route"],
+            entry["user"],
+            entry["parameters"],
+            entry["statement"],
+            " | ".join(entry["plan"]) if entry["plan"] else "n/a",
+        )
+
+    def entries(self) -> List[dict]:
+        """Recorded slow queries, newest first"""
+        with self._lock:
+            return [dict(entry) for entry in reversed(self._entries)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold_ms if self.threshold_ms > 0 else None,
+                "recorded": self.recorded,
+                "buffered": len(self._entries),
+                "plans_captured": self.plans_captured,
+                "plans_skipped": self.plans_skipped,
+            }
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_MS, maxlen=SLOW_QUERY_BUFFER, explain=SLOW_QUERY_EXPLAIN)
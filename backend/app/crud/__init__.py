@@ -5,6 +5,15 @@ This package contains functions for Create, Read, Update, Delete operations.
 Each file contains CRUD operations for a different entity.
 """
 
+from .user import (
+    get_user,
+    get_data_version,
+    get_user_by_email,
+    create_user,
+    set_user_active,
+    set_user_password_hash
+)
+
 from .category import (
     get_category,
     get_categories,
@@ -17,18 +26,51 @@ from .category import (
 from .transaction import (
     get_transaction,
     get_transactions,
+    get_transaction_rows,
     get_transactions_by_month,
+    get_transactions_by_period,
     create_transaction,
     update_transaction,
-    delete_transaction
+    delete_transaction,
+    apply_transaction_batch
+)
+
+from .imports import import_transactions
+
+from .rollup import (
+    rebuild_rollups,
+    verify_rollups
 )
 
 from .analytics import (
     get_monthly_summary,
-    get_category_summary
+    get_category_summary,
+    get_trends
+)
+
+from .insights import (
+    get_rolling_average,
+    get_amount_percentiles,
+    get_category_stats,
+    get_weekday_heatmap
+)
+
+from .shard import (
+    place_user,
+    move_user,
+    get_shard_counts,
+    get_misplaced_users,
+    register_shards
 )
 
 __all__ = [
+    # User CRUD
+    "get_user",
+    "get_data_version",
+    "get_user_by_email",
+    "create_user",
+    "set_user_active",
+    "set_user_password_hash",
     # Category CRUD
     "get_category",
     "get_categories",
@@ -39,11 +81,30 @@ __all__ = [
     # Transaction CRUD
     "get_transaction",
     "get_transactions",
+    "get_transaction_rows",
     "get_transactions_by_month",
+    "get_transactions_by_period",
     "create_transaction",
     "update_transaction",
     "delete_transaction",
+    "apply_transaction_batch",
+    "import_transactions",
+    # Rollup maintenance
+    "rebuild_rollups",
+    "verify_rollups",
     # Analytics CRUD
     "get_monthly_summary",
     "get_category_summary",
+    "get_trends",
+    # Insight analytics (NumPy)
+    "get_rolling_average",
+    "get_amount_percentiles",
+    "get_category_stats",
+    "get_weekday_heatmap",
+    # Shard directory
+    "place_user",
+    "move_user",
+    "get_shard_counts",
+    "get_misplaced_users",
+    "register_shards",
 ]
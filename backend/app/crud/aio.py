@@ -0,0 +1,102 @@
+"""
+Async CRUD operations.
+
+Awaitable versions of every function in app.crud, for use from async
+request handlers. Each takes either kind of session handed out by get_db:
+
+- AsyncSession (DATABASE_ASYNC=true): the CRUD function runs through
+  AsyncSession.run_sync on the async driver, so no thread is blocked
+- Session (default): the CRUD function runs in the threadpool, exactly
+  as FastAPI would run a sync endpoint
+
+Either way the event loop never blocks on the database, and the query logic
+stays in one place (the sync CRUD modules).
+"""
+
+from functools import wraps
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import DbSession
+from . import user, category, transaction, imports, rollup, analytics, insights
+
+
+async def run(db: DbSession, fn, *args, **kwargs):
+    """
+    Run a sync function taking a Session as its first argument.
+
+    Args:
+        db: Session or AsyncSession
+        fn: Function called as fn(session, *args, **kwargs)
+
+    Returns:
+        The function's return value
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def release(db: DbSession):
+    """
+    End the session's transaction and return its connection to the pool.
+
+    Call before slow non-database work (e.g. password hashing) so the request
+    does not hold a pooled connection while it waits. Loaded objects are
+    detached; the session can still be used for later queries.
+    """
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        await run_in_threadpool(db.close)
+
+
+def _awaitable(fn):
+    """Wrap a sync CRUD function into an async one via run()."""
+    @wraps(fn)
+    async def wrapper(db: DbSession, *args, **kwargs):
+        return await run(db, fn, *args, **kwargs)
+    return wrapper
+
+
+# User CRUD
+get_user = _awaitable(user.get_user)
+get_data_version = _awaitable(user.get_data_version)
+get_user_by_email = _awaitable(user.get_user_by_email)
+create_user = _awaitable(user.create_user)
+set_user_active = _awaitable(user.set_user_active)
+set_user_password_hash = _awaitable(user.set_user_password_hash)
+
+# Category CRUD
+get_category = _awaitable(category.get_category)
+get_categories = _awaitable(category.get_categories)
+get_categories_by_type = _awaitable(category.get_categories_by_type)
+create_category = _awaitable(category.create_category)
+update_category = _awaitable(category.update_category)
+delete_category = _awaitable(category.delete_category)
+
+# Transaction CRUD
+get_transaction = _awaitable(transaction.get_transaction)
+get_transactions = _awaitable(transaction.get_transactions)
+get_transaction_rows = _awaitable(transaction.get_transaction_rows)
+get_transactions_by_month = _awaitable(transaction.get_transactions_by_month)
+get_transactions_by_period = _awaitable(transaction.get_transactions_by_period)
+create_transaction = _awaitable(transaction.create_transaction)
+update_transaction = _awaitable(transaction.update_transaction)
+delete_transaction = _awaitable(transaction.delete_transaction)
+apply_transaction_batch = _awaitable(transaction.apply_transaction_batch)
+import_transactions = _awaitable(imports.import_transactions)
+
+# Rollup maintenance
+rebuild_rollups = _awaitable(rollup.rebuild_rollups)
+verify_rollups = _awaitable(rollup.verify_rollups)
+
+# Analytics CRUD
+get_monthly_summary = _awaitable(analytics.get_monthly_summary)
+get_category_summary = _awaitable(analytics.get_category_summary)
+get_trends = _awaitable(analytics.get_trends)
+
+# Insight analytics (NumPy)
+get_rolling_average = _awaitable(insights.get_rolling_average)
+get_amount_percentiles = _awaitable(insights.get_amount_percentiles)
+get_category_stats = _awaitable(insights.get_category_stats)
+get_weekday_heatmap = _awaitable(insights.get_weekday_heatmap)
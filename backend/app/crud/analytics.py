@@ -1,29 +1,40 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import Date, cast, func, select, type_coerce, union_all
+from datetime import date, timedelta
+from typing import Optional
+from app.core.periods import (
+    bucket_label,
+    iter_buckets,
+    month_range,
+    split_full_months,
+)
 from app.models.transaction import Transaction
-from app.models.category import Category
-from app.schemas.analytics import MonthlySummary, CategorySummary
-from datetime import date
-import calendar
+from app.models.category import Category, TransactionType
+from app.models.rollup import MonthlyRollup
+from .rollup import year_month, year_month_expr
+from app.schemas.analytics import MonthlySummary, CategorySummary, TrendPoint, TrendSeries
+
+# Largest number of buckets one trends request may span
+MAX_TREND_POINTS = 750
 
 def get_monthly_summary(db: Session, year: int, month: int, user_id: int) -> MonthlySummary:
     """
     Calculate total income, expense, and balance for a specific month and user.
+
+    Reads the pre-aggregated monthly rollups, so the cost depends on the
+    number of categories used that month rather than on transaction count.
     """
-    # Get start and end date of the month
-    start_date = date(year, month, 1)
-    last_day = calendar.monthrange(year, month)[1]
-    end_date = date(year, month, last_day)
+    # Validate the month and build its YYYY-MM rollup key
+    start_date, _ = month_range(year, month)
 
-    # Query to sum amounts by type
+    # Query to sum rollup totals by type
     results = db.query(
-        Transaction.type,
-        func.sum(Transaction.amount).label("total")
+        MonthlyRollup.type,
+        func.sum(MonthlyRollup.total).label("total")
     ).filter(
-        Transaction.date >= start_date,
-        Transaction.date <= end_date,
-        Transaction.user_id == user_id
-    ).group_by(Transaction.type).all()
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.year_month == year_month(start_date)
+    ).group_by(MonthlyRollup.type).all()
 
     total_income = 0.0
     total_expense = 0.0
@@ -41,36 +52,183 @@ def get_monthly_summary(db: Session, year: int, month: int, user_id: int) -> Mon
         balance=total_income - total_expense
     )
 
-def get_category_summary(db: Session, user_id: int, type: str = None) -> list[CategorySummary]:
+def get_category_summary(
+    db: Session,
+    user_id: int,
+    type: str = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: Optional[int] = None
+) -> list[CategorySummary]:
     """
-    Calculate total amount per category for a user, optionally filtered by transaction type.
+    Calculate total amount per category for a user, optionally filtered by
+    transaction type and an inclusive date range.
+
+    Whole months in the range are read from the monthly rollups; only the
+    partial months at either edge are aggregated from raw transactions.
+    Ordering by total and top-N limiting happen in the database.
     """
+    end = end_date + timedelta(days=1) if end_date else None
+    head, months, tail = split_full_months(start_date, end)
+
+    parts = []
+    if months is not None:
+        rollups = select(
+            MonthlyRollup.category_id,
+            MonthlyRollup.total,
+            MonthlyRollup.count
+        ).where(MonthlyRollup.user_id == user_id)
+        if months[0] is not None:
+            rollups = rollups.where(MonthlyRollup.year_month >= year_month(months[0]))
+        if months[1] is not None:
+            rollups = rollups.where(MonthlyRollup.year_month < year_month(months[1]))
+        if type:
+            rollups = rollups.where(MonthlyRollup.type == type)
+        parts.append(rollups)
+
+    for edge in (head, tail):
+        if edge is None:
+            continue
+        raw = select(
+            Transaction.category_id,
+            func.sum(Transaction.amount).label("total"),
+            func.count(Transaction.id).label("count")
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.date >= edge[0],
+            Transaction.date < edge[1]
+        ).group_by(Transaction.category_id)
+        if type:
+            raw = raw.where(Transaction.type == type)
+        parts.append(raw)
+
+    totals = (parts[0] if len(parts) == 1 else union_all(*parts)).subquery()
+    total = func.sum(totals.c.total)
+
     query = db.query(
         Category.id,
         Category.name,
         Category.color,
         Category.icon,
-        func.count(Transaction.id).label("count"),
-        func.sum(Transaction.amount).label("total")
-    ).join(Transaction).filter(Transaction.user_id == user_id).group_by(Category.id)
-
-    if type:
-        query = query.filter(Transaction.type == type)
+        func.sum(totals.c.count).label("count"),
+        total.label("total")
+    ).join(totals, totals.c.category_id == Category.id).group_by(Category.id).order_by(total.desc(), Category.id)
 
-    results = query.all()
+    if limit:
+        query = query.limit(limit)
 
-    summary = []
-    for r in results:
-        summary.append(CategorySummary(
+    return [
+        CategorySummary(
             category_id=r.id,
             category_name=r.name,
             category_color=r.color,
             category_icon=r.icon,
             total_amount=float(r.total or 0),
             transaction_count=r.count
-        ))
+        )
+        for r in query.all()
+    ]
+
 
-    # Sort by total amount descending
-    summary.sort(key=lambda x: x.total_amount, reverse=True)
+def _week_start_expr(db: Session, column):
+    """SQL expression for the Monday starting the ISO week of a date column"""
+    if db.get_bind().dialect.name == "sqlite":
+        # Forward to Sunday (or stay on it), then back to that week's Monday
+        return type_coerce(func.date(column, "weekday 0", "-6 days"), Date)
+    return cast(func.date_trunc("week", column), Date)
+
+
+def get_trends(
+    db: Session,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    granularity: str = "month"
+) -> TrendSeries:
+    """
+    Calculate income, expense and balance per month, ISO week or day over an
+    inclusive date range, in one query.
+
+    Monthly trends read whole months from the rollups and aggregate only the
+    partial months at either edge from raw transactions. Weekly and daily
+    trends group raw transactions by a bucket expression. Buckets with no
+    transactions are returned as zeros; edge buckets only count dates
+    inside the range.
+
+    Raises:
+        ValueError: if the range is reversed or spans too many buckets
+    """
+    if start_date > end_date:
+        raise ValueError("start_date must not be after end_date")
+    end = end_date + timedelta(days=1)
+    buckets = []
+    for bucket in iter_buckets(start_date, end, granularity):
+        buckets.append(bucket)
+        if len(buckets) > MAX_TREND_POINTS:
+            raise ValueError(f"Range spans more than {MAX_TREND_POINTS} {granularity} buckets")
+
+    if granularity == "month":
+        # Buckets are YYYY-MM keys from the rollups and from raw edge rows
+        head, months, tail = split_full_months(start_date, end)
+        parts = []
+        if months is not None:
+            parts.append(select(
+                MonthlyRollup.year_month.label("bucket"),
+                MonthlyRollup.type,
+                MonthlyRollup.total
+            ).where(
+                MonthlyRollup.user_id == user_id,
+                MonthlyRollup.year_month >= year_month(months[0]),
+                MonthlyRollup.year_month < year_month(months[1])
+            ))
+        for edge in (head, tail):
+            if edge is None:
+                continue
+            bucket = year_month_expr(db, Transaction.date)
+            parts.append(select(
+                bucket.label("bucket"),
+                Transaction.type,
+                func.sum(Transaction.amount).label("total")
+            ).where(
+                Transaction.user_id == user_id,
+                Transaction.date >= edge[0],
+                Transaction.date < edge[1]
+            ).group_by(bucket, Transaction.type))
+
+        totals = (parts[0] if len(parts) == 1 else union_all(*parts)).subquery()
+        query = select(
+            totals.c.bucket,
+            totals.c.type,
+            func.sum(totals.c.total)
+        ).group_by(totals.c.bucket, totals.c.type)
+    else:
+        bucket = Transaction.date if granularity == "day" else _week_start_expr(db, Transaction.date)
+        query = select(
+            bucket.label("bucket"),
+            Transaction.type,
+            func.sum(Transaction.amount)
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.date >= start_date,
+            Transaction.date < end
+        ).group_by(bucket, Transaction.type)
+
+    sums = {}
+    for bucket, txn_type, total in db.execute(query):
+        period = bucket if granularity == "month" else bucket_label(bucket, granularity)
+        sums[(period, TransactionType(txn_type).value)] = float(total or 0)
+
+    points = []
+    for bucket in buckets:
+        period = bucket_label(bucket, granularity)
+        income = sums.get((period, "income"), 0.0)
+        expense = sums.get((period, "expense"), 0.0)
+        points.append(TrendPoint(
+            period=period,
+            start=bucket,
+            total_income=income,
+            total_expense=expense,
+            balance=income - expense
+        ))
 
-    return summary
+    return TrendSeries(granularity=granularity, start_date=start_date, end_date=end_date, points=points)
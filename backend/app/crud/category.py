@@ -7,9 +7,12 @@ These functions handle all database operations for categories.
 Each function takes a database session (db) and performs operations.
 """
 
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
-from app.models import Category
+from app.core.changes import mark_user_data_changed
+from app.models import Category, Transaction
 from app.schemas import CategoryCreate, CategoryUpdate
+from .rollup import delete_category_rollups
 
 
 def get_category(db: Session, category_id: int):
@@ -53,26 +56,71 @@ def create_category(db: Session, category: CategoryCreate, user_id: int):
     return db_category
 
 
+def _category_dict(row) -> dict:
+    """Turn a RETURNING row of _CATEGORY_COLUMNS into a Category response dict."""
+    id, name, type, color, icon = row
+    return {"name": name, "type": type.value, "color": color, "icon": icon, "id": id}
+
+
+_CATEGORY_COLUMNS = (Category.id, Category.name, Category.type, Category.color, Category.icon)
+
+
 def update_category(db: Session, category_id: int, category: CategoryUpdate, user_id: int):
     """
     Update an existing category.
+
+    One ownership-scoped UPDATE ... RETURNING statement; returns the
+    category as a response dict, or None if the user has no such category.
     """
-    db_category = db.query(Category).filter(Category.id == category_id, Category.user_id == user_id).first()
-    if db_category:
-        update_data = category.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_category, key, value)
-        db.commit()
-        db.refresh(db_category)
-    return db_category
+    owned = (Category.id == category_id, Category.user_id == user_id)
+    update_data = category.model_dump(exclude_unset=True)
+    if not update_data:
+        row = db.execute(select(*_CATEGORY_COLUMNS).where(*owned)).first()
+        return _category_dict(row) if row else None
+
+    row = db.execute(
+        update(Category)
+        .where(*owned)
+        .values(**update_data)
+        .returning(*_CATEGORY_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        return None
+
+    # Bulk UPDATE bypasses the unit of work, so report the change explicitly
+    mark_user_data_changed(db, user_id)
+    db.commit()
+    return _category_dict(row)
 
 
 def delete_category(db: Session, category_id: int, user_id: int):
     """
-    Delete a category.
+    Delete a category with its transactions and rollups.
+
+    Set-based: one DELETE removes the category's transactions (only if the
+    user owns the category), one DELETE ... RETURNING removes the category,
+    and one clears its rollups, however many transactions it had. Returns
+    the category as a response dict, or None if the user has no such
+    category.
     """
-    db_category = db.query(Category).filter(Category.id == category_id, Category.user_id == user_id).first()
-    if db_category:
-        db.delete(db_category)
-        db.commit()
-    return db_category
+    owned = (Category.id == category_id, Category.user_id == user_id)
+    # Transactions go first so the foreign key holds on PostgreSQL
+    db.execute(
+        delete(Transaction)
+        .where(Transaction.category_id.in_(select(Category.id).where(*owned)))
+        .execution_options(synchronize_session=False)
+    )
+    row = db.execute(
+        delete(Category)
+        .where(*owned)
+        .returning(*_CATEGORY_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        return None
+
+    delete_category_rollups(db, category_id)
+    mark_user_data_changed(db, user_id)
+    db.commit()
+    return _category_dict(row)
@@ -0,0 +1,189 @@
+"""
+Bulk import of transactions from statement files.
+
+Rows are parsed as a stream, validated against a per-user category map
+loaded once up front, and inserted with one executemany INSERT per chunk.
+Rollup deltas are aggregated per (month, type, category) while importing
+and applied once at the end. Invalid rows are skipped and reported;
+everything else is committed in a single transaction.
+"""
+
+import math
+from datetime import date
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.core.changes import mark_user_data_changed
+from app.core.importers import RawRow, iter_csv_rows, iter_ofx_rows
+from app.models import Category, Transaction
+from app.models.category import TransactionType
+from app.schemas.transaction import ImportResult, ImportRowError
+from .rollup import RollupDeltas
+
+IMPORT_FORMATS = {"csv": iter_csv_rows, "ofx": iter_ofx_rows, "qfx": iter_ofx_rows}
+
+# Rows validated and inserted per batch
+CHUNK_SIZE = 5000
+
+# Per-row errors returned in the report (the failed count is always exact)
+MAX_REPORTED_ERRORS = 1000
+
+# Same limit as the TransactionBase schema
+MAX_DESCRIPTION_LENGTH = 200
+
+
+class _CategoryMap:
+    """A user's categories, looked up by id or case-insensitive name"""
+
+    def __init__(self, db: Session, user_id: int):
+        categories = db.query(Category.id, Category.name, Category.type).filter(Category.user_id == user_id).all()
+        self.by_id: Dict[int, TransactionType] = {c.id: c.type for c in categories}
+        self.by_name: Dict[str, Tuple[int, TransactionType]] = {
+            c.name.strip().lower(): (c.id, c.type) for c in categories
+        }
+
+
+def _validate_row(fields: Dict[str, str], categories: _CategoryMap, default_category_id: Optional[int]) -> dict:
+    """
+    Turn raw fields into Transaction column values.
+
+    Raises:
+        ValueError: with a message for the error report
+    """
+    try:
+        amount = float(fields.get("amount", "").replace(",", "").strip())
+    except ValueError:
+        raise ValueError(f"Invalid amount: {fields.get('amount')!r}")
+    if not math.isfinite(amount):
+        raise ValueError(f"Invalid amount: {fields.get('amount')!r}")
+    if amount == 0:
+        raise ValueError("Amount must not be zero")
+
+    try:
+        txn_date = date.fromisoformat(fields.get("date", "").strip())
+    except ValueError:
+        raise ValueError(f"Invalid date (expected YYYY-MM-DD): {fields.get('date')!r}")
+
+    # Category by id, then by name, then the request's default
+    category_id, category_type = None, None
+    raw_id = (fields.get("category_id") or "").strip()
+    raw_name = (fields.get("category") or "").strip().lower()
+    if raw_id:
+        if not raw_id.isdigit() or int(raw_id) not in categories.by_id:
+            raise ValueError(f"Unknown category_id: {raw_id}")
+        category_id = int(raw_id)
+        category_type = categories.by_id[category_id]
+    elif raw_name:
+        if raw_name not in categories.by_name:
+            raise ValueError(f"Unknown category: {fields.get('category')!r}")
+        category_id, category_type = categories.by_name[raw_name]
+    elif default_category_id is not None:
+        category_id = default_category_id
+        category_type = categories.by_id[default_category_id]
+    else:
+        raise ValueError("Missing category")
+
+    # Type from the row, else the sign of the amount, else the category
+    raw_type = (fields.get("type") or "").strip().lower()
+    if raw_type:
+        if raw_type not in ("income", "expense"):
+            raise ValueError(f"Invalid type: {fields.get('type')!r}")
+        txn_type = TransactionType(raw_type)
+    elif amount < 0:
+        txn_type = TransactionType.EXPENSE
+    elif "category" in fields or "category_id" in fields:
+        txn_type = category_type
+    else:
+        txn_type = TransactionType.INCOME
+
+    description = (fields.get("description") or "").strip() or None
+    if description and len(description) > MAX_DESCRIPTION_LENGTH:
+        description = description[:MAX_DESCRIPTION_LENGTH]
+
+    return {
+        "amount": abs(amount),
+        "description": description,
+        "date": txn_date,
+        "category_id": category_id,
+        "type": txn_type,
+    }
+
+
+def _insert_chunk(db: Session, rows: List[dict], rollups: RollupDeltas):
+    """Insert one validated chunk and add it to the pending rollup deltas"""
+    # Core insert on the table skips the ORM bulk path's per-row bookkeeping
+    db.execute(insert(Transaction.__table__), rows)
+
+    for row in rows:
+        rollups.add_values(row["user_id"], row["date"], row["type"], row["category_id"], row["amount"], 1)
+
+
+def import_transactions(
+    db: Session,
+    stream: BinaryIO,
+    format: str,
+    user_id: int,
+    default_category_id: Optional[int] = None
+) -> ImportResult:
+    """
+    Import transactions from a CSV or OFX statement for a user.
+
+    Args:
+        db: Database session
+        stream: Binary file object of the uploaded statement
+        format: "csv", "ofx" or "qfx"
+        user_id: ID of the importing user
+        default_category_id: Category for rows that don't name one
+            (required for OFX, which has no categories)
+
+    Returns:
+        ImportResult with the number of imported rows and per-row errors
+
+    Raises:
+        ValueError: for an unknown format or default category
+    """
+    parser = IMPORT_FORMATS.get(format)
+    if parser is None:
+        raise ValueError(f"Unsupported import format: {format}")
+
+    categories = _CategoryMap(db, user_id)
+    if default_category_id is not None and default_category_id not in categories.by_id:
+        raise ValueError("Invalid default category")
+
+    imported = 0
+    failed = 0
+    errors: List[ImportRowError] = []
+    chunk: List[dict] = []
+    # Summed per (month, type, category) and applied once at the end
+    rollups = RollupDeltas()
+
+    def flush():
+        nonlocal imported
+        if chunk:
+            _insert_chunk(db, chunk, rollups)
+            imported += len(chunk)
+            chunk.clear()
+
+    rows: Iterable[RawRow] = parser(stream)
+    for row_number, fields in rows:
+        try:
+            values = _validate_row(fields, categories, default_category_id)
+        except ValueError as e:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(ImportRowError(row=row_number, error=str(e)))
+            continue
+
+        values["user_id"] = user_id
+        chunk.append(values)
+        if len(chunk) >= CHUNK_SIZE:
+            flush()
+
+    flush()
+    rollups.apply(db)
+    if imported:
+        # The Core inserts bypass the ORM's change tracking
+        mark_user_data_changed(db, user_id)
+    db.commit()
+
+    return ImportResult(imported=imported, failed=failed, errors=errors)
@@ -0,0 +1,234 @@
+"""
+Insight analytics computed from columnar snapshots.
+
+Statistics that a single SQL GROUP BY cannot express (rolling averages,
+percentiles, per-category medians, weekday heatmaps) are computed with
+NumPy over the user's cached ColumnarSnapshot. The first call for a user
+loads the snapshot with two queries; later calls at the same data version
+(users.data_version, which callers pass in) run without touching the
+database.
+
+Every function raises InsightsUnavailable when NumPy is not installed;
+NumPy itself is imported on the first call (see app.core.columnar).
+"""
+
+from datetime import date, timedelta
+from typing import List, Optional, Sequence
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.columnar import ColumnarSnapshot, require_numpy, snapshot_cache
+from app.models import Category, Transaction
+from app.models.category import TransactionType
+from app.schemas.analytics import (
+    RollingPoint,
+    RollingAverageSeries,
+    AmountPercentiles,
+    CategoryStats,
+    WeekdayHeatmap,
+)
+from .user import get_data_version
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def load_snapshot(db: Session, user_id: int) -> ColumnarSnapshot:
+    """Read a user's transactions and categories into a new snapshot."""
+    np = require_numpy()
+    # Core execution and a SQL-side type test skip ORM row and enum processing
+    query = (
+        select(
+            Transaction.date,
+            Transaction.amount,
+            Transaction.category_id,
+            Transaction.type == TransactionType.EXPENSE
+        )
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.date)
+    )
+    # The statement picks the connection, so it runs on the user's shard
+    rows = db.connection(bind_arguments={"clause": query}).execute(query).all()
+    categories = db.execute(
+        select(Category.id, Category.name, Category.color, Category.icon).where(Category.user_id == user_id)
+    ).all()
+
+    count = len(rows)
+    dates, amounts, category_ids, expenses = zip(*rows) if rows else ((), (), (), ())
+    return ColumnarSnapshot(
+        dates=np.fromiter((d.toordinal() for d in dates), dtype=np.int32, count=count),
+        amounts=np.fromiter(amounts, dtype=np.float64, count=count),
+        category_ids=np.fromiter(category_ids, dtype=np.int32, count=count),
+        is_expense=np.fromiter(expenses, dtype=bool, count=count),
+        categories={c.id: (c.name, c.color, c.icon) for c in categories},
+    )
+
+
+def get_snapshot(db: Session, user_id: int, data_version: Optional[int] = None) -> ColumnarSnapshot:
+    """
+    Return the user's snapshot from the cache, loading it on a miss.
+
+    Pass the data version the response is tagged with (its ETag) so the
+    snapshot matches it; it is read from the database when not given.
+
+    Raises:
+        InsightsUnavailable: if NumPy is not installed
+    """
+    require_numpy()
+    if data_version is None:
+        data_version = get_data_version(db, user_id)
+    snapshot = snapshot_cache.get(user_id, data_version)
+    if snapshot is None:
+        snapshot = load_snapshot(db, user_id)
+        snapshot_cache.put(user_id, data_version, snapshot)
+    return snapshot
+
+
+def _window(snapshot: ColumnarSnapshot, start_date: date, end_date: date, type: Optional[str]):
+    """Dates, amounts and category ids of rows in [start_date, end_date] of a type"""
+    np = require_numpy()
+    if start_date > end_date:
+        raise ValueError("start_date must not be after end_date")
+    # Dates are sorted, so the range is a contiguous slice
+    lo = int(np.searchsorted(snapshot.dates, start_date.toordinal(), side="left"))
+    hi = int(np.searchsorted(snapshot.dates, end_date.toordinal(), side="right"))
+    dates = snapshot.dates[lo:hi]
+    amounts = snapshot.amounts[lo:hi]
+    category_ids = snapshot.category_ids[lo:hi]
+    if type:
+        keep = snapshot.is_expense[lo:hi] == (type == TransactionType.EXPENSE.value)
+        dates, amounts, category_ids = dates[keep], amounts[keep], category_ids[keep]
+    return dates, amounts, category_ids
+
+
+def get_rolling_average(
+    db: Session,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    window: int = 7,
+    type: Optional[str] = "expense",
+    data_version: Optional[int] = None
+) -> RollingAverageSeries:
+    """
+    Daily totals with a trailing `window`-day moving average.
+
+    The average for each day covers that day and the window - 1 days
+    before it, including days before start_date, so the first points are
+    not biased by the range edge.
+    """
+    np = require_numpy()
+    snapshot = get_snapshot(db, user_id, data_version)
+    lead_start = start_date - timedelta(days=window - 1)
+    dates, amounts, _ = _window(snapshot, lead_start, end_date, type)
+
+    days = (end_date - lead_start).days + 1
+    daily = np.bincount(dates - lead_start.toordinal(), weights=amounts, minlength=days)
+    sums = np.cumsum(daily)
+    sums[window:] = sums[window:] - sums[:-window]
+    rolling = sums / window
+
+    return RollingAverageSeries(
+        type=type,
+        window=window,
+        points=[
+            RollingPoint(date=lead_start + timedelta(days=i), total=float(daily[i]), rolling_average=float(rolling[i]))
+            for i in range(window - 1, days)
+        ],
+    )
+
+
+def get_amount_percentiles(
+    db: Session,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    percentiles: Sequence[float] = (50, 90, 99),
+    type: Optional[str] = "expense",
+    data_version: Optional[int] = None
+) -> AmountPercentiles:
+    """Distribution of individual transaction amounts in a date range."""
+    np = require_numpy()
+    snapshot = get_snapshot(db, user_id, data_version)
+    _, amounts, _ = _window(snapshot, start_date, end_date, type)
+
+    values = np.percentile(amounts, percentiles) if len(amounts) else [0.0] * len(percentiles)
+    return AmountPercentiles(
+        type=type,
+        count=int(len(amounts)),
+        mean=float(amounts.mean()) if len(amounts) else 0.0,
+        percentiles={f"p{p:g}": float(v) for p, v in zip(percentiles, values)},
+    )
+
+
+def get_category_stats(
+    db: Session,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    type: Optional[str] = "expense",
+    data_version: Optional[int] = None
+) -> List[CategoryStats]:
+    """Count, total, mean, median and 90th percentile amount per category, by total."""
+    np = require_numpy()
+    snapshot = get_snapshot(db, user_id, data_version)
+    _, amounts, category_ids = _window(snapshot, start_date, end_date, type)
+    if not len(amounts):
+        return []
+
+    # Sort by (category, amount) so each category is one sorted run
+    order = np.lexsort((amounts, category_ids))
+    amounts, category_ids = amounts[order], category_ids[order]
+    ids, starts, counts = np.unique(category_ids, return_index=True, return_counts=True)
+    totals = np.add.reduceat(amounts, starts)
+
+    stats = []
+    for category_id, start, count, total in zip(ids, starts, counts, totals):
+        run = amounts[start:start + count]
+        name, color, icon = snapshot.categories.get(int(category_id), ("", "", ""))
+        stats.append(CategoryStats(
+            category_id=int(category_id),
+            category_name=name,
+            category_color=color,
+            category_icon=icon,
+            transaction_count=int(count),
+            total_amount=float(total),
+            mean_amount=float(total / count),
+            median_amount=float(np.median(run)),
+            p90_amount=float(np.percentile(run, 90)),
+        ))
+    stats.sort(key=lambda s: (-s.total_amount, s.category_id))
+    return stats
+
+
+def get_weekday_heatmap(
+    db: Session,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    type: Optional[str] = "expense",
+    data_version: Optional[int] = None
+) -> WeekdayHeatmap:
+    """
+    Totals per weekday (rows, Monday first) and ISO week (columns).
+
+    Weeks are labelled by their Monday; the first and last week only count
+    days inside the range.
+    """
+    np = require_numpy()
+    snapshot = get_snapshot(db, user_id, data_version)
+    dates, amounts, _ = _window(snapshot, start_date, end_date, type)
+
+    first_monday = start_date - timedelta(days=start_date.weekday())
+    weeks = (end_date - first_monday).days // 7 + 1
+    offsets = dates - first_monday.toordinal()
+    cells = (offsets % 7) * weeks + offsets // 7
+    totals = np.bincount(cells, weights=amounts, minlength=7 * weeks).reshape(7, weeks)
+    counts = np.bincount(offsets % 7, minlength=7)
+
+    return WeekdayHeatmap(
+        type=type,
+        weekdays=list(WEEKDAYS),
+        weeks=[first_monday + timedelta(weeks=w) for w in range(weeks)],
+        totals=totals.round(2).tolist(),
+        weekday_totals=totals.sum(axis=1).round(2).tolist(),
+        weekday_counts=counts.tolist(),
+    )
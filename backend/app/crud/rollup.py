@@ -0,0 +1,223 @@
+"""
+CRUD operations for MonthlyRollup model.
+
+Rollups are kept in step with transactions by applying signed deltas in the
+same database transaction as every transaction write. rebuild_rollups() and
+verify_rollups() recompute them from raw rows for backfills and drift checks.
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import MonthlyRollup, Transaction
+
+# Float sums accumulate rounding error; smaller differences are not drift
+DRIFT_TOLERANCE = 0.005
+
+
+class RollupDrift(NamedTuple):
+    """A rollup row that disagrees with the raw transactions"""
+    user_id: int
+    year_month: str
+    type: str
+    category_id: int
+    expected_total: float
+    actual_total: float
+    expected_count: int
+    actual_count: int
+
+
+def year_month(value: date) -> str:
+    """Format a date as the YYYY-MM rollup key"""
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def year_month_expr(db: Session, column):
+    """SQL expression formatting a date column as YYYY-MM for the session's dialect."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m", column)
+    return func.to_char(column, "YYYY-MM")
+
+
+def _upsert_statement(db: Session):
+    """INSERT ... ON CONFLICT adding total and count to an existing rollup row"""
+    insert_fn = sqlite.insert if db.get_bind().dialect.name == "sqlite" else postgresql.insert
+    stmt = insert_fn(MonthlyRollup.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "year_month", "type", "category_id"],
+        set_={
+            "total": MonthlyRollup.__table__.c.total + stmt.excluded.total,
+            "count": MonthlyRollup.__table__.c.count + stmt.excluded.count,
+        }
+    )
+
+
+def apply_rollup_delta(
+    db: Session,
+    user_id: int,
+    txn_date: date,
+    type,
+    category_id: int,
+    amount: float,
+    count: int
+):
+    """
+    Add a signed delta to one rollup row, creating it if needed.
+
+    Does not commit; call within the transaction that writes the
+    transaction rows so both change atomically.
+
+    Args:
+        db: Database session
+        user_id: Owner of the transaction
+        txn_date: Transaction date (selects the month)
+        type: Transaction type
+        category_id: Transaction category
+        amount: Amount to add to the total (negative to subtract)
+        count: Number to add to the count (negative to subtract)
+    """
+    values = dict(
+        user_id=user_id,
+        year_month=year_month(txn_date),
+        type=type,
+        category_id=category_id,
+        total=amount,
+        count=count
+    )
+    db.execute(_upsert_statement(db), values)
+
+    # Drop rows whose last transaction moved away
+    if count < 0:
+        db.execute(delete(MonthlyRollup).where(
+            MonthlyRollup.user_id == values["user_id"],
+            MonthlyRollup.year_month == values["year_month"],
+            MonthlyRollup.type == values["type"],
+            MonthlyRollup.category_id == values["category_id"],
+            MonthlyRollup.count <= 0
+        ))
+
+
+class RollupDeltas:
+    """
+    Net rollup changes for a unit of work.
+
+    Writes record each transaction's contribution here and apply() then
+    upserts every touched rollup row, so moving a row within the same
+    month/type/category, or writing many rows to the same month, costs a
+    single statement. Rows that only grow (e.g. a bulk import) are upserted
+    together in one executemany.
+    """
+
+    def __init__(self):
+        self._deltas: Dict[Tuple, List] = defaultdict(lambda: [0.0, 0])
+
+    def add(self, transaction: Transaction, sign: int = 1):
+        """Add (sign=1) or remove (sign=-1) a transaction's contribution."""
+        self.add_values(
+            transaction.user_id,
+            transaction.date,
+            transaction.type,
+            transaction.category_id,
+            sign * transaction.amount,
+            sign
+        )
+
+    def add_values(self, user_id: int, txn_date: date, type, category_id: int, amount: float, count: int):
+        """Add a delta for a row that is not loaded as a Transaction."""
+        delta = self._deltas[(user_id, year_month(txn_date), type, category_id)]
+        delta[0] += amount
+        delta[1] += count
+
+    def apply(self, db: Session):
+        """Write the net deltas (does not commit) and reset."""
+        growing = []
+        for (user_id, month, type, category_id), (amount, count) in self._deltas.items():
+            if count == 0 and abs(amount) < 1e-9:
+                continue
+            if count < 0:
+                # May empty the row, which apply_rollup_delta then drops
+                apply_rollup_delta(db, user_id, date.fromisoformat(f"{month}-01"), type, category_id, amount, count)
+            else:
+                growing.append(dict(
+                    user_id=user_id, year_month=month, type=type, category_id=category_id, total=amount, count=count
+                ))
+        if growing:
+            db.execute(_upsert_statement(db), growing)
+        self._deltas.clear()
+
+
+def delete_category_rollups(db: Session, category_id: int):
+    """Delete all rollup rows of a category (used when the category is deleted)."""
+    db.execute(delete(MonthlyRollup).where(MonthlyRollup.category_id == category_id))
+
+
+def _aggregate_transactions(db: Session, user_id: Optional[int] = None):
+    """Select rollup rows computed from raw transactions."""
+    ym = year_month_expr(db, Transaction.date)
+    query = select(
+        Transaction.user_id,
+        ym.label("year_month"),
+        Transaction.type,
+        Transaction.category_id,
+        func.sum(Transaction.amount).label("total"),
+        func.count(Transaction.id).label("count")
+    ).where(Transaction.user_id.is_not(None))
+    if user_id is not None:
+        query = query.where(Transaction.user_id == user_id)
+    return query.group_by(Transaction.user_id, ym, Transaction.type, Transaction.category_id)
+
+
+def rebuild_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recompute rollups from raw transactions, replacing the stored rows.
+
+    Does not commit.
+
+    Args:
+        db: Database session
+        user_id: Only rebuild this user's rollups (default: all users)
+
+    Returns:
+        Number of rollup rows written
+    """
+    clear = delete(MonthlyRollup)
+    if user_id is not None:
+        clear = clear.where(MonthlyRollup.user_id == user_id)
+    db.execute(clear)
+
+    columns = ["user_id", "year_month", "type", "category_id", "total", "count"]
+    result = db.execute(insert(MonthlyRollup).from_select(columns, _aggregate_transactions(db, user_id)))
+    return result.rowcount
+
+
+def verify_rollups(db: Session, user_id: Optional[int] = None) -> List[RollupDrift]:
+    """
+    Compare stored rollups against raw transactions.
+
+    Args:
+        db: Database session
+        user_id: Only verify this user's rollups (default: all users)
+
+    Returns:
+        List of rows whose total or count differ (empty when consistent)
+    """
+    def key(r):
+        return r.user_id, r.year_month, getattr(r.type, "value", r.type), r.category_id
+
+    expected = {key(r): r for r in db.execute(_aggregate_transactions(db, user_id))}
+    stored_query = select(MonthlyRollup)
+    if user_id is not None:
+        stored_query = stored_query.where(MonthlyRollup.user_id == user_id)
+    actual = {key(r): r for r in db.scalars(stored_query)}
+
+    drift = []
+    for k in sorted(expected.keys() | actual.keys(), key=str):
+        exp, act = expected.get(k), actual.get(k)
+        exp_total, exp_count = (float(exp.total or 0), exp.count) if exp else (0.0, 0)
+        act_total, act_count = (act.total, act.count) if act else (0.0, 0)
+        if exp_count != act_count or abs(exp_total - act_total) > DRIFT_TOLERANCE:
+            drift.append(RollupDrift(*k, exp_total, act_total, exp_count, act_count))
+    return drift
@@ -0,0 +1,341 @@
+"""
+CRUD operations for the shard directory.
+
+place_user() puts a new user on their shard; move_user() moves a user's
+categories, transactions and rollups to another shard while the app keeps
+serving them (see app.core.shards for the fence that makes this safe);
+register_shards() prepares every database to hand out global ids, so rows
+keep their ids when they move. A write that commits just before a move
+starts but reloads its row after it is kept (and moved) while the request
+answers 503.
+"""
+
+from typing import Dict, List, NamedTuple, Tuple
+from sqlalchemy import Column, Integer, MetaData, String, Table, delete, func, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.shards import ID_STRIDE, PRIMARY, Shard
+from app.database import engine, read_engine, shard_map
+from app.models import Category, MonthlyRollup, Transaction, User
+
+# Users rows on shards exist for foreign keys, versions and fencing; they can
+# never be logged into (no hash matches this)
+SHADOW_PASSWORD = "!"
+
+# Rows copied per transaction when moving a user
+MOVE_CHUNK_SIZE = 5000
+
+users = User.__table__
+categories = Category.__table__
+transactions = Transaction.__table__
+rollups = MonthlyRollup.__table__
+
+# Global id counters of one database (created by migration 6)
+id_sequences = Table(
+    "id_sequences",
+    MetaData(),
+    Column("name", String, primary_key=True),
+    Column("next_value", Integer, nullable=False),
+    Column("ordinal", Integer, nullable=False),
+)
+
+# Tables whose ids come from id_sequences
+GLOBAL_ID_TABLES = (categories, transactions)
+
+
+class MovedUser(NamedTuple):
+    """Outcome of move_user"""
+    user_id: int
+    source: str
+    target: str
+    categories: int
+    transactions: int
+    rollups: int
+
+
+def _shadow_row(user_id: int, email: str, is_active: bool, data_version: int, shard: str) -> dict:
+    return {
+        "id": user_id,
+        "email": email,
+        "hashed_password": SHADOW_PASSWORD,
+        "is_active": is_active,
+        "data_version": data_version,
+        "shard": shard,
+    }
+
+
+def place_user(db: Session, db_user: User) -> str:
+    """
+    Put a newly registered user on the shard chosen by rendezvous hashing.
+
+    Creates their row on the shard first and then points the directory at
+    it, so a failure in between leaves the user on the primary, never on a
+    shard without their row. Does nothing unless sharding is enabled.
+
+    Returns:
+        Name of the user's shard
+    """
+    if not shard_map.enabled:
+        return PRIMARY
+    name = shard_map.place(db_user.id)
+    row = _shadow_row(db_user.id, db_user.email, db_user.is_active, db_user.data_version, name)
+    db.execute(insert(users).values(row), bind_arguments={"bind": db.shard_bind(name)})
+    db.commit()
+    db_user.shard = name
+    db.commit()
+    shard_map.remember(db_user.id, name)
+    return name
+
+
+def get_shard_counts(db: Session) -> Dict[str, int]:
+    """Number of users per shard, from the directory"""
+    shard = func.coalesce(User.shard, PRIMARY)
+    counts = {name: 0 for name in shard_map.shards}
+    for name, count in db.execute(select(shard, func.count(User.id)).group_by(shard)):
+        counts[name] = count
+    return counts
+
+
+def get_misplaced_users(db: Session) -> List[Tuple[int, str, str]]:
+    """
+    Users whose shard is not the one rendezvous hashing picks for them now,
+    e.g. after a shard was added or for users still on the primary.
+
+    Returns:
+        (user_id, current shard, hashed shard) tuples
+    """
+    misplaced = []
+    for user_id, shard in db.execute(select(User.id, User.shard).order_by(User.id)):
+        current, home = shard or PRIMARY, shard_map.place(user_id)
+        if current != home:
+            misplaced.append((user_id, current, home))
+    return misplaced
+
+
+def register_shards() -> Dict[str, int]:
+    """
+    Prepare every database to hand out global ids (see app.core.shards).
+
+    Gives each database an ordinal (the primary's is 0) and sets its id
+    counters above every id in use in any database, so new ids collide
+    neither with each other nor with rows created before sharding (or by a
+    process that was not yet using global ids). Idempotent; migrate.py and
+    AUTO_MIGRATE run it after migrating. Does nothing unless sharding is
+    enabled.
+
+    Returns:
+        Ordinal of each shard by name
+    """
+    if not shard_map.enabled:
+        return {}
+    # Not imported at module level, to keep app.migrations out of app startup
+    from app.migrations import migration_lock
+
+    with engine.connect() as directory, directory.begin():
+        # One registration at a time; the primary is written on this connection
+        migration_lock(directory)
+
+        ordinals, floors = {}, {table.name: 1 for table in GLOBAL_ID_TABLES}
+        for name, shard in shard_map.shards.items():
+            conn = directory if name == PRIMARY else shard.read_engine.connect()
+            try:
+                ordinals[name] = conn.execute(select(func.max(id_sequences.c.ordinal))).scalar()
+                for table in GLOBAL_ID_TABLES:
+                    top = conn.execute(select(func.max(table.c.id))).scalar() or 0
+                    floors[table.name] = max(floors[table.name], top // ID_STRIDE + 1)
+            finally:
+                if conn is not directory:
+                    conn.close()
+
+        if ordinals[PRIMARY] is None:
+            ordinals[PRIMARY] = 0
+        for name in shard_map.placement:
+            if ordinals[name] is None:
+                free = [n for n in range(ID_STRIDE) if n not in ordinals.values()]
+                if not free:
+                    raise ValueError(f"At most {ID_STRIDE} databases can hand out global ids")
+                ordinals[name] = free[0]
+        if len(set(ordinals.values())) != len(ordinals):
+            raise ValueError(f"Two databases share an id ordinal (copied shard file?): {ordinals}")
+
+        for name, shard in shard_map.shards.items():
+            if name == PRIMARY:
+                _seed_id_sequences(directory, ordinals[name], floors)
+            else:
+                with shard.engine.begin() as conn:
+                    _seed_id_sequences(conn, ordinals[name], floors)
+    return ordinals
+
+
+def _seed_id_sequences(conn: Connection, ordinal: int, floors: Dict[str, int]):
+    existing = dict(conn.execute(select(id_sequences.c.name, id_sequences.c.next_value)).all())
+    for name, floor in floors.items():
+        if name not in existing:
+            conn.execute(insert(id_sequences).values(name=name, next_value=floor, ordinal=ordinal))
+        elif existing[name] < floor:
+            conn.execute(update(id_sequences).where(id_sequences.c.name == name).values(next_value=floor))
+
+
+def _delete_user_data(conn: Connection, user_id: int):
+    for table in (rollups, transactions, categories):
+        conn.execute(delete(table).where(table.c.user_id == user_id))
+
+
+def _point_directory(conn: Connection, user_id: int, name: str):
+    shard = None if name == PRIMARY else name
+    conn.execute(update(users).where(users.c.id == user_id).values(shard=shard, moving_to=None))
+
+
+def _holding(shard: Shard):
+    """Where-clause: the user's row on `shard` says the shard holds their data"""
+    return func.coalesce(users.c.shard, PRIMARY) == shard.name
+
+
+def _holds_user(shard: Shard, user_id: int) -> bool:
+    with shard.read_engine.connect() as conn:
+        return conn.execute(select(users.c.id).where(users.c.id == user_id, _holding(shard))).first() is not None
+
+
+def _clear_leftovers(shard: Shard, user_id: int) -> bool:
+    """Delete a user's rows from a shard that does not hold them (left by an interrupted move)"""
+    with shard.read_engine.connect() as conn:
+        tables = [categories, transactions, rollups]
+        found = any(
+            conn.execute(select(table.c.user_id).where(table.c.user_id == user_id).limit(1)).first()
+            for table in tables
+        ) or (shard.name != PRIMARY and conn.execute(select(users.c.id).where(users.c.id == user_id)).first())
+    if not found:
+        return False
+    with shard.engine.begin() as conn:
+        if conn.execute(select(users.c.id).where(users.c.id == user_id, _holding(shard))).first():
+            return False
+        _delete_user_data(conn, user_id)
+        if shard.name != PRIMARY:
+            conn.execute(delete(users).where(users.c.id == user_id))
+    return True
+
+
+def _copy_user(source: Shard, dest: Shard, user_id: int) -> Tuple[int, int, int]:
+    """Copy a fenced user's rows from source to dest (step 2 of move_user)"""
+    with source.read_engine.connect() as src:
+        shadow = src.execute(select(users).where(users.c.id == user_id)).mappings().one()
+        category_rows = src.execute(
+            select(categories).where(categories.c.user_id == user_id).order_by(categories.c.id)
+        ).mappings().all()
+        transaction_rows = src.execute(
+            select(transactions).where(transactions.c.user_id == user_id).order_by(transactions.c.id)
+        ).mappings().all()
+        rollup_rows = src.execute(select(rollups).where(rollups.c.user_id == user_id)).mappings().all()
+
+    owned = {row["id"] for row in category_rows}
+    foreign = {row["category_id"] for row in (*transaction_rows, *rollup_rows)} - owned
+    if foreign:
+        raise ValueError(
+            f"User {user_id} has rows in categories that are not theirs ({sorted(foreign)}); fix them first"
+        )
+
+    with dest.engine.connect() as dst:
+        with dst.begin():
+            _delete_user_data(dst, user_id)
+            if dest.name != PRIMARY:
+                dst.execute(delete(users).where(users.c.id == user_id))
+                # Outside the fence (shard NULL) until the copy is complete
+                dst.execute(insert(users).values(
+                    _shadow_row(user_id, shadow["email"], shadow["is_active"], shadow["data_version"], None)
+                ))
+        for table, rows in ((categories, category_rows), (transactions, transaction_rows), (rollups, rollup_rows)):
+            for start in range(0, len(rows), MOVE_CHUNK_SIZE):
+                with dst.begin():
+                    dst.execute(insert(table), [dict(row) for row in rows[start:start + MOVE_CHUNK_SIZE]])
+        with dst.begin():
+            dst.execute(update(users).where(users.c.id == user_id).values(data_version=shadow["data_version"] + 1))
+            if dest.name == PRIMARY:
+                _point_directory(dst, user_id, PRIMARY)
+            else:
+                dst.execute(update(users).where(users.c.id == user_id).values(shard=dest.name))
+    return len(category_rows), len(transaction_rows), len(rollup_rows)
+
+
+def move_user(user_id: int, target: str) -> MovedUser:
+    """
+    Move a user's categories, transactions and rollups to another shard.
+
+    Rows keep their ids. The user keeps using the app meanwhile:
+
+    1. Set moving_to on the user's row on the source and commit. From then
+       on their writes fail the fence and are retried (503); their reads
+       keep being served from the source.
+    2. Copy the rows to the target (replacing leftovers of an interrupted
+       move), MOVE_CHUNK_SIZE rows per transaction, so no shard stays locked
+       for the whole copy. The user's row on the target joins the fence,
+       at data_version + 1, once the copy is complete.
+    3. Delete the rows and the user's row from the source and commit.
+       Stale-routed requests now fail the fence and are retried (503).
+    4. Point the directory at the target.
+
+    When the source or the target is the primary, the directory is updated
+    in that step's transaction instead. Rerunning an interrupted move
+    finishes it. A move that cannot be made (rows in another user's
+    category, ids already taken on the target) lifts the fence again and
+    raises.
+
+    Args:
+        user_id: User to move
+        target: Name of the shard to move them to
+
+    Returns:
+        The shards involved and the number of rows moved
+    """
+    with read_engine.connect() as conn:
+        user = conn.execute(select(users.c.id, users.c.shard).where(users.c.id == user_id)).first()
+    if user is None:
+        raise ValueError(f"No user {user_id}")
+    source, dest = shard_map.get(user.shard or PRIMARY), shard_map.get(target)
+    if source is dest:
+        # Finish an interrupted move that had already reached the directory
+        for shard in shard_map.shards.values():
+            if shard is not source:
+                _clear_leftovers(shard, user_id)
+        return MovedUser(user_id, source.name, dest.name, 0, 0, 0)
+
+    with source.engine.begin() as src:
+        fenced = src.execute(
+            select(users.c.moving_to).where(users.c.id == user_id, _holding(source)).with_for_update()
+        ).first()
+        if fenced is not None:
+            src.execute(update(users).where(users.c.id == user_id).values(moving_to=dest.name))
+    if fenced is None:
+        # Interrupted after step 3: the data is already on the target
+        if not _holds_user(dest, user_id):
+            raise ValueError(f"Shard {source.name} does not hold user {user_id}; move them from where they are")
+        with engine.begin() as directory:
+            _point_directory(directory, user_id, dest.name)
+        shard_map.forget(user_id)
+        return MovedUser(user_id, source.name, dest.name, 0, 0, 0)
+    if fenced.moving_to not in (None, dest.name) and fenced.moving_to in shard_map.shards:
+        # An interrupted move to another shard left rows there
+        _clear_leftovers(shard_map.get(fenced.moving_to), user_id)
+
+    try:
+        counts = _copy_user(source, dest, user_id)
+    except Exception as e:
+        _clear_leftovers(dest, user_id)
+        with source.engine.begin() as src:
+            src.execute(update(users).where(users.c.id == user_id).values(moving_to=None))
+        if isinstance(e, IntegrityError):
+            raise ValueError(f"Could not copy user {user_id} to {dest.name} (ids in use there?): {e.orig}") from e
+        raise
+
+    with source.engine.begin() as src:
+        _delete_user_data(src, user_id)
+        if source.name == PRIMARY:
+            _point_directory(src, user_id, dest.name)
+        else:
+            src.execute(delete(users).where(users.c.id == user_id))
+
+    if PRIMARY not in (source.name, dest.name):
+        with engine.begin() as directory:
+            _point_directory(directory, user_id, dest.name)
+    shard_map.forget(user_id)
+    return MovedUser(user_id, source.name, dest.name, *counts)
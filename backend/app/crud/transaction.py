@@ -2,13 +2,74 @@
 CRUD operations for Transaction model.
 
 These functions handle all database operations for transactions.
+Every write also updates the monthly rollups in the same commit.
+The _add/_change/_remove helpers stage a write and its rollup delta without
+committing, for create_transaction and apply_transaction_batch. Single-row
+updates and deletes instead run as one ownership-scoped UPDATE/DELETE ...
+RETURNING and return response dicts.
+
+Responses nest each transaction's category, so every read path loads it
+eagerly with joinedload; otherwise serializing a list would issue one lazy
+SELECT per distinct category.
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, extract
-from datetime import date, datetime
-from app.models import Transaction
-from app.schemas import TransactionCreate, TransactionUpdate
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import delete, or_, select, true, update
+from datetime import date
+from typing import List, Optional, Tuple
+from app.core.changes import mark_user_data_changed
+from app.core.periods import month_range, period_range
+from app.models import Category, Transaction
+from app.schemas import (
+    Transaction as TransactionSchema,
+    TransactionCreate,
+    TransactionUpdate,
+    BatchOperation,
+    BatchCreate,
+    BatchUpdate,
+    BatchDelete,
+    BatchItemResult,
+)
+from .rollup import RollupDeltas
+
+# Fields that decide which rollup row a transaction contributes to
+ROLLUP_FIELDS = ("amount", "date", "type", "category_id")
+
+# Transaction columns of a response row, followed by its category's
+# name, type, color and icon (see _row_to_dict)
+_ROW_COLUMNS = (
+    Transaction.id,
+    Transaction.amount,
+    Transaction.description,
+    Transaction.date,
+    Transaction.category_id,
+    Transaction.type,
+)
+
+
+def _query_with_category(db: Session):
+    """Transaction query that loads the nested category in the same statement."""
+    return db.query(Transaction).options(joinedload(Transaction.category))
+
+
+def _filter_transactions(query, user_id: int, type: str, category_id: int, start_date: date, end_date: date):
+    """Apply the list/export filters to a Query or select()."""
+    query = query.filter(Transaction.user_id == user_id)
+
+    # Apply filters if provided
+    if type:
+        query = query.filter(Transaction.type == type)
+
+    if category_id:
+        query = query.filter(Transaction.category_id == category_id)
+
+    if start_date:
+        query = query.filter(Transaction.date >= start_date)
+
+    if end_date:
+        query = query.filter(Transaction.date <= end_date)
+
+    return query
 
 
 def get_transaction(db: Session, transaction_id: int):
@@ -22,7 +83,7 @@ def get_transaction(db: Session, transaction_id: int):
     Returns:
         Transaction object or None
     """
-    return db.query(Transaction).filter(Transaction.id == transaction_id).first()
+    return _query_with_category(db).filter(Transaction.id == transaction_id).first()
 
 
 def get_transactions(
@@ -33,11 +94,17 @@ def get_transactions(
     category_id: int = None,
     start_date: date = None,
     end_date: date = None,
-    user_id: int = None
+    user_id: int = None,
+    cursor: Optional[Tuple[date, int]] = None
 ):
     """
     Get transactions with optional filtering, scoped to user.
 
+    Rows are ordered by (date, id) newest first. Passing the (date, id) of the
+    last row of a page as `cursor` returns the rows that follow it, which lets
+    the database seek straight to the next page instead of scanning and
+    discarding `skip` rows.
+
     Args:
         db: Database session
         skip: Number of records to skip
@@ -47,27 +114,156 @@ def get_transactions(
         start_date: Filter transactions from this date
         end_date: Filter transactions until this date
         user_id: ID of the user
+        cursor: (date, id) of the last row of the previous page
 
     Returns:
         List of Transaction objects
     """
-    query = db.query(Transaction).filter(Transaction.user_id == user_id)
+    query = _filter_transactions(
+        _query_with_category(db), user_id, type, category_id, start_date, end_date
+    )
+    return _paginate(query, skip, limit, cursor).all()
+
+
+def _paginate(query, skip: int, limit: int, cursor: Optional[Tuple[date, int]]):
+    """Order a Query or select() newest first and apply offset/keyset pagination."""
+    # Keyset pagination: continue strictly after the cursor row.
+    # The redundant `date <= cursor_date` bound lets the database seek into
+    # the (user_id, date, id) index instead of scanning from the newest row.
+    if cursor:
+        cursor_date, cursor_id = cursor
+        query = query.filter(
+            Transaction.date <= cursor_date,
+            or_(Transaction.date < cursor_date, Transaction.id < cursor_id)
+        )
 
-    # Apply filters if provided
-    if type:
-        query = query.filter(Transaction.type == type)
+    # Order by date (newest first), id as tie-breaker, and apply pagination
+    query = query.order_by(Transaction.date.desc(), Transaction.id.desc())
+    if skip:
+        query = query.offset(skip)
+    return query.limit(limit)
 
-    if category_id:
-        query = query.filter(Transaction.category_id == category_id)
 
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
+def get_transaction_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    type: str = None,
+    category_id: int = None,
+    start_date: date = None,
+    end_date: date = None,
+    user_id: int = None,
+    cursor: Optional[Tuple[date, int]] = None
+) -> List[dict]:
+    """
+    Same page as get_transactions, as plain dicts shaped like the
+    Transaction response schema.
 
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
+    Selects the transaction and category columns as row tuples, so no ORM
+    entities are built; the result can be encoded without re-validation
+    (see app.core.responses).
+
+    Returns:
+        List of transaction dicts with a nested "category" dict
+    """
+    stmt = _filter_transactions(
+        select(*_ROW_COLUMNS, Category.name, Category.type, Category.color, Category.icon)
+        .join(Category, Transaction.category_id == Category.id),
+        user_id, type, category_id, start_date, end_date
+    )
+    rows = db.execute(_paginate(stmt, skip, limit, cursor)).tuples()
+    return [_row_to_dict(row) for row in rows]
+
+
+def _row_to_dict(row) -> dict:
+    """Turn a _ROW_COLUMNS-ordered row into a Transaction response dict."""
+    id, amount, description, txn_date, txn_category_id, txn_type, name, category_type, color, icon = row
+    return {
+        "amount": amount,
+        "description": description,
+        "date": txn_date,
+        "category_id": txn_category_id,
+        "type": txn_type.value,
+        "id": id,
+        "category": {
+            "name": name,
+            "type": category_type.value,
+            "color": color,
+            "icon": icon,
+            "id": txn_category_id,
+        },
+    }
+
+
+def iter_transaction_rows(
+    db: Session,
+    user_id: int,
+    type: str = None,
+    category_id: int = None,
+    start_date: date = None,
+    end_date: date = None,
+    batch_size: int = 1000
+):
+    """
+    Stream a user's transactions as plain row tuples, newest first.
+
+    Rows come from a server-side cursor in batches of `batch_size`, without
+    building ORM objects, so memory stays flat however much history is
+    exported. The session must stay open while the iterator is consumed.
+
+    Args:
+        db: Database session
+        user_id: ID of the user
+        type, category_id, start_date, end_date: Same filters as get_transactions
+        batch_size: Rows fetched from the cursor at a time
+
+    Yields:
+        Lists of (id, date, type, amount, category_id, category, description) rows
+    """
+    stmt = _filter_transactions(
+        select(
+            Transaction.id,
+            Transaction.date,
+            Transaction.type,
+            Transaction.amount,
+            Transaction.category_id,
+            Category.name,
+            Transaction.description,
+        ).join(Category, Transaction.category_id == Category.id),
+        user_id, type, category_id, start_date, end_date
+    ).order_by(Transaction.date.desc(), Transaction.id.desc())
+
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    yield from result.partitions()
+
+
+def get_transactions_by_period(
+    db: Session,
+    user_id: int,
+    year: int,
+    month: Optional[int] = None,
+    quarter: Optional[int] = None,
+    week: Optional[int] = None
+):
+    """
+    Get all transactions for a calendar period and user.
+
+    The period is resolved to a half-open date range so the
+    (user_id, date) index can serve it as a range scan.
+
+    Args:
+        db: Database session
+        user_id: ID of the user
+        year: Year (e.g., 2024)
+        month: Month (1-12)
+        quarter: Quarter (1-4)
+        week: ISO week number
 
-    # Order by date (newest first) and apply pagination
-    return query.order_by(Transaction.date.desc()).offset(skip).limit(limit).all()
+    Returns:
+        List of Transaction objects
+    """
+    start, end = period_range(year, month=month, quarter=quarter, week=week)
+    return _get_transactions_in_range(db, user_id, start, end)
 
 
 def get_transactions_by_month(db: Session, year: int, month: int, user_id: int):
@@ -83,13 +279,50 @@ def get_transactions_by_month(db: Session, year: int, month: int, user_id: int):
     Returns:
         List of Transaction objects
     """
-    return db.query(Transaction).filter(
-        and_(
-            extract('year', Transaction.date) == year,
-            extract('month', Transaction.date) == month,
-            Transaction.user_id == user_id
-        )
-    ).order_by(Transaction.date.desc()).all()
+    start, end = month_range(year, month)
+    return _get_transactions_in_range(db, user_id, start, end)
+
+
+def _get_transactions_in_range(db: Session, user_id: int, start: date, end: date):
+    """Get a user's transactions in the half-open range [start, end), newest first."""
+    return _query_with_category(db).filter(
+        Transaction.user_id == user_id,
+        Transaction.date >= start,
+        Transaction.date < end
+    ).order_by(Transaction.date.desc(), Transaction.id.desc()).all()
+
+
+def _add_transaction(
+    db: Session, rollups: RollupDeltas, transaction: TransactionCreate, user_id: int
+) -> Transaction:
+    """Stage a new transaction and its rollup contribution (no commit)."""
+    db_transaction = Transaction(**transaction.model_dump(), user_id=user_id)
+    db.add(db_transaction)
+    rollups.add(db_transaction)
+    return db_transaction
+
+
+def _change_transaction(rollups: RollupDeltas, db_transaction: Transaction, transaction: TransactionUpdate):
+    """Stage updates to a loaded transaction and move its rollups (no commit)."""
+    # Update only provided fields
+    update_data = transaction.model_dump(exclude_unset=True)
+    moves_rollup = any(field in update_data for field in ROLLUP_FIELDS)
+
+    # Take the old contribution out before the row changes month/category/type
+    if moves_rollup:
+        rollups.add(db_transaction, sign=-1)
+
+    for field, value in update_data.items():
+        setattr(db_transaction, field, value)
+
+    if moves_rollup:
+        rollups.add(db_transaction)
+
+
+def _remove_transaction(db: Session, rollups: RollupDeltas, db_transaction: Transaction):
+    """Stage deleting a loaded transaction and its rollup contribution (no commit)."""
+    db.delete(db_transaction)
+    rollups.add(db_transaction, sign=-1)
 
 
 def create_transaction(db: Session, transaction: TransactionCreate, user_id: int):
@@ -104,17 +337,45 @@ def create_transaction(db: Session, transaction: TransactionCreate, user_id: int
     Returns:
         Created Transaction object
     """
-    db_transaction = Transaction(**transaction.model_dump(), user_id=user_id)
-    db.add(db_transaction)
+    rollups = RollupDeltas()
+    db_transaction = _add_transaction(db, rollups, transaction, user_id)
+    rollups.apply(db)
+    db.flush()
+    transaction_id = db_transaction.id
     db.commit()
-    db.refresh(db_transaction)
-    return db_transaction
+
+    # Reload with its category in one statement (instead of refresh + lazy load)
+    return get_transaction(db, transaction_id)
+
+
+def _returning_row():
+    """
+    Columns of a response row for UPDATE/DELETE ... RETURNING.
+
+    RETURNING can only name the modified table, so the category's fields
+    are correlated scalar subqueries; the row still comes back in the same
+    statement and round trip.
+    """
+    category_columns = (
+        select(column).where(Category.id == Transaction.category_id).correlate(Transaction).scalar_subquery()
+        for column in (Category.name, Category.type, Category.color, Category.icon)
+    )
+    return (*_ROW_COLUMNS, *category_columns)
 
 
 def update_transaction(db: Session, transaction_id: int, transaction: TransactionUpdate, user_id: int):
     """
     Update an existing transaction, scoped to user.
 
+    Runs as UPDATE ... WHERE id = :id AND user_id = :user_id RETURNING, so
+    ownership check, write and reload are one statement; a new category_id
+    must name one of the user's categories (an EXISTS in the same WHERE
+    clause). Changes to the amount, date, type or category also need the
+    old values to move the rollups: PostgreSQL returns them from the same
+    UPDATE (joined to the locked old row); other databases, and category
+    changes, read them first with SELECT ... FOR UPDATE, which also checks
+    the new category before anything is written.
+
     Args:
         db: Database session
         transaction_id: ID of transaction to update
@@ -122,49 +383,209 @@ def update_transaction(db: Session, transaction_id: int, transaction: Transactio
         user_id: ID of the user who owns the transaction
 
     Returns:
-        Updated Transaction object or None
-    """
-    db_transaction = db.query(Transaction).filter(
-        Transaction.id == transaction_id,
-        Transaction.user_id == user_id
-    ).first()
-
-    if db_transaction is None:
-        return None
+        Updated transaction as a response dict, or None if the user has no
+        such transaction
 
-    # Update only provided fields
+    Raises:
+        ValueError: if category_id is not one of the user's categories
+    """
+    owned = (Transaction.id == transaction_id, Transaction.user_id == user_id)
     update_data = transaction.model_dump(exclude_unset=True)
+    if not update_data:
+        row = db.execute(
+            select(*_ROW_COLUMNS, Category.name, Category.type, Category.color, Category.icon)
+            .join(Category, Transaction.category_id == Category.id)
+            .where(*owned)
+        ).first()
+        return _row_to_dict(row) if row else None
+
+    stmt = (
+        update(Transaction)
+        .values(**update_data)
+        .returning(*_returning_row())
+        .execution_options(synchronize_session=False)
+    )
+    new_category = "category_id" in update_data
+    if new_category:
+        owns_category = (
+            select(Category.id)
+            .where(Category.id == update_data["category_id"], Category.user_id == user_id)
+            .exists()
+        )
+        stmt = stmt.where(owns_category)
+    old = None
+    if not any(field in update_data for field in ROLLUP_FIELDS):
+        row = db.execute(stmt.where(*owned)).first()
+    elif db.get_bind().dialect.name == "postgresql" and not new_category:
+        locked = select(
+            Transaction.id, Transaction.amount, Transaction.date, Transaction.type, Transaction.category_id
+        ).where(*owned).with_for_update().subquery("old")
+        row = db.execute(
+            stmt.where(Transaction.id == locked.c.id)
+            .returning(locked.c.amount, locked.c.date, locked.c.type, locked.c.category_id)
+        ).first()
+        old = row[-4:] if row else None
+    else:
+        # The same read checks a new category, so a foreign one writes nothing
+        old = db.execute(
+            select(
+                Transaction.amount,
+                Transaction.date,
+                Transaction.type,
+                Transaction.category_id,
+                owns_category if new_category else true()
+            )
+            .where(*owned)
+            .with_for_update()
+        ).first()
+        if old is not None and not old[-1]:
+            raise ValueError("Invalid category")
+        row = db.execute(stmt.where(*owned)).first() if old else None
+        old = old[:4] if old else None
+
+    if row is None:
+        # Only when nothing matched: tell a foreign category from a missing transaction
+        if new_category and (old is not None or db.execute(select(Transaction.id).where(*owned)).first()):
+            raise ValueError("Invalid category")
+        return None
 
-    for field, value in update_data.items():
-        setattr(db_transaction, field, value)
+    if old is not None:
+        rollups = RollupDeltas()
+        old_amount, old_date, old_type, old_category_id = old
+        rollups.add_values(user_id, old_date, old_type, old_category_id, -old_amount, -1)
+        _, amount, _, new_date, category_id, new_type = row[:6]
+        rollups.add_values(user_id, new_date, new_type, category_id, amount, 1)
+        rollups.apply(db)
 
+    # Bulk UPDATE bypasses the unit of work, so report the change explicitly
+    mark_user_data_changed(db, user_id)
     db.commit()
-    db.refresh(db_transaction)
-
-    return db_transaction
+    return _row_to_dict(row[:10])
 
 
 def delete_transaction(db: Session, transaction_id: int, user_id: int):
     """
     Delete a transaction, scoped to user.
 
+    Runs as DELETE ... WHERE id = :id AND user_id = :user_id RETURNING; the
+    returned row is both the response and the rollup contribution to
+    remove.
+
     Args:
         db: Database session
         transaction_id: ID of transaction to delete
         user_id: ID of the user who owns the transaction
 
     Returns:
-        Deleted Transaction object or None
+        Deleted transaction as a response dict, or None if the user has no
+        such transaction
     """
-    db_transaction = db.query(Transaction).filter(
-        Transaction.id == transaction_id,
-        Transaction.user_id == user_id
+    row = db.execute(
+        delete(Transaction)
+        .where(Transaction.id == transaction_id, Transaction.user_id == user_id)
+        .returning(*_returning_row())
+        .execution_options(synchronize_session=False)
     ).first()
 
-    if db_transaction is None:
+    if row is None:
         return None
 
-    db.delete(db_transaction)
+    rollups = RollupDeltas()
+    _, amount, _, txn_date, category_id, txn_type = row[:6]
+    rollups.add_values(user_id, txn_date, txn_type, category_id, -amount, -1)
+    rollups.apply(db)
+
+    mark_user_data_changed(db, user_id)
     db.commit()
+    return _row_to_dict(row)
 
-    return db_transaction
+
+def apply_transaction_batch(db: Session, operations: List[BatchOperation], user_id: int) -> List[BatchItemResult]:
+    """
+    Apply a list of create/update/delete operations in one commit.
+
+    Ownership is checked with two set-based queries up front: one loading
+    every targeted transaction the user owns, one listing which referenced
+    categories belong to the user. Operations that fail those checks are
+    reported and skipped; all others are applied in order and committed
+    together. Created and updated rows are then reloaded with their
+    categories in a single query.
+
+    Args:
+        db: Database session
+        operations: BatchCreate, BatchUpdate and BatchDelete items
+        user_id: ID of the user making the changes
+
+    Returns:
+        One BatchItemResult per operation, in request order
+    """
+    target_ids = {op.id for op in operations if not isinstance(op, BatchCreate)}
+    category_ids = {
+        op.data.category_id for op in operations
+        if not isinstance(op, BatchDelete) and op.data.category_id is not None
+    }
+
+    owned = {}
+    if target_ids:
+        owned = {
+            t.id: t for t in _query_with_category(db).filter(
+                Transaction.user_id == user_id,
+                Transaction.id.in_(target_ids)
+            )
+        }
+    owned_categories = set()
+    if category_ids:
+        owned_categories = {
+            row.id for row in db.query(Category.id).filter(
+                Category.user_id == user_id,
+                Category.id.in_(category_ids)
+            )
+        }
+
+    rollups = RollupDeltas()
+    results: List[BatchItemResult] = []
+    written: List[Tuple[BatchItemResult, Transaction]] = []
+
+    for index, op in enumerate(operations):
+        result = BatchItemResult(index=index, op=op.op, status=200, id=getattr(op, "id", None))
+        results.append(result)
+
+        if not isinstance(op, BatchCreate) and op.id not in owned:
+            result.status, result.error = 404, "Transaction not found"
+            continue
+        if not isinstance(op, BatchDelete) and op.data.category_id is not None \
+                and op.data.category_id not in owned_categories:
+            result.status, result.error = 400, "Invalid category"
+            continue
+
+        if isinstance(op, BatchCreate):
+            result.status = 201
+            written.append((result, _add_transaction(db, rollups, op.data, user_id)))
+        elif isinstance(op, BatchUpdate):
+            _change_transaction(rollups, owned[op.id], op.data)
+            written.append((result, owned[op.id]))
+        else:
+            # Later operations in the batch can no longer see this row
+            db_transaction = owned.pop(op.id)
+            _remove_transaction(db, rollups, db_transaction)
+            written.append((result, db_transaction))
+
+    rollups.apply(db)
+    db.flush()
+    for result, db_transaction in written:
+        result.id = db_transaction.id
+    db.commit()
+
+    # Reload created and updated rows with their (possibly changed) categories
+    live_ids = {result.id for result, _ in written if result.op != "delete"}
+    reloaded = {}
+    if live_ids:
+        reloaded = {
+            t.id: t for t in _query_with_category(db)
+            .filter(Transaction.id.in_(live_ids))
+            .populate_existing()
+        }
+    for result, db_transaction in written:
+        result.transaction = TransactionSchema.model_validate(reloaded.get(result.id, db_transaction))
+
+    return results
@@ -0,0 +1,73 @@
+"""
+CRUD operations for User model.
+
+These functions handle all database operations for users.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import User
+from .shard import place_user
+
+
+def get_user(db: Session, user_id: int):
+    """
+    Get a single user by ID.
+    """
+    return db.get(User, user_id)
+
+
+def get_data_version(db: Session, user_id: int) -> int:
+    """
+    Get the user's data version, which changes whenever their transactions
+    or categories do (read from the user's shard when sharding is enabled).
+    """
+    query = select(User.data_version).where(User.id == user_id).execution_options(user_shard=True)
+    return db.execute(query).scalar() or 0
+
+
+def get_user_by_email(db: Session, email: str):
+    """
+    Get a single user by email address.
+    """
+    return db.query(User).filter(User.email == email).first()
+
+
+def create_user(db: Session, email: str, hashed_password: str):
+    """
+    Create a new user with an already-hashed password.
+
+    With sharding enabled, the user is then placed on their shard.
+    """
+    db_user = User(email=email, hashed_password=hashed_password)
+    db.add(db_user)
+    db.commit()
+    place_user(db, db_user)
+    db.refresh(db_user)
+    return db_user
+
+
+def set_user_active(db: Session, user_id: int, is_active: bool):
+    """
+    Activate or deactivate a user.
+
+    The user's cached authentication record is invalidated on commit, so a
+    deactivated user is rejected on their next request.
+    """
+    db_user = db.get(User, user_id)
+    if db_user:
+        db_user.is_active = is_active
+        db.commit()
+        db.refresh(db_user)
+    return db_user
+
+
+def set_user_password_hash(db: Session, user_id: int, hashed_password: str):
+    """
+    Replace a user's password hash (e.g. after rehashing with a new work factor).
+    """
+    db_user = db.get(User, user_id)
+    if db_user:
+        db_user.hashed_password = hashed_password
+        db.commit()
+    return db_user
@@ -5,13 +5,39 @@ This module handles:
 - Database connection using SQLAlchemy
 - Support for both SQLite (local development) and PostgreSQL (production)
 - Session management for database operations
+- An optional async mode (DATABASE_ASYNC=true) that serves requests from an
+  AsyncEngine using the aiosqlite / asyncpg drivers
+- Connection pooling per deployment profile (DB_PROFILE: serverless or
+  server), with checkout latency and saturation metrics
+- An opt-in SQLite performance profile (SQLITE_PROFILE=performance): WAL and
+  tuned pragmas, with writes serialized through one connection and reads served by a pool
+  (get_db for endpoints that write, get_read_db for read-only endpoints)
+- Optional read replicas (DATABASE_REPLICA_URLS) behind get_read_db, with
+  read-your-writes stickiness and fallback to the primary (see
+  app.core.replicas)
+- Optional sharding by user (DATABASE_SHARD_URLS): sessions send per-user
+  tables to the user's shard and the users table to the directory
+  (DATABASE_URL), see app.core.shards
+- Per-request SQL statement counts and timings (see app.core.metrics), and a
+  slow-query log with query plans (see app.core.slow_queries)
 """
 
 import os
-from sqlalchemy import create_engine
+from typing import Union
+from uuid import uuid4
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.sql.util import find_tables
+from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
+from .core.pool_metrics import PoolMetrics
+from .core.metrics import instrument_engine
+from .core.slow_queries import slow_query_log
+from .core.replicas import Replica, ReplicaRouter, request_user
+from .core.shards import PRIMARY, Shard, ShardMap, ShardMoved, fence_statement
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,27 +45,426 @@ load_dotenv()
 # Get database URL from environment variable, default to SQLite for local development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app_v2.db")
 
-# For SQLite, we need to enable check_same_thread=False to allow multiple threads
-# For PostgreSQL, this is not needed
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
-else:
+# Deployment profile:
+# - "serverless" (Vercel/Mangum): many short-lived instances each serving one
+#   request at a time, so every instance holding a pool exhausts PostgreSQL
+#   connections under bursts. Defaults to NullPool (connect per checkout,
+#   best behind PgBouncer / a pooled connection URL).
+# - "server" (long-running uvicorn): a pool shared by concurrent requests.
+DB_PROFILE = os.getenv("DB_PROFILE", "serverless" if os.getenv("VERCEL") else "server")
+_serverless = DB_PROFILE == "serverless"
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    """Read a true/false environment variable"""
+    return os.getenv(name, "true" if default else "false").lower() in ("1", "true", "yes")
+
+
+# Pooled connections per engine (0 = NullPool), extra connections allowed
+# under load, seconds to wait for a free one, and seconds after which a
+# connection is replaced (below server/proxy idle timeouts)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0" if _serverless else "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "0" if _serverless else "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10" if _serverless else "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300" if _serverless else "1800"))
+# Test pooled connections with a lightweight ping before handing them out
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", True)
+# PgBouncer (transaction pooling) compatibility: no server-side prepared
+# statements, which do not survive being moved between server connections
+DB_PGBOUNCER = _env_flag("DB_PGBOUNCER", _serverless)
+
+# Read replicas (comma-separated URLs) for read-only endpoints, how long a
+# user's reads stay on the primary after they write, how often replicas are
+# health-checked and how far (seconds) a PostgreSQL replica may lag
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "10"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+
+# Shards holding users' categories, transactions and rollups
+# (comma-separated name=url pairs; DATABASE_URL then serves as the user
+# directory), and how long a user's shard is cached per process
+DATABASE_SHARD_URLS = os.getenv("DATABASE_SHARD_URLS", "")
+SHARD_DIRECTORY_CACHE_SECONDS = float(os.getenv("SHARD_DIRECTORY_CACHE_SECONDS", "60"))
+
+# SQLite profile for file databases:
+# - "performance": WAL journal (readers never block the writer or each other),
+#   synchronous=NORMAL (durable at checkpoints; a power loss can drop the last
+#   commits but never corrupts), a larger page cache, memory-mapped reads, a
+#   busy timeout instead of immediate "database is locked", and in-memory temp
+#   tables. Writes go through a single connection (so app writers queue in the
+#   pool instead of fighting over the lock) while reads use a pool.
+# - "default": SQLite's own settings and a single shared pool
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "cache_size": -SQLITE_CACHE_SIZE_KB,  # negative: KiB rather than pages
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "temp_store": "MEMORY",
+}
+
+
+def _is_sqlite_file(url: str) -> bool:
+    return url.startswith("sqlite") and ":memory:" not in url and not url.rstrip("/").endswith(":")
+
+
+# Separate writer and reader engines (SQLite performance profile only)
+SPLIT_READ_WRITE = _is_sqlite_file(DATABASE_URL) and SQLITE_PROFILE == "performance"
+
+# Checkout latency and saturation of each engine's pool (see /api/v1/admin/status)
+pool_metrics = {
+    "sync": PoolMetrics(),
+    "async": PoolMetrics(),
+    "sync_read": PoolMetrics(),
+    "async_read": PoolMetrics(),
+}
+
+
+def _engine_options(url: str, metrics: PoolMetrics, is_async: bool, writer: bool = False) -> dict:
+    """create_engine / create_async_engine options for the deployment profile"""
+    if url.startswith("sqlite"):
+        if not _is_sqlite_file(url):
+            return {}
+        # Same pool class SQLAlchemy picks for file databases, timed
+        options = {"poolclass": metrics.pool_class(AsyncAdaptedQueuePool if is_async else QueuePool)}
+        if writer:
+            # The single writer connection: other writers wait for it here
+            options.update(pool_size=1, max_overflow=0, pool_timeout=DB_POOL_TIMEOUT)
+        if not is_async:
+            # For SQLite, we need to enable check_same_thread=False to allow multiple threads
+            options["connect_args"] = {"check_same_thread": False}
+        return options
+
     # For PostgreSQL (Vercel deployment)
-    engine = create_engine(DATABASE_URL)
+    if DB_POOL_SIZE <= 0:
+        # Every checkout opens a fresh connection, so there is nothing to ping or recycle
+        options = {"poolclass": metrics.pool_class(NullPool)}
+    else:
+        options = {
+            "poolclass": metrics.pool_class(AsyncAdaptedQueuePool if is_async else QueuePool),
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+        }
+    if is_async and DB_PGBOUNCER:
+        # psycopg2 never prepares server-side; asyncpg does unless told not to
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return options
+
+
+def _configure_sqlite(engine, writer: bool):
+    """Apply the performance profile to every new connection of a SQLite engine"""
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if not writer:
+            # Reader connections must never write; a misrouted write fails loudly
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+        if writer:
+            # Let SQLAlchemy emit BEGIN itself (the driver would otherwise defer it)
+            dbapi_connection.isolation_level = None
+
+    if writer:
+        @event.listens_for(engine, "begin")
+        def begin_immediate(conn):
+            # Take the write lock up front: a deferred transaction that reads
+            # first can fail with "database is locked" when it later writes
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _create_engine(url: str, metrics: PoolMetrics, writer: bool):
+    """Create the sync engine of one role, instrumented for /api/v1/admin/status and /metrics"""
+    new_engine = create_engine(url, **_engine_options(url, metrics, is_async=False, writer=writer))
+    if SPLIT_READ_WRITE:
+        _configure_sqlite(new_engine, writer)
+    metrics.attach(new_engine)
+    instrument_engine(new_engine)
+    return new_engine
+
+
+# engine takes every write (and serves reads too unless SPLIT_READ_WRITE);
+# read_engine serves read-only endpoints
+engine = _create_engine(DATABASE_URL, pool_metrics["sync"], writer=SPLIT_READ_WRITE)
+read_engine = _create_engine(DATABASE_URL, pool_metrics["sync_read"], writer=False) if SPLIT_READ_WRITE else engine
+
+# Query plans of slow statements are captured with a sync reader of the
+# database that ran them (never a SQLite writer, see explain_with)
+slow_query_log.install()
+slow_query_log.explain_with(engine, read_engine)
+
+# Replicas are health-checked with their sync engines, even in async mode
+replica_router = ReplicaRouter(
+    sticky_seconds=READ_YOUR_WRITES_SECONDS,
+    check_seconds=REPLICA_CHECK_SECONDS,
+    max_lag_seconds=REPLICA_MAX_LAG_SECONDS,
+)
+if DATABASE_REPLICA_URLS:
+    _replicas = []
+    for _url in DATABASE_REPLICA_URLS:
+        _metrics = PoolMetrics()
+        _replicas.append(Replica(
+            make_url(_url).render_as_string(hide_password=True),
+            _create_engine(_url, _metrics, writer=False),
+            _metrics,
+        ))
+    replica_router.configure(read_engine, _replicas)
+
+
+def _parse_shard_urls(value: str):
+    """[(name, url)] from "name=url,..." (unnamed entries are shard1, shard2, ...)"""
+    shards = []
+    for position, item in enumerate((item.strip() for item in value.split(",") if item.strip()), start=1):
+        name, sep, url = item.partition("=")
+        if not sep or "://" in name:
+            name, url = f"shard{position}", item
+        shards.append((name.strip(), url.strip()))
+    return shards
+
+
+# The primary database is a shard too: users whose users.shard is NULL
+# (everyone registered before sharding was enabled) keep their data there
+shard_map = ShardMap(cache_seconds=SHARD_DIRECTORY_CACHE_SECONDS)
+SHARD_URLS = dict(_parse_shard_urls(DATABASE_SHARD_URLS))
+if SHARD_URLS:
+    _backend = make_url(DATABASE_URL).get_backend_name()
+    _shards = []
+    for _name, _url in SHARD_URLS.items():
+        if make_url(_url).get_backend_name() != _backend:
+            raise ValueError(f"Shard {_name} must use the same kind of database as DATABASE_URL ({_backend})")
+        _metrics = PoolMetrics()
+        _shard_engine = _create_engine(_url, _metrics, writer=SPLIT_READ_WRITE)
+        _shard_read_engine = _create_engine(_url, PoolMetrics(), writer=False) if SPLIT_READ_WRITE else _shard_engine
+        slow_query_log.explain_with(_shard_engine, _shard_read_engine)
+        _shards.append(Shard(_name, _shard_engine, _shard_read_engine, _metrics))
+    shard_map.configure(Shard(PRIMARY, engine, read_engine, pool_metrics["sync"]), _shards)
+
+def writer_engines():
+    """{name: writer Engine} of the primary and every shard (for migrations and scripts)"""
+    if not shard_map.enabled:
+        return {PRIMARY: engine}
+    return {name: shard.engine for name, shard in shard_map.shards.items()}
+
+
+# Tables every user shares; all others are per-user and live on shards
+GLOBAL_TABLES = frozenset({"users", "schema_version"})
+
+
+def _is_per_user(mapper, clause) -> bool:
+    """Whether a statement belongs on the user's shard"""
+    if clause is not None and clause.get_execution_options().get("user_shard"):
+        # e.g. the user's own row on the shard, which carries data_version
+        return True
+    if mapper is not None:
+        return mapper.local_table.name not in GLOBAL_TABLES
+    if clause is None:
+        return False
+    return any(table.name not in GLOBAL_TABLES for table in find_tables(clause, include_crud=True))
+
+
+class RoutingSession(Session):
+    """
+    Session that sends per-user tables to the user's shard when sharding is
+    enabled; the users table and everything else use the session's bind.
+
+    The user comes from session.info["user_id"] or, in a request, from
+    get_current_user. session.info["shard"] pins a session to one shard by
+    name instead (maintenance over a whole shard).
+    """
+    _async = False
+    _read = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if shard_map.enabled and kw.get("bind") is None and _is_per_user(mapper, clause):
+            return self._user_shard_bind()
+        return self._global_bind(mapper=mapper, clause=clause, **kw)
+
+    def _global_bind(self, mapper=None, clause=None, **kw):
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+    def shard_bind(self, name: str):
+        """Engine of a shard for this kind of session (for explicit bind_arguments)"""
+        shard = shard_map.get(name)
+        if shard.name == PRIMARY:
+            return self._global_bind()
+        return shard.bind(read=self._read, is_async=self._async)
+
+    def _user_shard_bind(self):
+        # Resolved once per transaction (see _reset_shard_bind)
+        bind = self.info.get("shard_bind")
+        if bind is not None:
+            return bind
+
+        if "shard" in self.info:
+            self.info["shard_bind"] = bind = self.shard_bind(self.info["shard"])
+            return bind
+
+        user_id = self.info.get("user_id") or request_user()
+        if user_id is None:
+            raise RuntimeError(
+                "Per-user tables are sharded: authenticate the request or set session.info['user_id']"
+            )
+        directory = shard_map.primary.bind(read=True, is_async=self._async)
+        shard = shard_map.lookup(user_id, directory)
+        self.info["shard_bind"] = bind = self.shard_bind(shard.name)
+        self._check_fence(bind, shard.name, user_id)
+        return bind
+
+    def _check_fence(self, bind, shard: str, user_id: int):
+        """Make sure the shard still holds the user's data (see app.core.shards)"""
+        connection = self.connection(bind_arguments={"bind": bind})
+        statement = fence_statement(shard, lock=not self._read, dialect=connection.dialect.name)
+        if connection.execute(statement, {"id": user_id}).first() is None:
+            self.info.pop("shard_bind", None)
+            shard_map.stale(user_id)
+            raise ShardMoved(user_id, shard)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+@event.listens_for(RoutingSession, "after_rollback")
+def _reset_shard_bind(session):
+    # The next transaction looks up (and fences) the shard again
+    session.info.pop("shard_bind", None)
+
+
+class ReadSession(RoutingSession):
+    """
+    Session for reads only: once the request is authenticated, its queries go
+    to the replica chosen by replica_router (or stay on read_engine). Per-user
+    tables of sharded users go to their shard's read engine instead.
+    """
+    _read = True
+
+    def _global_bind(self, mapper=None, clause=None, **kw):
+        use_replica = replica_router.enabled and not self._flushing and kw.get("bind") is None
+        replica = self._replica() if use_replica else None
+        if replica is None:
+            return super()._global_bind(mapper=mapper, clause=clause, **kw)
+        return replica.async_engine.sync_engine if self._async else replica.engine
+
+    def _replica(self):
+        if "replica" not in self.info:
+            user_id = request_user()
+            if user_id is None:
+                # Not authenticated yet: ask the primary, decide later
+                return None
+            self.info["replica"] = replica_router.choose(user_id)
+        return self.info["replica"]
+
+
+class AsyncRoutingSession(RoutingSession):
+    """RoutingSession behind an AsyncSession (routes to shards' async engines)"""
+    _async = True
+
+
+class AsyncReadSession(ReadSession):
+    """ReadSession behind an AsyncSession (routes to replicas' and shards' async engines)"""
+    _async = True
+
 
 # SessionLocal is a factory for creating database sessions
 # Each request will get its own session
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
+# Sessions for reads only (read_engine is the same engine unless
+# SPLIT_READ_WRITE; replicas are used when configured)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=ReadSession)
 
 # Base class for all our database models
 Base = declarative_base()
 
-# Dependency function to get database session
-# This will be used in our API endpoints
-def get_db():
+# Async mode: request handlers get an AsyncSession instead of a Session.
+# Scripts (seed, migrate) and background work always use the sync engine.
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Either kind of session, as handed to request handlers by get_db
+DbSession = Union[Session, AsyncSession]
+
+_async_engine = None
+_AsyncSessionLocal = None
+_AsyncReadSessionLocal = None
+
+
+def to_async_url(url: str) -> str:
+    """Switch a database URL to its asyncio driver (aiosqlite / asyncpg)"""
+    scheme, rest = url.split("://", 1)
+    driver = {
+        "sqlite": "sqlite+aiosqlite",
+        "postgres": "postgresql+asyncpg",
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg",
+    }.get(scheme, scheme)
+    return f"{driver}://{rest}"
+
+
+def get_async_engine():
+    """
+    Return the AsyncEngine, creating it on first use.
+
+    Created lazily so the async drivers are only imported in async mode.
+    """
+    global _async_engine, _AsyncSessionLocal, _AsyncReadSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        def create(url: str, metrics: PoolMetrics, writer: bool, explain_engine):
+            async_url = to_async_url(url)
+            new_engine = create_async_engine(
+                async_url, **_engine_options(async_url, metrics, is_async=True, writer=writer)
+            )
+            if SPLIT_READ_WRITE:
+                _configure_sqlite(new_engine.sync_engine, writer)
+            metrics.attach(new_engine.sync_engine)
+            instrument_engine(new_engine.sync_engine)
+            slow_query_log.explain_with(new_engine.sync_engine, explain_engine)
+            return new_engine
+
+        _async_engine = create(DATABASE_URL, pool_metrics["async"], SPLIT_READ_WRITE, read_engine)
+        async_read_engine = (
+            create(DATABASE_URL, pool_metrics["async_read"], False, read_engine) if SPLIT_READ_WRITE
+            else _async_engine
+        )
+        for replica, url in zip(replica_router.replicas, DATABASE_REPLICA_URLS):
+            replica.metrics = PoolMetrics()
+            replica.async_engine = create(url, replica.metrics, False, replica.engine)
+            replica_router.watch(replica, replica.async_engine.sync_engine)
+        for shard in shard_map.shards.values():
+            if shard.name == PRIMARY:
+                shard.async_engine, shard.async_read_engine = _async_engine, async_read_engine
+                shard.metrics = pool_metrics["async"]
+            else:
+                shard.metrics = PoolMetrics()
+                shard.async_engine = create(SHARD_URLS[shard.name], shard.metrics, SPLIT_READ_WRITE, shard.read_engine)
+                shard.async_read_engine = (
+                    create(SHARD_URLS[shard.name], PoolMetrics(), False, shard.read_engine) if SPLIT_READ_WRITE
+                    else shard.async_engine
+                )
+        # Objects are serialized after the session's greenlet context has
+        # ended, so they must not expire (and lazily reload) on commit
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False, sync_session_class=AsyncRoutingSession
+        )
+        _AsyncReadSessionLocal = async_sessionmaker(
+            async_read_engine, autoflush=False, expire_on_commit=False, sync_session_class=AsyncReadSession
+        )
+    return _async_engine
+
+
+def get_sync_db():
     """
     Generator function that yields a database session.
     Ensures the session is closed after use.
@@ -51,6 +476,44 @@ def get_db():
         db.close()
 
 
-# Import models to register them with Base
-# This must be done after Base is created
-from .models import Category, Transaction  # noqa: E402
+async def get_async_db():
+    """
+    Async generator that yields an AsyncSession.
+    Ensures the session is closed after use.
+    """
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+def get_sync_read_db():
+    """
+    Generator function that yields a session for reads only.
+    Ensures the session is closed after use.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    """
+    Async generator that yields an AsyncSession for reads only.
+    Ensures the session is closed after use.
+    """
+    get_async_engine()
+    async with _AsyncReadSessionLocal() as db:
+        yield db
+
+
+# Dependency function to get database session
+# This will be used in our API endpoints; CRUD calls go through app.crud.aio,
+# which accepts either kind of session
+get_db = get_async_db if DATABASE_ASYNC else get_sync_db
+
+# Session for endpoints (and dependencies) that never write. With the SQLite
+# performance profile these use the reader pool, so they never wait for the
+# single writer connection
+get_read_db = get_async_read_db if DATABASE_ASYNC else get_sync_read_db
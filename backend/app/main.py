@@ -5,25 +5,64 @@ This is the entry point for the FastAPI application.
 It sets up:
 - CORS (Cross-Origin Resource Sharing) to allow frontend to communicate with backend
 - API versioning (v1)
-- Database initialization
+- Database schema migrations (AUTO_MIGRATE; off in the serverless profile)
+- Request/SQL metrics: Server-Timing headers and Prometheus /metrics
+- Retries for requests routed to a shard a user was just moved off
 """
 
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
+from fastapi.responses import JSONResponse, Response
+from .database import pool_metrics, shard_map, writer_engines, DB_PROFILE, DATABASE_ASYNC
+from .api.deps import require_metrics_access
 from .api.v1.router import api_v1_router
+from .core.security import PasswordHasherBusy, shutdown_hashing_pool
+from .core.user_cache import user_cache
+from .core.columnar import InsightsUnavailable
+from .core.etags import NotModified, etag_headers
+from .core.result_cache import analytics_cache
+from .core.responses import FAST_JSON, FastJSONResponse
+from .core import metrics
+from .core.slow_queries import slow_query_log
+from .core.shards import ShardMoved
+
+# Bring the database schema up to date on startup: creates missing tables and
+# applies pending versioned migrations (on every shard too, then registers the
+# shards for global ids). Each step is
+# taken under a database lock, so several workers starting at once apply it
+# once. Serverless deployments skip this so a cold start runs no schema
+# queries; run `python migrate.py` on deploy instead.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false" if DB_PROFILE == "serverless" else "true").lower() in ("1", "true", "yes")
+
+if AUTO_MIGRATE:
+    from .migrations import run_migrations
+    from .crud.shard import register_shards
+
+    for _engine in writer_engines().values():
+        run_migrations(_engine)
+    register_shards()
+
+# Per-route latency/SQL histograms and Server-Timing headers
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    shutdown_hashing_pool()
 
-# Create all database tables
-# This will create tables based on our models if they don't exist
-Base.metadata.create_all(bind=engine)
 
 # Initialize FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="Money Manager API",
     description="Backend API for Money Manager application",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # Encode every response with orjson when the fast JSON path is enabled
+    default_response_class=FastJSONResponse if FAST_JSON else JSONResponse
 )
 
 # Configure CORS
@@ -38,8 +77,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Added last so it is outermost and times the whole request
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """Shed login/registration load quickly when the hashing pool is saturated"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many login attempts in progress, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(ShardMoved)
+async def shard_moved_handler(request: Request, exc: ShardMoved):
+    """The user's data moved to another shard mid-request; the retry is routed there"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Your data is being moved, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(InsightsUnavailable)
+async def insights_unavailable_handler(request: Request, exc: InsightsUnavailable):
+    """Insight analytics need NumPy, which is an optional dependency"""
+    return JSONResponse(status_code=501, content={"detail": str(exc)})
+
+
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    """The client's cached copy (If-None-Match) is still current"""
+    return Response(status_code=304, headers=etag_headers(exc.etag))
+
+
 # Include API v1 router
 # All v1 endpoints will be available at /api/v1/*
 app.include_router(api_v1_router)
@@ -63,5 +139,47 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check (status details: GET /api/v1/admin/status)"""
     return {"status": "healthy", "version": "1.0.0"}
+
+
+def _runtime_gauges():
+    """Pool and cache state for /metrics, from the same sources as /api/v1/admin/status"""
+    pool = pool_metrics["async" if DATABASE_ASYNC else "sync"].stats()
+    cache = analytics_cache.stats()
+    users = user_cache.stats()
+    lines = []
+    lines += metrics.sample("db_pool_checked_out", "Connections currently checked out", pool["checked_out"])
+    lines += metrics.sample("db_pool_capacity", "Pool size plus overflow", pool.get("capacity"))
+    lines += metrics.sample("db_pool_checkouts_total", "Connection checkouts", pool["checkouts"], "counter")
+    lines += metrics.sample(
+        "db_pool_failed_checkouts_total", "Checkouts that timed out or failed", pool["failed_checkouts"], "counter"
+    )
+    lines += metrics.sample(
+        "analytics_cache_hits_total", "Fresh and stale analytics cache hits", cache["hits"] + cache["stale_hits"], "counter"
+    )
+    lines += metrics.sample("analytics_cache_misses_total", "Analytics cache misses", cache["misses"], "counter")
+    lines += metrics.sample("user_cache_hits_total", "Current-user cache hits", users["hits"], "counter")
+    lines += metrics.sample("user_cache_misses_total", "Current-user cache misses", users["misses"], "counter")
+    lines += metrics.sample(
+        "db_slow_statements_total", "Statements slower than SLOW_QUERY_MS", slow_query_log.stats()["recorded"], "counter"
+    )
+    lines += metrics.sample(
+        "db_shard_stale_routes_total",
+        "Sessions routed to a shard the user had moved off (answered 503)",
+        shard_map.moved if shard_map.enabled else None,
+        "counter",
+    )
+    return lines
+
+
+metrics.register_collector(_runtime_gauges)
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+async def prometheus_metrics():
+    """
+    Request, SQL, pool and cache metrics in the Prometheus text format
+    (METRICS_TOKEN or an admin's access token as the bearer token)
+    """
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
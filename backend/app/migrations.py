@@ -0,0 +1,207 @@
+"""
+Versioned schema migrations.
+
+Each migration is a numbered step that upgrades the schema by one version.
+The current version is stored in the 'schema_version' table, and
+run_migrations() applies every step above it in order, each in its own
+transaction. This replaces Base.metadata.create_all(), which can create
+missing tables but never changes (or indexes) existing ones.
+
+To add a migration, write an upgrade function taking a Connection and
+append it to MIGRATIONS. Never edit or reorder steps that have shipped.
+Steps spell out their own tables, DDL and SQL as of the version they create,
+and never use app.models or app.crud, so an applied step does the same thing
+however the models change later.
+
+Several processes (e.g. uvicorn workers with AUTO_MIGRATE) may upgrade the
+same database at once: each step takes a database lock, then re-reads the
+version, so a step runs exactly once and the others wait for it.
+"""
+
+from typing import Callable, List, NamedTuple
+from sqlalchemy import (
+    Boolean, Column, Date, Enum, Float, ForeignKey, Integer, MetaData, String, Table, inspect, select, text
+)
+from sqlalchemy.engine import Connection, Engine
+
+
+class Migration(NamedTuple):
+    """A single schema upgrade step"""
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+# Bookkeeping table, kept out of Base.metadata so create_all never touches it
+_meta = MetaData()
+schema_version = Table(
+    "schema_version",
+    _meta,
+    Column("version", Integer, nullable=False),
+)
+
+# Key of the PostgreSQL advisory lock serializing migrations ("mm-migrate")
+MIGRATION_LOCK_KEY = 0x6D6D2D6D696772
+
+
+def _0001_initial_schema(conn: Connection):
+    """Create the original users, categories and transactions tables."""
+    schema = MetaData()
+    # Stored as the enum member names, like the models' Enum(TransactionType)
+    transaction_type = Enum("INCOME", "EXPENSE", name="transactiontype")
+    Table(
+        "users", schema,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("email", String, unique=True, index=True),
+        Column("hashed_password", String),
+        Column("is_active", Boolean),
+    )
+    Table(
+        "categories", schema,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String, nullable=False),
+        Column("type", transaction_type, nullable=False),
+        Column("color", String),
+        Column("icon", String),
+        Column("user_id", Integer, ForeignKey("users.id")),
+    )
+    Table(
+        "transactions", schema,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("amount", Float, nullable=False),
+        Column("description", String, nullable=True),
+        Column("date", Date, nullable=False),
+        Column("category_id", Integer, ForeignKey("categories.id"), nullable=False),
+        Column("type", transaction_type, nullable=False),
+        Column("user_id", Integer, ForeignKey("users.id")),
+    )
+    schema.create_all(conn, checkfirst=True)
+
+
+def _0002_transaction_indexes(conn: Connection):
+    """Add user-scoped composite indexes for listing and analytics queries."""
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_transactions_user_date_id ON transactions (user_id, date DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_user_category_date ON transactions (user_id, category_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_user_type_date ON transactions (user_id, type, date)",
+        "CREATE INDEX IF NOT EXISTS ix_categories_user_type ON categories (user_id, type)",
+    ):
+        conn.execute(text(statement))
+
+
+def _0003_monthly_rollups(conn: Connection):
+    """Create the monthly_rollups table and backfill it from transactions."""
+    schema = MetaData()
+    Table("users", schema, Column("id", Integer, primary_key=True))
+    Table("categories", schema, Column("id", Integer, primary_key=True))
+    Table(
+        "monthly_rollups", schema,
+        Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("year_month", String(7), primary_key=True),
+        Column("type", Enum("INCOME", "EXPENSE", name="transactiontype"), primary_key=True),
+        Column("category_id", Integer, ForeignKey("categories.id"), primary_key=True),
+        Column("total", Float, nullable=False),
+        Column("count", Integer, nullable=False),
+    )
+    schema.tables["monthly_rollups"].create(conn, checkfirst=True)
+
+    month = "to_char(date, 'YYYY-MM')" if conn.dialect.name == "postgresql" else "strftime('%Y-%m', date)"
+    conn.execute(text("DELETE FROM monthly_rollups"))
+    conn.execute(text(
+        "INSERT INTO monthly_rollups (user_id, year_month, type, category_id, total, count) "
+        f"SELECT user_id, {month}, type, category_id, SUM(amount), COUNT(id) FROM transactions "
+        f"WHERE user_id IS NOT NULL GROUP BY user_id, {month}, type, category_id"
+    ))
+
+
+def _0004_user_data_version(conn: Connection):
+    """Add users.data_version, the per-user change counter behind ETags."""
+    # Databases created at version 1 from the models of the time already have it
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    if "data_version" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0"))
+
+
+def _0005_user_shard(conn: Connection):
+    """Add users.shard, the shard holding each user's data (NULL: this database)."""
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    if "shard" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN shard VARCHAR"))
+
+
+def _0006_shard_moves(conn: Connection):
+    """Add users.moving_to (the move fence) and per-database id sequences."""
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    if "moving_to" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN moving_to VARCHAR"))
+    schema = MetaData()
+    Table(
+        "id_sequences", schema,
+        Column("name", String, primary_key=True),
+        Column("next_value", Integer, nullable=False),
+        Column("ordinal", Integer, nullable=False),
+    )
+    schema.create_all(conn, checkfirst=True)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial schema", _0001_initial_schema),
+    Migration(2, "user-scoped transaction and category indexes", _0002_transaction_indexes),
+    Migration(3, "monthly rollups", _0003_monthly_rollups),
+    Migration(4, "per-user data version", _0004_user_data_version),
+    Migration(5, "user shard directory", _0005_user_shard),
+    Migration(6, "shard moves and global ids", _0006_shard_moves),
+]
+
+
+def get_schema_version(conn: Connection) -> int:
+    """Return the current schema version (0 for an empty database)."""
+    _meta.create_all(conn, checkfirst=True)
+    return conn.execute(select(schema_version.c.version)).scalar() or 0
+
+
+def migration_lock(conn: Connection):
+    """
+    Serialize migrations across processes until the transaction ends.
+
+    PostgreSQL takes a transaction-level advisory lock (released on commit,
+    so it also works through PgBouncer); SQLite takes the database write
+    lock with BEGIN IMMEDIATE.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    elif conn.dialect.name == "sqlite" and not conn.connection.dbapi_connection.in_transaction:
+        # Writer engines of the SQLite performance profile already began IMMEDIATE
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def run_migrations(engine: Engine, verbose: bool = False) -> int:
+    """
+    Upgrade the database to the latest schema version.
+
+    Safe to run from several processes at once (see migration_lock).
+
+    Args:
+        engine: Engine of the database to upgrade
+        verbose: Print each applied migration
+
+    Returns:
+        The schema version after upgrading
+    """
+    current = 0
+    with engine.connect() as conn:
+        for migration in MIGRATIONS:
+            with conn.begin():
+                migration_lock(conn)
+                # Re-read under the lock: another process may have applied it
+                current = get_schema_version(conn)
+                if migration.version <= current:
+                    continue
+                migration.upgrade(conn)
+                conn.execute(schema_version.delete())
+                conn.execute(schema_version.insert().values(version=migration.version))
+            current = migration.version
+            if verbose:
+                print(f"✓ Applied migration {migration.version:04d}: {migration.description}")
+
+    return current
@@ -8,5 +8,6 @@ Each file represents a different entity/table in the database.
 from .category import Category
 from .transaction import Transaction
 from .user import User
+from .rollup import MonthlyRollup
 
-__all__ = ["Category", "Transaction", "User"]
+__all__ = ["Category", "Transaction", "User", "MonthlyRollup"]
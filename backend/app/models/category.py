@@ -5,10 +5,10 @@ Defines the structure of the 'categories' table.
 Categories are used to organize transactions (e.g., Food, Transport, Salary).
 """
 
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Index
 from sqlalchemy.orm import relationship
 import enum
-from ..database import Base
+from ..database import Base, shard_map
 
 
 class TransactionType(str, enum.Enum):
@@ -33,7 +33,8 @@ class Category(Base):
     """
     __tablename__ = "categories"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Global ids when sharding is enabled, so rows keep them when moved
+    id = Column(Integer, primary_key=True, index=True, default=shard_map.id_default("categories"))
     name = Column(String, nullable=False)
     type = Column(Enum(TransactionType), nullable=False)
     color = Column(String, default="#6366f1")  # Default indigo color
@@ -43,3 +44,7 @@ class Category(Base):
     # Relationship: One category can have many transactions
     transactions = relationship("Transaction", back_populates="category", cascade="all, delete-orphan")
     owner = relationship("User", back_populates="categories")
+
+    __table_args__ = (
+        Index("ix_categories_user_type", user_id, type),
+    )
@@ -0,0 +1,33 @@
+"""
+Monthly rollup database model.
+
+Defines the structure of the 'monthly_rollups' table.
+Rollups hold per-month totals of a user's transactions so analytics can read
+O(months) rows instead of aggregating every transaction on each request.
+"""
+
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum
+from .category import TransactionType
+from ..database import Base
+
+
+class MonthlyRollup(Base):
+    """
+    Pre-aggregated monthly totals, maintained alongside transaction writes.
+
+    Attributes:
+        user_id: Owner of the aggregated transactions
+        year_month: Month in YYYY-MM format
+        type: Either "income" or "expense"
+        category_id: Category of the aggregated transactions
+        total: Sum of transaction amounts
+        count: Number of transactions
+    """
+    __tablename__ = "monthly_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    year_month = Column(String(7), primary_key=True)
+    type = Column(Enum(TransactionType), primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
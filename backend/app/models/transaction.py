@@ -5,11 +5,11 @@ Defines the structure of the 'transactions' table.
 Transactions represent individual income or expense records.
 """
 
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import date
 from .category import TransactionType
-from ..database import Base
+from ..database import Base, shard_map
 
 
 class Transaction(Base):
@@ -26,10 +26,17 @@ class Transaction(Base):
 
     Relationships:
         category: The category this transaction belongs to
+
+    Indexes:
+        Every query is scoped to a user, so all indexes lead with user_id.
+        (user_id, date DESC, id DESC) serves date-ordered listing and keyset
+        pagination; the category and type indexes serve filtered lists
+        and analytics aggregates.
     """
     __tablename__ = "transactions"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Global ids when sharding is enabled, so rows keep them when moved
+    id = Column(Integer, primary_key=True, index=True, default=shard_map.id_default("transactions"))
     amount = Column(Float, nullable=False)
     description = Column(String, nullable=True)
     date = Column(Date, nullable=False, default=date.today)
@@ -40,3 +47,9 @@ class Transaction(Base):
     # Relationship: Each transaction belongs to one category
     category = relationship("Category", back_populates="transactions")
     owner = relationship("User", back_populates="transactions")
+
+    __table_args__ = (
+        Index("ix_transactions_user_date_id", user_id, date.desc(), id.desc()),
+        Index("ix_transactions_user_category_date", user_id, category_id, date),
+        Index("ix_transactions_user_type_date", user_id, type, date),
+    )
@@ -4,8 +4,10 @@ User database model.
 Defines the structure of the 'users' table.
 """
 
-from sqlalchemy import Boolean, Column, Integer, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Integer, String, event, update
+from sqlalchemy.orm import relationship, Session, object_session
+from ..core.changes import pending_user_data_changes
+from ..core.user_cache import user_cache
 from ..database import Base
 
 class User(Base):
@@ -17,6 +19,12 @@ class User(Base):
         email: Unique email address
         hashed_password: Hashed password string
         is_active: Boolean flag for active status
+        data_version: Incremented by every commit that changes the user's
+            transactions or categories; read endpoints derive ETags from it
+        shard: Name of the shard holding the user's data when sharding is
+            enabled (NULL: this database; see app.core.shards)
+        moving_to: Shard the user's data is being moved to; their writes
+            are refused with a retry while it is set
 
     Relationships:
         categories: Categories created by this user
@@ -28,7 +36,50 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+    shard = Column(String, nullable=True)
+    moving_to = Column(String, nullable=True)
 
     # Relationships
     categories = relationship("Category", back_populates="owner")
     transactions = relationship("Transaction", back_populates="owner")
+
+
+# Keep the authenticated-user cache coherent: drop a user as soon as their row
+# is updated or deleted (e.g. deactivated), and again after the commit so a
+# request that re-cached the old row in between cannot keep it
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)
+
+
+# Bump data_version in the same transaction as the changes it versions, so a
+# reader can never see new data under an old version (with sharding, the
+# user's row on their shard carries it)
+@event.listens_for(Session, "before_commit")
+def _bump_data_versions(session):
+    # Flush first so changes still pending in the session are collected too
+    session.flush()
+    user_ids = pending_user_data_changes(session)
+    if user_ids:
+        session.execute(
+            update(User.__table__)
+            .where(User.__table__.c.id.in_(user_ids))
+            .values(data_version=User.__table__.c.data_version + 1)
+            .execution_options(user_shard=True)
+        )
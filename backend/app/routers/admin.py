@@ -0,0 +1,68 @@
+"""
+Admin router - operational endpoints for users listed in ADMIN_EMAILS.
+
+This will handle:
+- GET /api/v1/admin/status - Cache, password hashing and connection pool status
+- GET /api/v1/admin/slow-queries - Recent slow statements with their query plans
+- DELETE /api/v1/admin/slow-queries - Clear the slow-query buffer
+
+All of them cover the process that serves the request only.
+"""
+
+from fastapi import APIRouter, Depends, Response, status
+from app.api.deps import get_current_admin
+from app.core.columnar import snapshot_cache
+from app.core.result_cache import analytics_cache
+from app.core.security import hashing_pool_stats
+from app.core.slow_queries import slow_query_log
+from app.core.user_cache import user_cache
+from app.database import (
+    pool_metrics,
+    replica_router,
+    shard_map,
+    DB_PROFILE,
+    DATABASE_ASYNC,
+    SPLIT_READ_WRITE,
+)
+from app.schemas.admin import SlowQueryReport
+
+router = APIRouter(dependencies=[Depends(get_current_admin)])
+
+
+@router.get("/status")
+async def read_status():
+    """
+    Get cache, password hashing, connection pool, replica and shard status.
+    """
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hashing": hashing_pool_stats(),
+        "analytics_snapshots": snapshot_cache.stats(),
+        "analytics_cache": analytics_cache.stats(),
+        "database_pool": {
+            "profile": DB_PROFILE,
+            **pool_metrics["async" if DATABASE_ASYNC else "sync"].stats(),
+        },
+        # Separate reader pool of the SQLite performance profile
+        **({"database_read_pool": pool_metrics["async_read" if DATABASE_ASYNC else "sync_read"].stats()} if SPLIT_READ_WRITE else {}),
+        **({"database_replicas": replica_router.stats()} if replica_router.enabled else {}),
+        **({"database_shards": shard_map.stats()} if shard_map.enabled else {}),
+        "slow_queries": slow_query_log.stats(),
+    }
+
+
+@router.get("/slow-queries", response_model=SlowQueryReport)
+async def read_slow_queries():
+    """
+    Get the most recent statements slower than SLOW_QUERY_MS.
+    """
+    return {**slow_query_log.stats(), "entries": slow_query_log.entries()}
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_queries():
+    """
+    Clear the slow-query buffer.
+    """
+    slow_query_log.clear()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
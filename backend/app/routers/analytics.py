@@ -4,40 +4,263 @@ Analytics router - API endpoints for financial analytics.
 This will handle:
 - GET /api/analytics/monthly - Monthly income/expense summary
 - GET /api/analytics/by-category - Spending by category
-- GET /api/analytics/trends - Historical trends
+- GET /api/analytics/trends - Income/expense/balance series by month, week or day
+- GET /api/analytics/insights/* - Rolling averages, percentiles, per-category
+  stats and weekday heatmaps computed with NumPy (501 without it)
+
+Every endpoint sends an ETag and answers If-None-Match with 304 Not Modified
+while the user's data is unchanged. Monthly, category and trend results are
+cached per user and data version (see app.core.result_cache); insights are
+computed from a snapshot cached per user and data version
+(see app.core.columnar).
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
+from typing import List, Optional
+from datetime import date, timedelta
+from app.database import get_read_db, DbSession, ReadSessionLocal
 from app import crud
-from app.schemas.analytics import MonthlySummary, CategorySummary
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.crud import aio
+from app.schemas.analytics import (
+    MonthlySummary,
+    CategorySummary,
+    TrendSeries,
+    RollingAverageSeries,
+    AmountPercentiles,
+    CategoryStats,
+    WeekdayHeatmap,
+)
+from app.api.deps import get_current_user, check_etag, current_data_version
+from app.core.user_cache import CachedUser
+from app.core.responses import FAST_JSON, FastJSONResponse
+from app.core.periods import bucket_start
+from app.core.result_cache import analytics_cache
 
 router = APIRouter()
 
-@router.get("/monthly/{year}/{month}", response_model=MonthlySummary)
-def read_monthly_summary(
-    year: int,
-    month: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+
+async def _cached(db: DbSession, user_id: int, data_version: int, endpoint: str, params: dict, fn):
+    """
+    Serve fn(session) -> JSON-ready result through the analytics result cache.
+
+    Stale entries are refreshed in the background with a session of their
+    own, since the request's session is closed by then.
+    """
+    def refresh():
+        with ReadSessionLocal(info={"user_id": user_id}) as session:
+            return fn(session)
+
+    return await analytics_cache.get_or_compute(
+        user_id,
+        data_version,
+        endpoint,
+        params,
+        compute=lambda: aio.run(db, fn),
+        refresh=refresh
+    )
+
+
+@router.get("/monthly/{year}/{month}", response_model=MonthlySummary, dependencies=[Depends(check_etag)])
+async def read_monthly_summary(
+    response: Response,
+    year: int = Path(..., ge=1, le=9998),
+    month: int = Path(..., ge=1, le=12),
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user),
+    data_version: int = Depends(current_data_version)
 ):
     """
     Get financial summary (income, expense, balance) for a specific month (current user).
     """
-    return crud.get_monthly_summary(db, year=year, month=month, user_id=current_user.id)
+    def compute(session):
+        return crud.get_monthly_summary(session, year=year, month=month, user_id=current_user.id).model_dump(mode="json")
+
+    summary = await _cached(db, current_user.id, data_version, "monthly", {"year": year, "month": month}, compute)
+    if FAST_JSON:
+        return FastJSONResponse(summary, headers=response.headers)
+    return summary
 
-@router.get("/categories", response_model=List[CategorySummary])
-def read_category_summary(
+@router.get("/categories", response_model=List[CategorySummary], dependencies=[Depends(check_etag)])
+async def read_category_summary(
+    response: Response,
     type: str = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    start_date: Optional[date] = Query(None, description="Include transactions from this date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Include transactions until this date (YYYY-MM-DD)"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Only return the top N categories"),
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user),
+    data_version: int = Depends(current_data_version)
 ):
     """
     Get spending/income breakdown by category (current user).
     Optional 'type' query param: 'income' or 'expense'.
+    Optional 'start_date'/'end_date' bound the period (default: all time),
+    and 'limit' keeps only the top N categories by total.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    params = dict(type=type, start_date=start_date, end_date=end_date, limit=limit)
+
+    def compute(session):
+        summaries = crud.get_category_summary(session, user_id=current_user.id, **params)
+        return [s.model_dump(mode="json") for s in summaries]
+
+    summaries = await _cached(db, current_user.id, data_version, "categories", params, compute)
+    if FAST_JSON:
+        return FastJSONResponse(summaries, headers=response.headers)
+    return summaries
+
+
+# Buckets covered when no start_date is given
+DEFAULT_TREND_POINTS = {"month": 12, "week": 12, "day": 30}
+
+
+@router.get("/trends", response_model=TrendSeries, dependencies=[Depends(check_etag)])
+async def read_trends(
+    response: Response,
+    granularity: str = Query("month", pattern="^(month|week|day)$", description="month, week or day"),
+    start_date: Optional[date] = Query(None, description="First day to include (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Last day to include (default: today)"),
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user),
+    data_version: int = Depends(current_data_version)
+):
+    """
+    Get income, expense and balance per month, ISO week or day (current user).
+
+    Without 'start_date' the series covers the last 12 months, 12 weeks or
+    30 days up to 'end_date'. Buckets with no transactions are zeros.
+    """
+    if end_date is None:
+        end_date = date.today()
+    if start_date is None:
+        start_date = bucket_start(end_date, granularity)
+        for _ in range(DEFAULT_TREND_POINTS[granularity] - 1):
+            start_date = bucket_start(start_date - timedelta(days=1), granularity)
+
+    params = dict(start_date=start_date, end_date=end_date, granularity=granularity)
+
+    def compute(session):
+        return crud.get_trends(session, user_id=current_user.id, **params).model_dump(mode="json")
+
+    try:
+        trends = await _cached(db, current_user.id, data_version, "trends", params, compute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if FAST_JSON:
+        return FastJSONResponse(trends, headers=response.headers)
+    return trends
+
+
+# Insight endpoints: type defaults to expense; "all" includes both types
+TYPE_QUERY = Query("expense", pattern="^(income|expense|all)$", description="income, expense or all")
+
+
+def _insight_range(start_date: Optional[date], end_date: Optional[date], days: int):
+    """Default the range to the `days` days ending at end_date (default: today) and validate it"""
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=days - 1)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if (end_date - start_date).days >= 3660:
+        raise HTTPException(status_code=400, detail="Range must be at most 10 years")
+    return start_date, end_date
+
+
+@router.get("/insights/rolling", response_model=RollingAverageSeries, dependencies=[Depends(check_etag)])
+async def read_rolling_average(
+    window: int = Query(7, ge=1, le=365, description="Days in the moving average"),
+    type: str = TYPE_QUERY,
+    start_date: Optional[date] = Query(None, description="First day (default: the 90 days ending at end_date)"),
+    end_date: Optional[date] = Query(None, description="Last day (default: today)"),
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user),
+    data_version: int = Depends(current_data_version)
+):
+    """
+    Get daily totals with a trailing moving average (current user).
+    """
+    start_date, end_date = _insight_range(start_date, end_date, 90)
+    return await aio.get_rolling_average(
+        db,
+        user_id=current_user.id,
+        start_date=start_date,
+        end_date=end_date,
+        window=window,
+        type=None if type == "all" else type,
+        data_version=data_version
+    )
+
+
+@router.get("/insights/percentiles", response_model=AmountPercentiles, dependencies=[Depends(check_etag)])
+async def read_amount_percentiles(
+    p: List[float] = Query([50, 90, 99], description="Percentiles to compute (0-100), repeatable"),
+    type: str = TYPE_QUERY,
+    start_date: Optional[date] = Query(None, description="First day (default: the 365 days ending at end_date)"),
+    end_date: Optional[date] = Query(None, description="Last day (default: today)"),
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user),
+    data_version: int = Depends(current_data_version)
+):
+    """
+    Get percentiles of individual transaction amounts (current user).
+    """
+    if not p or len(p) > 20 or any(not 0 <= value <= 100 for value in p):
+        raise HTTPException(status_code=400, detail="Give 1 to 20 percentiles between 0 and 100")
+    start_date, end_date = _insight_range(start_date, end_date, 365)
+    return await aio.get_amount_percentiles(
+        db,
+        user_id=current_user.id,
+        start_date=start_date,
+        end_date=end_date,
+        percentiles=p,
+        type=None if type == "all" else type,
+        data_version=data_version
+    )
+
+
+@router.get("/insights/categories", response_model=List[CategoryStats], dependencies=[Depends(check_etag)])
+async def read_category_stats(
+    type: str = TYPE_QUERY,
+    start_date: Optional[date] = Query(None, description="First day (default: the 365 days ending at end_date)"),
+    end_date: Optional[date] = Query(None, description="Last day (default: today)"),
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user),
+    data_version: int = Depends(current_data_version)
+):
+    """
+    Get count, total, mean, median and p90 amount per category (current user).
+    """
+    start_date, end_date = _insight_range(start_date, end_date, 365)
+    return await aio.get_category_stats(
+        db,
+        user_id=current_user.id,
+        start_date=start_date,
+        end_date=end_date,
+        type=None if type == "all" else type,
+        data_version=data_version
+    )
+
+
+@router.get("/insights/weekdays", response_model=WeekdayHeatmap, dependencies=[Depends(check_etag)])
+async def read_weekday_heatmap(
+    type: str = TYPE_QUERY,
+    start_date: Optional[date] = Query(None, description="First day (default: the 364 days ending at end_date)"),
+    end_date: Optional[date] = Query(None, description="Last day (default: today)"),
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user),
+    data_version: int = Depends(current_data_version)
+):
+    """
+    Get totals by weekday and ISO week, for a calendar heatmap (current user).
     """
-    return crud.get_category_summary(db, type=type, user_id=current_user.id)
+    start_date, end_date = _insight_range(start_date, end_date, 364)
+    return await aio.get_weekday_heatmap(
+        db,
+        user_id=current_user.id,
+        start_date=start_date,
+        end_date=end_date,
+        type=None if type == "all" else type,
+        data_version=data_version
+    )
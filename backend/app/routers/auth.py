@@ -7,46 +7,67 @@ Handles user registration and login (token generation).
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 from app.core import security
-from app.database import get_db
-from app.models.user import User
+from app.crud import aio
+from app.database import get_db, get_read_db, DbSession
 from app.schemas.token import Token
 from app.schemas.user import UserCreate, User as UserSchema
 
 router = APIRouter()
 
 @router.post("/users", response_model=UserSchema)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(
+    user: UserCreate,
+    db: DbSession = Depends(get_db),
+    read_db: DbSession = Depends(get_read_db)
+):
     """
     Register a new user.
     """
-    db_user = db.query(User).filter(User.email == user.email).first()
+    # Lookups use the reader pool: with the SQLite performance profile a
+    # burst of sign-ups or logins would otherwise queue for the one writer
+    db_user = await aio.get_user_by_email(read_db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = security.get_password_hash(user.password)
-    db_user = User(email=user.email, hashed_password=hashed_password)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    # bcrypt runs on the dedicated hashing pool, off the request threadpool;
+    # don't hold a database connection while waiting for it
+    await aio.release(read_db)
+    hashed_password = await security.hash_password_async(user.password)
+    return await aio.create_user(db, email=user.email, hashed_password=hashed_password)
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: DbSession = Depends(get_db),
+    read_db: DbSession = Depends(get_read_db)
+):
     """
     Login to get an access token.
     """
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    user = await aio.get_user_by_email(read_db, form_data.username)
+    valid, new_hash = (False, None)
+    if user:
+        user_id, email, is_active, hashed_password = user.id, user.email, user.is_active, user.hashed_password
+        # Don't hold a database connection while waiting for bcrypt
+        await aio.release(read_db)
+        valid, new_hash = await security.verify_password_async(form_data.password, hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Transparently upgrade hashes made with an outdated work factor
+    if new_hash:
+        await aio.set_user_password_hash(db, user_id, new_hash)
+
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
+    # Carry the user id and active flag so requests can resolve the user
+    # from the token (and the user cache) without an email lookup
     access_token = security.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": email, "uid": user_id, "active": bool(is_active)},
+        expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
@@ -12,29 +12,29 @@ Each endpoint uses:
 - Pydantic schemas for validation
 - CRUD functions for database operations
 - Dependency injection for database sessions
+- ETags on reads (If-None-Match gets 304 while the user's data is unchanged)
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
 from typing import List
 
-from app.database import get_db
+from app.database import get_db, get_read_db, DbSession
 from app.schemas.category import Category, CategoryCreate, CategoryUpdate
-from app import crud
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.crud import aio
+from app.api.deps import get_current_user, check_etag
+from app.core.user_cache import CachedUser
 
 # Create router instance
 router = APIRouter()
 
 
-@router.get("/", response_model=List[Category])
-def list_categories(
+@router.get("/", response_model=List[Category], dependencies=[Depends(check_etag)])
+async def list_categories(
     skip: int = 0,
     limit: int = 100,
     type: str = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """
     Get all categories for the current user with optional filtering.
@@ -48,15 +48,15 @@ def list_categories(
         List of categories
     """
     if type:
-        return crud.get_categories_by_type(db, type=type, user_id=current_user.id)
-    return crud.get_categories(db, skip=skip, limit=limit, user_id=current_user.id)
+        return await aio.get_categories_by_type(db, type=type, user_id=current_user.id)
+    return await aio.get_categories(db, skip=skip, limit=limit, user_id=current_user.id)
 
 
 @router.post("/", response_model=Category, status_code=status.HTTP_201_CREATED)
-def create_category(
+async def create_category(
     category: CategoryCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """
     Create a new category for the current user.
@@ -72,14 +72,14 @@ def create_category(
     Returns:
         Created category with generated ID
     """
-    return crud.create_category(db=db, category=category, user_id=current_user.id)
+    return await aio.create_category(db=db, category=category, user_id=current_user.id)
 
 
-@router.get("/{category_id}", response_model=Category)
-def read_category(
+@router.get("/{category_id}", response_model=Category, dependencies=[Depends(check_etag)])
+async def read_category(
     category_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """
     Get a specific category by ID (must belong to current user).
@@ -90,18 +90,18 @@ def read_category(
     Returns:
         Category object
     """
-    db_category = crud.get_category(db, category_id=category_id)
+    db_category = await aio.get_category(db, category_id=category_id)
     if db_category is None or db_category.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Category not found")
     return db_category
 
 
 @router.put("/{category_id}", response_model=Category)
-def update_category(
+async def update_category(
     category_id: int,
     category: CategoryUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """
     Update an existing category (must belong to current user).
@@ -118,17 +118,18 @@ def update_category(
     Returns:
         Updated category
     """
-    db_category = crud.get_category(db, category_id=category_id)
-    if db_category is None or db_category.user_id != current_user.id:
+    # Ownership is part of the statement's WHERE clause; no pre-fetch needed
+    db_category = await aio.update_category(db=db, category_id=category_id, category=category, user_id=current_user.id)
+    if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
-    return crud.update_category(db=db, category_id=category_id, category=category, user_id=current_user.id)
+    return db_category
 
 
 @router.delete("/{category_id}", response_model=Category)
-def delete_category(
+async def delete_category(
     category_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """
     Delete a category (must belong to current user).
@@ -139,7 +140,8 @@ def delete_category(
     Returns:
         Deleted category
     """
-    db_category = crud.get_category(db, category_id=category_id)
-    if db_category is None or db_category.user_id != current_user.id:
+    # Ownership is part of the statement's WHERE clause; no pre-fetch needed
+    db_category = await aio.delete_category(db=db, category_id=category_id, user_id=current_user.id)
+    if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
-    return crud.delete_category(db=db, category_id=category_id, user_id=current_user.id)
+    return db_category
@@ -4,40 +4,57 @@ Transactions router - API endpoints for transaction management.
 This module handles all HTTP requests for transaction operations:
 - GET /api/v1/transactions - List all transactions (with filters)
 - POST /api/v1/transactions - Create a new transaction
+- POST /api/v1/transactions/import - Bulk import from a CSV or OFX statement
+- POST /api/v1/transactions/batch - Create, update and delete in one commit
+- GET /api/v1/transactions/export - Stream all matching transactions as CSV or NDJSON
 - GET /api/v1/transactions/{id} - Get a specific transaction
 - PUT /api/v1/transactions/{id} - Update a transaction
 - DELETE /api/v1/transactions/{id} - Delete a transaction
 
 Features:
 - Advanced filtering (by type, category, date range)
-- Pagination support
+- Pagination support (offset or keyset cursor via X-Next-Cursor header)
 - Nested category information in responses
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import date
 
-from app.database import get_db
-from app.schemas import Transaction, TransactionCreate, TransactionUpdate
-from app import crud
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.database import get_db, get_read_db, DbSession, ReadSessionLocal
+from app.core.pagination import encode_cursor, decode_cursor, InvalidCursor
+from app.core.exporters import EXPORT_FORMATS, EXPORT_MEDIA_TYPES
+from app.core.responses import FAST_JSON, FastJSONResponse
+from app.schemas import (
+    Transaction,
+    TransactionCreate,
+    TransactionUpdate,
+    ImportResult,
+    TransactionBatch,
+    TransactionBatchResult
+)
+from app.crud import aio
+from app.crud.transaction import iter_transaction_rows
+from app.crud.imports import IMPORT_FORMATS
+from app.api.deps import get_current_user, check_etag
+from app.core.user_cache import CachedUser
 
 router = APIRouter()
 
 
-@router.get("", response_model=List[Transaction])
-def list_transactions(
+@router.get("", response_model=List[Transaction], dependencies=[Depends(check_etag)])
+async def list_transactions(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum records to return"),
     type: Optional[str] = Query(None, description="Filter by type: income or expense"),
     category_id: Optional[int] = Query(None, description="Filter by category ID"),
     start_date: Optional[date] = Query(None, description="Filter from this date (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="Filter until this date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """
     Get all transactions for the current user with optional filtering.
@@ -49,27 +66,100 @@ def list_transactions(
         - category_id: Filter by category ID
         - start_date: Filter transactions from this date
         - end_date: Filter transactions until this date
+        - cursor: Continue after the last row of a previous page
+
+    Response Headers:
+        - X-Next-Cursor: Pass as `cursor` (with the same filters) to fetch the
+          next page. Omitted when there are no more rows.
+        - ETag: Send back as If-None-Match to get 304 Not Modified while the
+          user's data is unchanged.
 
     Returns:
         List of transactions with nested category information
     """
-    return crud.get_transactions(
-        db,
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    filters = dict(
         skip=skip,
         limit=limit,
         type=type,
         category_id=category_id,
         start_date=start_date,
         end_date=end_date,
-        user_id=current_user.id
+        user_id=current_user.id,
+        cursor=after
+    )
+
+    if FAST_JSON:
+        # Row tuples straight to orjson: no ORM entities, no re-validation
+        rows = await aio.get_transaction_rows(db, **filters)
+        if len(rows) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["date"], rows[-1]["id"])
+        return FastJSONResponse(rows, headers=response.headers)
+
+    transactions = await aio.get_transactions(db, **filters)
+
+    # A full page means there may be more rows after the last one
+    if len(transactions) == limit:
+        last = transactions[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.date, last.id)
+
+    return transactions
+
+
+@router.get("/export")
+async def export_transactions(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    type: Optional[str] = Query(None, description="Filter by type: income or expense"),
+    category_id: Optional[int] = Query(None, description="Filter by category ID"),
+    start_date: Optional[date] = Query(None, description="Filter from this date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Filter until this date (YYYY-MM-DD)"),
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """
+    Download all of the current user's transactions, newest first.
+
+    Rows are streamed from a database cursor as they are read, so the
+    response starts immediately and memory use does not grow with history.
+    CSV exports can be re-imported with POST /transactions/import.
+
+    Query Parameters:
+        - format: "csv" (default) or "ndjson" (one JSON object per line)
+        - type, category_id, start_date, end_date: Same filters as the list endpoint
+    """
+    encode = EXPORT_FORMATS[format]
+
+    def stream():
+        # The request's session is closed before the body is sent, so the
+        # stream owns a session for as long as it is being read
+        db = ReadSessionLocal(info={"user_id": current_user.id})
+        try:
+            yield from encode(iter_transaction_rows(
+                db,
+                user_id=current_user.id,
+                type=type,
+                category_id=category_id,
+                start_date=start_date,
+                end_date=end_date
+            ))
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'}
     )
 
 
 @router.post("", response_model=Transaction, status_code=status.HTTP_201_CREATED)
-def create_transaction(
+async def create_transaction(
     transaction: TransactionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """
     Create a new transaction for the current user.
@@ -87,18 +177,91 @@ def create_transaction(
         Created transaction with generated ID and category info
     """
     # Verify category belongs to user
-    category = crud.get_category(db, category_id=transaction.category_id)
+    category = await aio.get_category(db, category_id=transaction.category_id)
     if not category or category.user_id != current_user.id:
         raise HTTPException(status_code=400, detail="Invalid category")
 
-    return crud.create_transaction(db, transaction, user_id=current_user.id)
+    return await aio.create_transaction(db, transaction, user_id=current_user.id)
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_transactions(
+    file: UploadFile = File(..., description="CSV or OFX/QFX bank statement"),
+    format: Optional[str] = Form(None, description="csv or ofx (default: from the file extension)"),
+    default_category_id: Optional[int] = Form(None, description="Category for rows that don't name one"),
+    db: DbSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """
+    Bulk import transactions from a bank statement.
+
+    The file is parsed as a stream and inserted in batches, all in one
+    database transaction. Invalid rows are skipped and listed in the
+    response; valid rows are still imported.
+
+    CSV files need a header row with the columns date (YYYY-MM-DD) and
+    amount, plus optionally description, category (name), category_id and
+    type. A negative amount is imported as an expense of the absolute value.
+
+    OFX files have no categories, so default_category_id is required.
+
+    Returns:
+        Counts of imported and skipped rows, with per-row errors
+    """
+    if format is None:
+        format = (file.filename or "").rsplit(".", 1)[-1]
+    format = format.lower()
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported format (expected csv or ofx)")
+    if format != "csv" and default_category_id is None:
+        raise HTTPException(status_code=400, detail="default_category_id is required for OFX imports")
+
+    try:
+        return await aio.import_transactions(
+            db,
+            file.file,
+            format,
+            user_id=current_user.id,
+            default_category_id=default_category_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/batch", response_model=TransactionBatchResult)
+async def batch_transactions(
+    batch: TransactionBatch,
+    db: DbSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """
+    Apply several transaction writes in one request and one commit.
+
+    Operations run in order. Ones that target another user's (or a missing)
+    transaction or category are skipped and reported; the rest are saved
+    together.
+
+    Request Body:
+        {
+            "operations": [
+                {"op": "create", "data": {"amount": 12.5, "date": "2024-01-15", "category_id": 1, "type": "expense"}},
+                {"op": "update", "id": 42, "data": {"amount": 20}},
+                {"op": "delete", "id": 43}
+            ]
+        }
+
+    Returns:
+        One result per operation with its status, id and transaction
+    """
+    results = await aio.apply_transaction_batch(db, batch.operations, user_id=current_user.id)
+    return TransactionBatchResult(results=results)
 
 
-@router.get("/{transaction_id}", response_model=Transaction)
-def read_transaction(
+@router.get("/{transaction_id}", response_model=Transaction, dependencies=[Depends(check_etag)])
+async def read_transaction(
     transaction_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """
     Get a specific transaction by ID (must belong to current user).
@@ -109,18 +272,18 @@ def read_transaction(
     Returns:
         Transaction object with nested category information
     """
-    db_transaction = crud.get_transaction(db, transaction_id=transaction_id)
+    db_transaction = await aio.get_transaction(db, transaction_id=transaction_id)
     if db_transaction is None or db_transaction.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return db_transaction
 
 
 @router.put("/{transaction_id}", response_model=Transaction)
-def update_transaction(
+async def update_transaction(
     transaction_id: int,
     transaction: TransactionUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """
     Update a transaction (must belong to current user).
@@ -131,17 +294,24 @@ def update_transaction(
     Returns:
         Updated transaction
     """
-    db_transaction = crud.get_transaction(db, transaction_id=transaction_id)
-    if db_transaction is None or db_transaction.user_id != current_user.id:
+    # Ownership (of the transaction and a new category) is part of the
+    # statement's WHERE clause; no pre-fetch needed
+    try:
+        db_transaction = await aio.update_transaction(
+            db=db, transaction_id=transaction_id, transaction=transaction, user_id=current_user.id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
-    return crud.update_transaction(db=db, transaction_id=transaction_id, transaction=transaction, user_id=current_user.id)
+    return db_transaction
 
 
 @router.delete("/{transaction_id}", response_model=Transaction)
-def delete_transaction(
+async def delete_transaction(
     transaction_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DbSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """
     Delete a transaction (must belong to current user).
@@ -152,7 +322,8 @@ def delete_transaction(
     Returns:
         Deleted transaction
     """
-    db_transaction = crud.get_transaction(db, transaction_id=transaction_id)
-    if db_transaction is None or db_transaction.user_id != current_user.id:
+    # Ownership is part of the statement's WHERE clause; no pre-fetch needed
+    db_transaction = await aio.delete_transaction(db=db, transaction_id=transaction_id, user_id=current_user.id)
+    if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
-    return crud.delete_transaction(db=db, transaction_id=transaction_id, user_id=current_user.id)
+    return db_transaction
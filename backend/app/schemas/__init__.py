@@ -15,11 +15,31 @@ from .transaction import (
     TransactionBase,
     TransactionCreate,
     TransactionUpdate,
-    Transaction
+    Transaction,
+    ImportRowError,
+    ImportResult,
+    BatchOperation,
+    BatchCreate,
+    BatchUpdate,
+    BatchDelete,
+    TransactionBatch,
+    BatchItemResult,
+    TransactionBatchResult
 )
 from .analytics import (
     MonthlySummary,
-    CategorySummary
+    CategorySummary,
+    TrendPoint,
+    TrendSeries,
+    RollingPoint,
+    RollingAverageSeries,
+    AmountPercentiles,
+    CategoryStats,
+    WeekdayHeatmap
+)
+from .admin import (
+    SlowQuery,
+    SlowQueryReport
 )
 
 __all__ = [
@@ -33,7 +53,26 @@ __all__ = [
     "TransactionCreate",
     "TransactionUpdate",
     "Transaction",
+    "ImportRowError",
+    "ImportResult",
+    "BatchOperation",
+    "BatchCreate",
+    "BatchUpdate",
+    "BatchDelete",
+    "TransactionBatch",
+    "BatchItemResult",
+    "TransactionBatchResult",
     # Analytics schemas
     "MonthlySummary",
     "CategorySummary",
+    "TrendPoint",
+    "TrendSeries",
+    "RollingPoint",
+    "RollingAverageSeries",
+    "AmountPercentiles",
+    "CategoryStats",
+    "WeekdayHeatmap",
+    # Admin schemas
+    "SlowQuery",
+    "SlowQueryReport",
 ]
@@ -0,0 +1,29 @@
+"""
+Admin Pydantic schemas.
+
+These schemas define the structure of data for admin-only API responses.
+"""
+
+from typing import Any, List, Optional
+from pydantic import BaseModel, Field
+
+
+class SlowQuery(BaseModel):
+    """Schema for one statement that exceeded the slow-query threshold"""
+    at: str = Field(..., description="When it finished (ISO 8601, UTC)")
+    duration_ms: float
+    statement: str
+    parameters: Any = Field(..., description="Parameter types (values are never recorded)")
+    route: Optional[str] = Field(None, description="Method and route template of the request")
+    user: Optional[str] = Field(None, description="Keyed hash of the user id")
+    plan: Optional[List[str]] = Field(None, description="EXPLAIN output (null while being captured)")
+
+
+class SlowQueryReport(BaseModel):
+    """Schema for the slow-query log"""
+    threshold_ms: Optional[float] = Field(None, description="Null when the log is disabled")
+    recorded: int = Field(..., description="Slow queries seen since start (this process)")
+    buffered: int
+    plans_captured: int
+    plans_skipped: int
+    entries: List[SlowQuery] = Field(..., description="Most recent first")
@@ -4,6 +4,8 @@ Analytics Pydantic schemas.
 These schemas define the structure of data for analytics-related API responses.
 """
 
+from datetime import date
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -23,3 +25,65 @@ class CategorySummary(BaseModel):
     category_icon: str
     total_amount: float
     transaction_count: int
+
+
+class TrendPoint(BaseModel):
+    """Schema for one bucket of a trend series"""
+    period: str = Field(..., description="YYYY-MM, ISO YYYY-Www or YYYY-MM-DD")
+    start: date = Field(..., description="First day of the bucket")
+    total_income: float
+    total_expense: float
+    balance: float
+
+
+class TrendSeries(BaseModel):
+    """Schema for income/expense/balance over consecutive buckets"""
+    granularity: str = Field(..., description="month, week or day")
+    start_date: date
+    end_date: date
+    points: List[TrendPoint]
+
+
+class RollingPoint(BaseModel):
+    """Schema for one day of a rolling average series"""
+    date: date
+    total: float
+    rolling_average: float
+
+
+class RollingAverageSeries(BaseModel):
+    """Schema for daily totals with a trailing moving average"""
+    type: Optional[str] = Field(None, description="income, expense or None for both")
+    window: int = Field(..., description="Days in the moving average")
+    points: List[RollingPoint]
+
+
+class AmountPercentiles(BaseModel):
+    """Schema for the distribution of transaction amounts"""
+    type: Optional[str] = None
+    count: int
+    mean: float
+    percentiles: Dict[str, float] = Field(..., description="e.g. {\"p50\": 12.5, \"p90\": 80.0}")
+
+
+class CategoryStats(BaseModel):
+    """Schema for amount statistics of one category"""
+    category_id: int
+    category_name: str
+    category_color: str
+    category_icon: str
+    transaction_count: int
+    total_amount: float
+    mean_amount: float
+    median_amount: float
+    p90_amount: float
+
+
+class WeekdayHeatmap(BaseModel):
+    """Schema for totals by weekday (rows) and ISO week (columns)"""
+    type: Optional[str] = None
+    weekdays: List[str]
+    weeks: List[date] = Field(..., description="Monday of each column's week")
+    totals: List[List[float]] = Field(..., description="7 rows (Monday first) x one column per week")
+    weekday_totals: List[float]
+    weekday_counts: List[int]
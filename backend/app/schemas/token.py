@@ -15,3 +15,5 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     """Schema for JWT token payload"""
     email: Optional[str] = None
+    user_id: Optional[int] = None
+    is_active: Optional[bool] = None
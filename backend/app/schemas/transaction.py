@@ -6,7 +6,7 @@ These schemas define the structure of data for transaction-related API requests
 
 from pydantic import BaseModel, Field
 from datetime import date as datetime_date
-from typing import Optional
+from typing import Annotated, List, Literal, Optional, Union
 from .category import TransactionType, Category
 
 
@@ -40,3 +40,58 @@ class Transaction(TransactionBase):
 
     class Config:
         from_attributes = True
+
+
+class ImportRowError(BaseModel):
+    """A statement row that was skipped during import"""
+    row: int = Field(..., description="Row number in the file (CSV header is row 1)")
+    error: str
+
+
+class ImportResult(BaseModel):
+    """Summary of a bulk transaction import"""
+    imported: int = Field(..., description="Number of transactions created")
+    failed: int = Field(..., description="Number of rows skipped")
+    errors: List[ImportRowError] = Field(default_factory=list, description="Skipped rows (first 1000)")
+
+
+class BatchCreate(BaseModel):
+    """Batch operation: create a transaction"""
+    op: Literal["create"]
+    data: TransactionCreate
+
+
+class BatchUpdate(BaseModel):
+    """Batch operation: update a transaction"""
+    op: Literal["update"]
+    id: int = Field(..., gt=0)
+    data: TransactionUpdate
+
+
+class BatchDelete(BaseModel):
+    """Batch operation: delete a transaction"""
+    op: Literal["delete"]
+    id: int = Field(..., gt=0)
+
+
+BatchOperation = Annotated[Union[BatchCreate, BatchUpdate, BatchDelete], Field(discriminator="op")]
+
+
+class TransactionBatch(BaseModel):
+    """Schema for a batch of transaction writes applied in one commit"""
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=500)
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one batch operation, in request order"""
+    index: int = Field(..., description="Position of the operation in the request")
+    op: str
+    status: int = Field(..., description="HTTP-style status: 200, 201, 400 or 404")
+    id: Optional[int] = None
+    transaction: Optional[Transaction] = None
+    error: Optional[str] = None
+
+
+class TransactionBatchResult(BaseModel):
+    """Per-operation results of a batch"""
+    results: List[BatchItemResult]
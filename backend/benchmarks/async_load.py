@@ -0,0 +1,64 @@
+"""
+Load test: sync vs async database mode.
+
+Starts the app under uvicorn once with DATABASE_ASYNC=false and once with
+DATABASE_ASYNC=true, on the same database, and sends --requests
+GET /transactions requests (20 rows each) with --concurrency in flight.
+Prints requests/s and latency percentiles for each mode.
+
+Usage (from backend/):
+    python benchmarks/async_load.py [--requests 3000] [--concurrency 50]
+    DATABASE_URL=postgresql://... python benchmarks/async_load.py
+"""
+
+import argparse
+import asyncio
+import time
+
+from common import auth_headers, load_user, percentile, serve, setup
+
+
+async def run_load(url: str, headers: dict, requests: int, concurrency: int):
+    import httpx
+
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, headers=headers, timeout=60, limits=limits) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get("/api/v1/transactions", params={"limit": 20})
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    return requests / elapsed, [latency * 1000 for latency in latencies]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    user_id, _ = load_user(2000)
+    headers = auth_headers(user_id)
+    print(f"{args.requests} x GET /transactions, {args.concurrency} concurrent")
+    for mode in ("false", "true"):
+        with serve(DATABASE_ASYNC=mode) as url:
+            asyncio.run(run_load(url, headers, 100, 10))  # warm up
+            rate, latencies = asyncio.run(run_load(url, headers, args.requests, args.concurrency))
+        label = "async" if mode == "true" else "sync"
+        print(
+            f"  {label:5} {rate:6.0f} req/s   p50 {percentile(latencies, 50):6.1f} ms"
+            f"   p99 {percentile(latencies, 99):6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Shared setup for the benchmark scripts.
+
+Benchmarks run from backend/ (e.g. `python benchmarks/pagination.py`)
+against a throwaway SQLite database unless DATABASE_URL is set. The app
+reads its settings when it is imported, so scripts call setup() before
+importing anything from `app`.
+"""
+
+import datetime
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Rows per INSERT when loading data
+CHUNK_SIZE = 50000
+
+
+def setup(**env: str):
+    """
+    Point the app at a scratch database and make `app` importable.
+
+    Args:
+        **env: Settings for the run (e.g. SQLITE_PROFILE="default"); ones
+            already set in the environment win
+    """
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='money-manager-bench-')}/bench.db")
+    os.environ.setdefault("PASSWORD_HASH_POOL", "thread")
+    # As deployed (.env.example); SQLite's own settings are the app default
+    os.environ.setdefault("SQLITE_PROFILE", "performance")
+    # Bulk loads would fill the slow-query log
+    os.environ.setdefault("SLOW_QUERY_MS", "0")
+    for name, value in env.items():
+        os.environ.setdefault(name, value)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def load_user(rows: int, categories: int = 10, years: int = 5, email: str = None, seed: int = 1) -> Tuple[int, List[int]]:
+    """
+    Create a user with `rows` random transactions spread over the last
+    `years` years, with Core bulk inserts and a rollup rebuild.
+
+    Returns:
+        (user id, category ids)
+    """
+    from sqlalchemy import insert, select
+    from sqlalchemy.orm import Session
+    from app.crud import rebuild_rollups
+    from app.database import engine
+    from app.migrations import run_migrations
+    from app.models import Category, Transaction, User
+
+    run_migrations(engine)
+    rng = random.Random(seed)
+    email = email or f"bench-{time.time_ns()}@example.com"
+    with engine.begin() as conn:
+        user_id = conn.execute(
+            insert(User.__table__).values(email=email, hashed_password="!", is_active=True).returning(User.id)
+        ).scalar_one()
+        conn.execute(insert(Category.__table__), [
+            {"name": f"Category {i}", "type": "EXPENSE" if i % 4 else "INCOME", "user_id": user_id}
+            for i in range(categories)
+        ])
+        category_rows = conn.execute(
+            select(Category.id, Category.type).where(Category.user_id == user_id).order_by(Category.id)
+        ).all()
+
+    first_day = datetime.date.today() - datetime.timedelta(days=365 * years)
+    for start in range(0, rows, CHUNK_SIZE):
+        chunk = []
+        for _ in range(min(CHUNK_SIZE, rows - start)):
+            category_id, type = rng.choice(category_rows)
+            chunk.append({
+                "amount": round(rng.uniform(1, 500), 2),
+                "description": "bench",
+                "date": first_day + datetime.timedelta(days=rng.randrange(365 * years)),
+                "category_id": category_id,
+                "type": type,
+                "user_id": user_id,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(Transaction.__table__), chunk)
+
+    with Session(engine) as db:
+        rebuild_rollups(db, user_id=user_id)
+        db.commit()
+    return user_id, [category_id for category_id, _ in category_rows]
+
+
+def auth_headers(user_id: int, email: str = None) -> dict:
+    """Bearer token headers for a user, without going through bcrypt"""
+    from app.core.security import create_access_token
+    from app.database import SessionLocal
+    from app.models import User
+
+    if email is None:
+        with SessionLocal() as db:
+            email = db.get(User, user_id).email
+    token = create_access_token(
+        data={"sub": email, "uid": user_id, "active": True}, expires_delta=datetime.timedelta(hours=1)
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+def median_ms(fn: Callable, repeat: int = 20, warmup: int = 2) -> float:
+    """Median wall time of fn() in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def percentile(values: List[float], p: float) -> float:
+    """p-th percentile (0-100) of values, nearest rank"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+@contextmanager
+def serve(**env: str) -> Iterator[str]:
+    """
+    Run the app under uvicorn (one worker) on the scratch database.
+
+    Args:
+        **env: Settings for the server process on top of the current ones
+
+    Yields:
+        Base URL of the server
+    """
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, **env},
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(300):
+            try:
+                if httpx.get(f"{url}/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with {server.returncode}")
+            time.sleep(0.1)
+        else:
+            raise RuntimeError("Server did not start")
+        yield url
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
@@ -0,0 +1,59 @@
+"""
+Microbenchmark: ORM + response model vs the FAST_JSON row path.
+
+For pages of 100, 1000 and 10000 transactions, times what the list endpoint
+does per request on each path, from query to encoded body:
+
+- current: get_transactions (ORM entities), FastAPI's serialize_response
+  through List[Transaction], JSONResponse
+- fast: get_transaction_rows (row tuples to dicts), FastJSONResponse
+
+Usage (from backend/):
+    python benchmarks/fast_json.py [--rows 20000]
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List
+
+from common import load_user, median_ms, setup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    setup()
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from app.core.responses import FastJSONResponse
+    from app.crud import get_transaction_rows, get_transactions
+    from app.database import ReadSessionLocal
+    from app.schemas import Transaction
+
+    user_id, _ = load_user(args.rows)
+    field = create_model_field(name="Response", type_=List[Transaction], mode="serialization")
+
+    def current(limit: int) -> bytes:
+        with ReadSessionLocal(info={"user_id": user_id}) as db:
+            rows = get_transactions(db, user_id=user_id, limit=limit)
+            content = asyncio.run(serialize_response(field=field, response_content=rows, is_coroutine=True))
+            return JSONResponse(content).body
+
+    def fast(limit: int) -> bytes:
+        with ReadSessionLocal(info={"user_id": user_id}) as db:
+            return FastJSONResponse(get_transaction_rows(db, user_id=user_id, limit=limit)).body
+
+    assert json.loads(current(100)) == json.loads(fast(100)), "the paths disagree"
+    print(f"median per request, {args.rows} rows in the table")
+    for limit in (100, 1000, 10000):
+        repeat = 7 if limit >= 10000 else 25
+        slow, quick = median_ms(lambda: current(limit), repeat), median_ms(lambda: fast(limit), repeat)
+        print(f"  {limit:>6} rows: current {slow:7.1f} ms   fast {quick:6.1f} ms   ({slow / quick:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
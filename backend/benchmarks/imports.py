@@ -0,0 +1,116 @@
+"""
+Bulk statement import throughput.
+
+Builds a CSV and an OFX statement of --rows transactions (1% of them
+invalid) and times parsing alone and the full import (validation, chunked
+inserts, rollups and the commit) into a new user each run, in rows per
+second, against the 50k rows/s goal. For scale, also times the same rows
+created one by one through create_transaction (on a --sample of them).
+
+Usage (from backend/):
+    python benchmarks/imports.py [--rows 200000] [--sample 2000] [--runs 3]
+"""
+
+import argparse
+import datetime
+import io
+import random
+import statistics
+import time
+
+from common import load_user, setup
+
+GOAL_ROWS_PER_SECOND = 50000
+
+
+def make_rows(count: int, seed: int = 1) -> list:
+    """(date, signed amount, description, category number) tuples; every 100th amount is invalid"""
+    rng = random.Random(seed)
+    first_day = datetime.date.today() - datetime.timedelta(days=5 * 365)
+    return [
+        (
+            first_day + datetime.timedelta(days=rng.randrange(5 * 365)),
+            "n/a" if i % 100 == 99 else f"{-rng.uniform(1, 500):.2f}",
+            f"Card payment {i}",
+            rng.randrange(10),
+        )
+        for i in range(count)
+    ]
+
+
+def to_csv(rows: list) -> bytes:
+    lines = ["date,amount,description,category"]
+    lines += [f"{day},{amount},{description},Category {category}" for day, amount, description, category in rows]
+    return "\n".join(lines).encode()
+
+
+def to_ofx(rows: list) -> bytes:
+    blocks = [
+        f"<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>{day:%Y%m%d}<TRNAMT>{amount}<NAME>{description}</STMTTRN>"
+        for day, amount, description, _ in rows
+    ]
+    return ("OFXHEADER:100\n<OFX><BANKTRANLIST>\n" + "\n".join(blocks) + "\n</BANKTRANLIST></OFX>\n").encode()
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--sample", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+    from app.core.importers import iter_csv_rows, iter_ofx_rows
+    from app.crud import create_transaction, import_transactions
+    from app.database import SessionLocal
+    from app.schemas.transaction import TransactionCreate
+
+    rows = make_rows(args.rows)
+    files = {"csv": to_csv(rows), "ofx": to_ofx(rows)}
+    parsers = {"csv": iter_csv_rows, "ofx": iter_ofx_rows}
+
+    print(f"{args.rows} rows, median of {args.runs} runs (goal: {GOAL_ROWS_PER_SECOND} rows/s)")
+    for format, data in files.items():
+        parse = statistics.median(
+            timed(lambda: sum(1 for _ in parsers[format](io.BytesIO(data)))) for _ in range(args.runs)
+        )
+        imports = []
+        for _ in range(args.runs):
+            user_id, category_ids = load_user(0)
+            db = SessionLocal(info={"user_id": user_id})
+            default = category_ids[0] if format == "ofx" else None
+            imports.append(timed(lambda: import_transactions(db, io.BytesIO(data), format, user_id, default)))
+            db.close()
+        total = statistics.median(imports)
+        print(
+            f"  {format}: parse {args.rows / parse:9,.0f} rows/s   "
+            f"import {args.rows / total:9,.0f} rows/s ({total:.2f} s)"
+        )
+
+    user_id, category_ids = load_user(0)
+    sample = [row for row in rows[:args.sample] if row[1] != "n/a"]
+    db = SessionLocal(info={"user_id": user_id})
+
+    def one_by_one():
+        for day, amount, description, category in sample:
+            create_transaction(
+                db,
+                TransactionCreate(
+                    amount=abs(float(amount)), date=day, description=description,
+                    category_id=category_ids[category], type="expense",
+                ),
+                user_id=user_id,
+            )
+
+    print(f"  create_transaction one by one: {len(sample) / timed(one_by_one):9,.0f} rows/s ({len(sample)} rows)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Columnar (NumPy) insights vs the equivalent SQL.
+
+Loads one user with --rows transactions over five years and times each
+insight computed from the cached snapshot against a SQL query computing
+the same thing (window functions and GROUP BY), plus the cold snapshot
+load that a user pays once until their next write. The SQL is written for
+SQLite.
+
+Usage (from backend/):
+    python benchmarks/insights.py [--rows 100000]
+"""
+
+import argparse
+import datetime
+
+from common import load_user, median_ms, setup
+
+MEDIAN_SQL = """
+WITH ranked AS (
+  SELECT category_id, amount,
+         ROW_NUMBER() OVER (PARTITION BY category_id ORDER BY amount) AS rn,
+         COUNT(*) OVER (PARTITION BY category_id) AS n
+  FROM transactions WHERE user_id = :u AND type = 'EXPENSE' AND date BETWEEN :s AND :e
+)
+SELECT category_id, COUNT(*), SUM(amount),
+       AVG(CASE WHEN rn IN ((n + 1) / 2, (n + 2) / 2) THEN amount END),
+       MAX(CASE WHEN rn <= CAST(0.9 * (n - 1) AS INT) + 1 THEN amount END)
+FROM ranked GROUP BY category_id
+"""
+
+ROLLING_SQL = """
+WITH RECURSIVE days(d) AS (SELECT date(:s) UNION ALL SELECT date(d, '+1 day') FROM days WHERE d < :e),
+daily AS (SELECT date AS d, SUM(amount) AS total FROM transactions
+          WHERE user_id = :u AND type = 'EXPENSE' AND date BETWEEN :s AND :e GROUP BY date)
+SELECT days.d, COALESCE(daily.total, 0),
+       AVG(COALESCE(daily.total, 0)) OVER (ORDER BY days.d ROWS BETWEEN 6 PRECEDING AND CURRENT ROW)
+FROM days LEFT JOIN daily ON daily.d = days.d
+"""
+
+WEEKDAY_SQL = """
+SELECT strftime('%w', date) AS weekday, CAST((julianday(date) - julianday(:m)) / 7 AS INT) AS week, SUM(amount)
+FROM transactions WHERE user_id = :u AND type = 'EXPENSE' AND date BETWEEN :s AND :e GROUP BY weekday, week
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    setup()
+    from sqlalchemy import text
+    from app.crud.insights import get_category_stats, get_rolling_average, get_weekday_heatmap, load_snapshot
+    from app.crud.user import get_data_version
+    from app.database import ReadSessionLocal
+
+    user_id, _ = load_user(args.rows, years=5)
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=5 * 365)
+    params = {"u": user_id, "s": str(start), "e": str(end), "m": str(start - datetime.timedelta(days=start.weekday()))}
+    db = ReadSessionLocal(info={"user_id": user_id})
+    version = get_data_version(db, user_id)
+
+    print(f"{args.rows} rows over 5 years, median")
+    print(f"  snapshot load (cold)     {median_ms(lambda: load_snapshot(db, user_id), 7):7.1f} ms")
+    for label, sql, insight in [
+        ("category median/p90", MEDIAN_SQL, lambda: get_category_stats(db, user_id, start, end, data_version=version)),
+        ("7-day rolling average", ROLLING_SQL, lambda: get_rolling_average(db, user_id, start, end, 7, data_version=version)),
+        ("weekday x week heatmap", WEEKDAY_SQL, lambda: get_weekday_heatmap(db, user_id, start, end, data_version=version)),
+    ]:
+        query = text(sql)
+        sql_ms = median_ms(lambda: db.execute(query, params).all(), 7)
+        print(f"  {label:24} SQL {sql_ms:7.1f} ms   numpy (cached) {median_ms(insight, 7):6.1f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Load test: CRUD latency during a login storm.
+
+Starts the app under uvicorn with the password hashing pool under test,
+then measures GET /categories latency from --clients clients, first on a
+quiet server and then while --logins logins arrive at once. Logins beyond
+PASSWORD_HASH_MAX_PENDING are answered 503 straight away; CRUD p99 should
+stay close to the quiet figure.
+
+Usage (from backend/):
+    python benchmarks/login_storm.py [--logins 200] [--clients 5] [--rounds 12] [--pool process]
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from common import percentile, serve, setup
+
+EMAIL, PASSWORD = "storm@example.com", "storm-password"
+
+
+async def storm(url: str, clients: int, logins: int):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        await client.post("/api/v1/auth/users", json={"email": EMAIL, "password": PASSWORD})
+        response = await client.post("/api/v1/auth/token", data={"username": EMAIL, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        async def crud(latencies):
+            for _ in range(100):
+                start = time.perf_counter()
+                (await client.get("/api/v1/categories/", headers=headers)).raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        async def login(codes):
+            response = await client.post("/api/v1/auth/token", data={"username": EMAIL, "password": PASSWORD})
+            codes.append(response.status_code)
+
+        quiet, during, codes = [], [], []
+        await asyncio.gather(*(crud(quiet) for _ in range(clients)))
+        await asyncio.gather(*(crud(during) for _ in range(clients)), *(login(codes) for _ in range(logins)))
+    return quiet, during, Counter(codes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--pool", default="process", help="PASSWORD_HASH_POOL: process or thread")
+    args = parser.parse_args()
+
+    setup()
+    with serve(PASSWORD_HASH_POOL=args.pool, BCRYPT_ROUNDS=str(args.rounds)) as url:
+        quiet, during, codes = asyncio.run(storm(url, args.clients, args.logins))
+    print(f"{args.logins} logins (rounds={args.rounds}, {args.pool} pool) while {args.clients} clients list categories")
+    print(f"  CRUD quiet   p50 {percentile(quiet, 50):6.1f} ms   p99 {percentile(quiet, 99):6.1f} ms")
+    print(f"  CRUD storm   p50 {percentile(during, 50):6.1f} ms   p99 {percentile(during, 99):6.1f} ms")
+    print(f"  logins       {dict(sorted(codes.items()))}")
+
+
+if __name__ == "__main__":
+    main()
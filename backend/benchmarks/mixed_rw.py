@@ -0,0 +1,96 @@
+"""
+Mixed read/write throughput: SQLite profiles compared.
+
+For each SQLite profile (default: SQLite's own settings; performance: WAL,
+tuned pragmas, one serialized writer), starts the app under uvicorn on a
+fresh database file, seeds 300 transactions and runs --clients clients for
+--seconds. Each operation is a write (POST /transactions) with probability
+--writes, otherwise a read (the transaction list or the category
+analytics, uncached). Prints operations/s and read/write latency.
+
+Usage (from backend/):
+    python benchmarks/mixed_rw.py [--clients 16] [--seconds 8] [--writes 0.2] [--async]
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+
+from common import percentile, serve, setup
+
+EMAIL, PASSWORD = "mixed@example.com", "mixed-password"
+
+
+async def run_mix(url: str, clients: int, seconds: float, writes: float):
+    import httpx
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        await client.post("/api/v1/auth/users", json={"email": EMAIL, "password": PASSWORD})
+        token = (await client.post("/api/v1/auth/token", data={"username": EMAIL, "password": PASSWORD})).json()
+        client.headers["Authorization"] = f"Bearer {token['access_token']}"
+        category = (await client.post("/api/v1/categories/", json={"name": "Food", "type": "expense"})).json()
+        new_transaction = {"amount": 5, "date": "2024-02-03", "category_id": category["id"], "type": "expense"}
+        for i in range(300):
+            await client.post("/api/v1/transactions", json={**new_transaction, "date": f"2024-0{1 + i % 9}-1{i % 9}"})
+
+        latencies = {"read": [], "write": []}
+        errors = 0
+        stop = time.perf_counter() + seconds
+
+        async def worker(seed: int):
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.perf_counter() < stop:
+                kind = "write" if rng.random() < writes else "read"
+                start = time.perf_counter()
+                if kind == "write":
+                    response = await client.post("/api/v1/transactions", json=new_transaction)
+                elif rng.random() < 0.5:
+                    response = await client.get("/api/v1/transactions", params={"limit": 50})
+                else:
+                    response = await client.get("/api/v1/analytics/categories", params={"start_date": "2024-01-01"})
+                if response.status_code >= 400:
+                    errors += 1
+                else:
+                    latencies[kind].append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*(worker(seed) for seed in range(clients)))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=8)
+    parser.add_argument("--writes", type=float, default=0.2, help="share of operations that write")
+    parser.add_argument("--async", dest="is_async", action="store_true", help="DATABASE_ASYNC=true")
+    args = parser.parse_args()
+
+    setup()
+    print(
+        f"{args.clients} clients, {args.seconds:g} s, {args.writes:.0%} writes, "
+        f"{'async' if args.is_async else 'sync'} mode; latencies p50/p99"
+    )
+    for profile in ("default", "performance"):
+        # Fresh file each: WAL mode sticks to a database once set
+        database = f"sqlite:///{tempfile.mkdtemp(prefix='money-manager-bench-')}/mixed.db"
+        with serve(
+            DATABASE_URL=database,
+            SQLITE_PROFILE=profile,
+            DATABASE_ASYNC="true" if args.is_async else "false",
+            ANALYTICS_CACHE_BACKEND="none",
+        ) as url:
+            latencies, errors = asyncio.run(run_mix(url, args.clients, args.seconds, args.writes))
+        reads, writes = latencies["read"], latencies["write"]
+        print(
+            f"  {profile:11} {(len(reads) + len(writes)) / args.seconds:5.0f} ops/s"
+            f"   read {percentile(reads, 50):5.0f}/{percentile(reads, 99):<5.0f} ms"
+            f"   write {percentile(writes, 50):5.0f}/{percentile(writes, 99):<5.0f} ms   errors {errors}"
+        )
+
+
+if __name__ == "__main__":
+    main()
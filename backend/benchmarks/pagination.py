@@ -0,0 +1,43 @@
+"""
+Offset vs keyset pagination of the transaction list.
+
+Loads one user with --rows transactions and times fetching page N (of
+--page-size rows, newest first) with skip=N*size and with the keyset cursor
+of the previous page. Offset pages get slower the deeper they are, keyset
+pages should cost the same at any depth.
+
+Usage (from backend/):
+    python benchmarks/pagination.py [--rows 200000] [--page-size 100]
+"""
+
+import argparse
+
+from common import load_user, median_ms, setup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    setup()
+    from app.crud import get_transactions
+    from app.database import ReadSessionLocal
+
+    user_id, _ = load_user(args.rows)
+    size = args.page_size
+    db = ReadSessionLocal(info={"user_id": user_id})
+    print(f"{args.rows} rows, {size} per page, median of 20 runs")
+    for page in (1, 10, 100, 1000):
+        if page * size >= args.rows:
+            break
+        last = get_transactions(db, user_id=user_id, skip=page * size - 1, limit=1)[0]
+        offset = median_ms(lambda: get_transactions(db, user_id=user_id, skip=page * size, limit=size))
+        keyset = median_ms(lambda: get_transactions(db, user_id=user_id, limit=size, cursor=(last.date, last.id)))
+        print(f"  page {page:>5}: offset {offset:8.2f} ms   keyset {keyset:6.2f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Period queries: half-open date ranges vs extract() filters.
+
+Fills the transactions table with --rows rows over --users users, then for
+one user prints the EXPLAIN QUERY PLAN and median time of the month,
+quarter and ISO-week queries (get_transactions_by_period), next to the
+extract('year'/'month') month filter they replaced. The range queries
+should be index range searches on (user_id, date); the extract() filter can
+only narrow by user and then checks every one of their rows.
+
+Usage (from backend/):
+    python benchmarks/periods.py [--rows 1000000] [--users 100]
+    python benchmarks/periods.py --rows 10000000    # the 10M-row table
+"""
+
+import argparse
+import datetime
+
+from common import load_user, median_ms, setup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    setup()
+    from sqlalchemy import event, extract
+    from app.crud import get_transactions_by_period
+    from app.crud.transaction import _query_with_category
+    from app.database import ReadSessionLocal, read_engine
+    from app.models import Transaction
+
+    for n in range(args.users):
+        user_id, _ = load_user(args.rows // args.users, seed=n)
+    today = datetime.date.today()
+    year = today.year - 1
+    iso_year, iso_week, _ = (today - datetime.timedelta(days=200)).isocalendar()
+
+    def by_extract(db):
+        return _query_with_category(db).filter(
+            Transaction.user_id == user_id,
+            extract("year", Transaction.date) == year,
+            extract("month", Transaction.date) == 5,
+        ).order_by(Transaction.date.desc(), Transaction.id.desc()).all()
+
+    cases = [
+        ("month (extract)", by_extract),
+        ("month (range)", lambda db: get_transactions_by_period(db, user_id, year, month=5)),
+        ("quarter (range)", lambda db: get_transactions_by_period(db, user_id, year, quarter=2)),
+        ("ISO week (range)", lambda db: get_transactions_by_period(db, user_id, iso_year, week=iso_week)),
+    ]
+    print(f"{args.rows} rows over {args.users} users; one user's periods, median of 20 runs")
+    db = ReadSessionLocal(info={"user_id": user_id})
+    for label, query in cases:
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(read_engine, "before_cursor_execute", record)
+        rows = len(query(db))
+        event.remove(read_engine, "before_cursor_execute", record)
+        with read_engine.connect() as conn:
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statements[-1][0]}", statements[-1][1])]
+        print(f"  {label:18} {rows:6} rows {median_ms(lambda: query(db)):8.2f} ms   {' | '.join(plan)}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Migration script to upgrade the database schema.
+
+Run this script to apply all pending schema migrations:
+    python migrate.py
+
+It is safe to run repeatedly; already-applied migrations are skipped.
+With DATABASE_SHARD_URLS set, every shard is migrated as well, then the
+shards are registered to hand out global ids.
+"""
+
+from app.database import writer_engines
+from app.migrations import run_migrations, MIGRATIONS
+from app.crud import register_shards
+
+
+def migrate_database():
+    """Main migrate function."""
+    for name, engine in writer_engines().items():
+        print(f"\n🛠️  Migrating database ({name})...\n")
+        version = run_migrations(engine, verbose=True)
+        print(f"\n✅ Database schema is at version {version} (latest: {MIGRATIONS[-1].version})\n")
+    ordinals = register_shards()
+    if ordinals:
+        print("✅ Shards registered for global ids: " + ", ".join(f"{n}={o}" for n, o in ordinals.items()) + "\n")
+
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,95 @@
+"""
+Shard rebalancing script.
+
+Shows how users are spread over the shards and moves users between shards
+while the app keeps serving them (see app.core.shards):
+    python rebalance.py status
+    python rebalance.py move USER_ID SHARD
+    python rebalance.py plan
+    python rebalance.py apply [--limit N]
+
+plan lists the users that are not on the shard rendezvous hashing picks for
+them: after a shard is added to DATABASE_SHARD_URLS (run migrate.py first),
+the users that now hash to it, and users still on the primary from before
+sharding. apply moves them, one user at a time.
+"""
+
+import argparse
+import sys
+from app.database import SessionLocal, shard_map
+from app.crud import get_misplaced_users, get_shard_counts, move_user
+
+
+def status() -> int:
+    """Print the number of users per shard."""
+    db = SessionLocal()
+    try:
+        counts = get_shard_counts(db)
+    finally:
+        db.close()
+    for name, count in counts.items():
+        print(f"  {name}: {count} users")
+    return 0
+
+
+def move(user_id: int, target: str) -> int:
+    """Move one user to a shard."""
+    try:
+        moved = move_user(user_id, target)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    if moved.source == moved.target:
+        print(f"✓ User {user_id} is already on {target}")
+    else:
+        print(
+            f"✓ Moved user {user_id} from {moved.source} to {moved.target}: {moved.categories} categories, "
+            f"{moved.transactions} transactions, {moved.rollups} rollup rows"
+        )
+    return 0
+
+
+def plan(limit=None, apply=False) -> int:
+    """List (and with apply, move) users that are not on their hashed shard."""
+    db = SessionLocal()
+    try:
+        misplaced = get_misplaced_users(db)
+    finally:
+        db.close()
+    if limit is not None:
+        misplaced = misplaced[:limit]
+    if not misplaced:
+        print("✓ Every user is on their shard")
+        return 0
+
+    for user_id, current, home in misplaced:
+        if not apply:
+            print(f"  user {user_id}: {current} -> {home}")
+        elif move(user_id, home):
+            return 1
+    if not apply:
+        print(f"{len(misplaced)} users to move (run `python rebalance.py apply`)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and rebalance user shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Users per shard")
+    move_parser = commands.add_parser("move", help="Move one user to a shard")
+    move_parser.add_argument("user_id", type=int)
+    move_parser.add_argument("shard")
+    commands.add_parser("plan", help="List users that are not on their hashed shard")
+    apply_parser = commands.add_parser("apply", help="Move users onto their hashed shard")
+    apply_parser.add_argument("--limit", type=int, default=None, help="Move at most this many users")
+    args = parser.parse_args()
+
+    if not shard_map.enabled:
+        print("❌ Sharding is not enabled (set DATABASE_SHARD_URLS)")
+        sys.exit(2)
+
+    if args.command == "status":
+        sys.exit(status())
+    if args.command == "move":
+        sys.exit(move(args.user_id, args.shard))
+    sys.exit(plan(limit=getattr(args, "limit", None), apply=args.command == "apply"))
@@ -0,0 +1,73 @@
+"""
+Rollup maintenance script.
+
+Recomputes the monthly_rollups table from raw transactions, or checks it for
+drift without changing anything:
+    python rollups.py verify [--user-id ID]
+    python rollups.py rebuild [--user-id ID]
+
+verify exits with status 1 when drift is found. With sharding enabled, every
+shard is processed (or just the user's).
+"""
+
+import argparse
+import sys
+from app.database import SessionLocal, writer_engines
+from app.crud import rebuild_rollups, verify_rollups
+
+
+def _sessions(user_id=None):
+    """Sessions covering the rollups to process: the user's shard, or every shard"""
+    if user_id is not None:
+        return [SessionLocal(info={"user_id": user_id})]
+    return [SessionLocal(info={"shard": name}) for name in writer_engines()]
+
+
+def verify(user_id=None) -> int:
+    """Report rollup rows that disagree with raw transactions."""
+    drift = []
+    for db in _sessions(user_id):
+        try:
+            drift += verify_rollups(db, user_id=user_id)
+        finally:
+            db.close()
+
+    if not drift:
+        print("✓ Rollups match raw transactions")
+        return 0
+
+    print(f"❌ Found {len(drift)} drifted rollup rows:")
+    for d in drift:
+        print(
+            f"  user={d.user_id} month={d.year_month} type={d.type} category={d.category_id}: "
+            f"total {d.actual_total:.2f} (expected {d.expected_total:.2f}), "
+            f"count {d.actual_count} (expected {d.expected_count})"
+        )
+    return 1
+
+
+def rebuild(user_id=None) -> int:
+    """Recompute rollups from raw transactions."""
+    rows = 0
+    for db in _sessions(user_id):
+        try:
+            rows += rebuild_rollups(db, user_id=user_id)
+            db.commit()
+        except Exception as e:
+            print(f"❌ Error rebuilding rollups: {e}")
+            db.rollback()
+            return 1
+        finally:
+            db.close()
+    print(f"✓ Rebuilt {rows} rollup rows")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or verify monthly rollups")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--user-id", type=int, default=None, help="Only process this user")
+    args = parser.parse_args()
+
+    command = verify if args.command == "verify" else rebuild
+    sys.exit(command(user_id=args.user_id))
@@ -8,9 +8,11 @@ Run this script to populate the database with:
 """
 
 from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine, Base
+from app.database import SessionLocal, writer_engines
+from app.migrations import run_migrations
 from app.models import User, Category, Transaction
 from app.core.security import get_password_hash
+from app.crud import place_user, rebuild_rollups, register_shards
 from datetime import date, timedelta
 
 
@@ -32,6 +34,7 @@ def create_admin_user(db: Session):
     )
     db.add(admin)
     db.commit()
+    place_user(db, admin)
     db.refresh(admin)
     print(f"✓ Created admin user: {admin_email}")
     print(f"  Password: admin123")
@@ -103,6 +106,8 @@ def create_sample_transactions(db: Session, user_id: int, categories: list):
             db.add(transaction)
             created_count += 1
 
+    # Transactions were added directly, so recompute this user's rollups
+    rebuild_rollups(db, user_id=user_id)
     db.commit()
     print(f"✓ Created {created_count} sample transactions")
 
@@ -112,7 +117,9 @@ def seed_database():
     print("\n🌱 Seeding database...\n")
 
     # Create tables
-    Base.metadata.create_all(bind=engine)
+    for engine in writer_engines().values():
+        run_migrations(engine)
+    register_shards()
 
     # Create database session
     db = SessionLocal()
@@ -120,6 +127,8 @@ def seed_database():
     try:
         # Create admin user
         admin = create_admin_user(db)
+        # The sample data goes to the admin's shard when sharding is enabled
+        db.info["user_id"] = admin.id
 
         # Create sample categories
         categories = create_sample_categories(db, admin.id)
@@ -0,0 +1,114 @@
+"""
+Shared fixtures for the backend tests.
+
+The app reads its settings when it is imported, so they are set here first:
+a throwaway SQLite database (TEST_DATABASE_URL to use another one), migrated
+on import by AUTO_MIGRATE, password hashing on threads with a cheap work
+factor, and no replicas or shards (TEST_DATABASE_SHARD_URLS to add shards).
+"""
+
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+import pytest
+
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='money-manager-tests-')}/test.db"
+)
+os.environ["AUTO_MIGRATE"] = "true"
+os.environ["PASSWORD_HASH_POOL"] = "thread"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["DATABASE_SHARD_URLS"] = os.getenv("TEST_DATABASE_SHARD_URLS", "")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+API = "/api/v1"
+
+
+class StatementLog:
+    """SQL statements (with their DBAPI parameters) run by any engine while recording"""
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        # Transaction control (e.g. the SQLite profile's BEGIN IMMEDIATE) is not a query
+        if statement.split(None, 1)[0].upper() not in ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE"):
+            self.statements.append((statement, parameters))
+
+    def clear(self):
+        self.statements.clear()
+
+    @contextmanager
+    def expect(self, count: int):
+        """Assert that the block runs exactly `count` statements"""
+        self.clear()
+        yield self
+        ran = [statement for statement, _ in self.statements]
+        assert len(ran) == count, f"expected {count} statements, ran {len(ran)}:\n" + "\n".join(ran)
+
+    def __len__(self):
+        return len(self.statements)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def statements():
+    log = StatementLog()
+    event.listen(Engine, "before_cursor_execute", log._record)
+    yield log
+    event.remove(Engine, "before_cursor_execute", log._record)
+
+
+@pytest.fixture
+def auth(client):
+    """Authorization headers of a new user (already looked up once, so their row is cached)"""
+    email = f"{uuid.uuid4().hex}@example.com"
+    assert client.post(f"{API}/auth/users", json={"email": email, "password": "pw"}).status_code == 200
+    token = client.post(f"{API}/auth/token", data={"username": email, "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get(f"{API}/categories/", headers=headers).status_code == 200
+    return headers
+
+
+@pytest.fixture
+def category(client, auth) -> dict:
+    """An expense category of the `auth` user"""
+    response = client.post(f"{API}/categories/", json={"name": "Food", "type": "expense"}, headers=auth)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+@pytest.fixture
+def add_transactions(client, auth, category):
+    """Create `count` transactions for the `auth` user in `category`, spread over a month"""
+
+    def add(count: int, month: str = "2024-02") -> list:
+        created = []
+        for i in range(count):
+            response = client.post(
+                f"{API}/transactions",
+                json={
+                    "amount": i + 1,
+                    "date": f"{month}-{i % 28 + 1:02d}",
+                    "category_id": category["id"],
+                    "type": "expense",
+                },
+                headers=auth,
+            )
+            assert response.status_code == 201, response.text
+            created.append(response.json())
+        return created
+
+    return add
@@ -0,0 +1,92 @@
+"""
+Conditional GETs: ETags from the user's data version, and 304 Not Modified.
+"""
+
+import uuid
+
+import pytest
+
+from conftest import API
+
+READS = [
+    "/transactions",
+    "/categories/",
+    "/analytics/monthly/2024/2",
+    "/analytics/categories",
+    "/analytics/trends",
+]
+
+
+@pytest.mark.parametrize("path", READS)
+def test_repeat_request_is_not_modified(client, auth, add_transactions, path):
+    add_transactions(3)
+    first = client.get(f"{API}{path}", headers=auth)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    again = client.get(f"{API}{path}", headers={**auth, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+
+def test_statements_skipped_when_not_modified(client, auth, add_transactions, statements):
+    add_transactions(3)
+    etag = client.get(f"{API}/transactions", headers=auth).headers["ETag"]
+    # Only the data version is read
+    with statements.expect(1):
+        assert client.get(f"{API}/transactions", headers={**auth, "If-None-Match": etag}).status_code == 304
+
+
+def test_etags_are_per_user(client, auth, add_transactions):
+    add_transactions(1)
+    etag = client.get(f"{API}/transactions", headers=auth).headers["ETag"]
+    email = f"{uuid.uuid4().hex}@example.com"
+    client.post(f"{API}/auth/users", json={"email": email, "password": "pw"})
+    token = client.post(f"{API}/auth/token", data={"username": email, "password": "pw"}).json()["access_token"]
+    other = {"Authorization": f"Bearer {token}", "If-None-Match": etag}
+    assert client.get(f"{API}/transactions", headers=other).status_code == 200
+
+
+def create_transaction(client, auth, transaction, category):
+    return client.post(
+        f"{API}/transactions",
+        json={"amount": 7, "date": "2024-02-03", "category_id": category["id"], "type": "expense"},
+        headers=auth,
+    )
+
+
+MUTATIONS = {
+    "create transaction": create_transaction,
+    "update transaction": lambda client, auth, transaction, category: client.put(
+        f"{API}/transactions/{transaction['id']}", json={"amount": 9}, headers=auth
+    ),
+    "delete transaction": lambda client, auth, transaction, category: client.delete(
+        f"{API}/transactions/{transaction['id']}", headers=auth
+    ),
+    "create category": lambda client, auth, transaction, category: client.post(
+        f"{API}/categories/", json={"name": "New", "type": "income"}, headers=auth
+    ),
+    "update category": lambda client, auth, transaction, category: client.put(
+        f"{API}/categories/{category['id']}", json={"name": "Renamed"}, headers=auth
+    ),
+    "delete category": lambda client, auth, transaction, category: client.delete(
+        f"{API}/categories/{category['id']}", headers=auth
+    ),
+}
+
+
+@pytest.mark.parametrize("mutation", MUTATIONS.values(), ids=MUTATIONS.keys())
+@pytest.mark.parametrize("path", ["/transactions", "/categories/", "/analytics/monthly/2024/2"])
+def test_writes_change_the_etag(client, auth, category, add_transactions, mutation, path):
+    (transaction,) = add_transactions(1)
+    before = client.get(f"{API}{path}", headers=auth)
+
+    response = mutation(client, auth, transaction, category)
+    assert response.status_code in (200, 201), response.text
+
+    after = client.get(f"{API}{path}", headers={**auth, "If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before.headers["ETag"]
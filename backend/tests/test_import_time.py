@@ -0,0 +1,52 @@
+"""
+Cold-start budget of the Vercel entrypoint.
+
+Imports api/index.py in a fresh interpreter with the serverless profile
+(VERCEL=1), as a cold start does, under `python -X importtime`. The import
+must stay within IMPORT_TIME_BUDGET_MS (best of three runs), must not touch
+the database, and must leave the lazily loaded modules alone.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+# About 1.0-1.3 s on a single-CPU CI box; fastapi, sqlalchemy.orm and
+# pydantic alone take about 0.65 s of that
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2500"))
+
+# Loaded on first use, never by the import
+LAZY_MODULES = ("numpy", "jose", "passlib", "app.migrations")
+
+API_DIR = Path(__file__).resolve().parents[2] / "api"
+
+PROBE = f"""
+import sys
+sys.path.insert(0, {str(API_DIR)!r})
+import index
+print(",".join(name for name in {LAZY_MODULES!r} if name in sys.modules))
+"""
+
+
+def cold_import(database: Path):
+    env = {name: value for name, value in os.environ.items() if name not in ("AUTO_MIGRATE", "DB_PROFILE")}
+    env.update(VERCEL="1", DATABASE_URL=f"sqlite:///{database}", PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        env=env, cwd=API_DIR, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    timings = [line.split("|") for line in result.stderr.splitlines() if line.startswith("import time:")]
+    total_us = next(int(cumulative) for _, cumulative, name in timings if name.strip() == "index")
+    slowest = sorted(timings, key=lambda t: -int(t[1]) if t[1].strip().isdigit() else 0)[:10]
+    return total_us / 1000, result.stdout.strip(), [re.sub(r"\s+", " ", "|".join(t)) for t in slowest]
+
+
+def test_cold_import_budget(tmp_path):
+    runs = [cold_import(tmp_path / "cold.db") for _ in range(3)]
+    best_ms, loaded, slowest = min(runs)
+    assert best_ms <= IMPORT_TIME_BUDGET_MS, f"api/index.py imported in {best_ms:.0f} ms:\n" + "\n".join(slowest)
+    assert loaded == "", f"imported eagerly: {loaded}"
+    assert not (tmp_path / "cold.db").exists(), "the import connected to the database"
@@ -0,0 +1,103 @@
+"""
+Bulk import of statement files.
+"""
+
+import io
+
+from app.core.importers import iter_ofx_rows
+from app.core.security import decode_access_token
+from app.crud import verify_rollups
+from app.database import ReadSessionLocal
+from conftest import API
+
+CSV = """date,amount,description,category,type
+2024-02-01,12.50,Lunch,Food,
+2024-02-02,-30,Groceries,food,
+2024-02-03,abc,Bad amount,Food,
+2024-02-04,nan,Not a number,Food,
+2024-02-05,inf,Infinite,Food,
+2024-02-06,0,Zero,Food,
+2024-02-30,5,Bad date,Food,
+2024-02-07,5,Unknown category,Travel,
+2024-02-08,5,Bad type,Food,refund
+2024-03-01,"1,000.00",Bonus,Food,income
+"""
+
+
+def upload(client, auth, content: str, name: str = "statement.csv", **form):
+    return client.post(
+        f"{API}/transactions/import",
+        files={"file": (name, content.encode(), "text/csv")},
+        data=form,
+        headers=auth,
+    )
+
+
+def test_import_keeps_valid_rows_and_reports_the_rest(client, auth, category):
+    response = upload(client, auth, CSV)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["imported"], result["failed"]) == (3, 7)
+    # Row numbers count the header as row 1
+    assert [(error["row"], error["error"]) for error in result["errors"]] == [
+        (4, "Invalid amount: 'abc'"),
+        (5, "Invalid amount: 'nan'"),
+        (6, "Invalid amount: 'inf'"),
+        (7, "Amount must not be zero"),
+        (8, "Invalid date (expected YYYY-MM-DD): '2024-02-30'"),
+        (9, "Unknown category: 'Travel'"),
+        (10, "Invalid type: 'refund'"),
+    ]
+
+    rows = client.get(f"{API}/transactions", params={"limit": 100}, headers=auth).json()
+    assert sorted((row["date"], row["amount"], row["type"]) for row in rows) == [
+        ("2024-02-01", 12.5, "expense"),
+        ("2024-02-02", 30.0, "expense"),
+        ("2024-03-01", 1000.0, "income"),
+    ]
+
+
+def test_import_updates_rollups_and_data_version(client, auth, category):
+    etag = client.get(f"{API}/analytics/monthly/2024/2", headers=auth).headers["ETag"]
+    assert upload(client, auth, CSV).status_code == 200
+
+    february = client.get(f"{API}/analytics/monthly/2024/2", headers={**auth, "If-None-Match": etag})
+    assert february.status_code == 200
+    assert (february.json()["total_expense"], february.json()["total_income"]) == (42.5, 0)
+    march = client.get(f"{API}/analytics/monthly/2024/3", headers=auth).json()
+    assert march["total_income"] == 1000
+    user_id = decode_access_token(auth["Authorization"].split()[1])["uid"]
+    with ReadSessionLocal(info={"user_id": user_id}) as db:
+        assert verify_rollups(db, user_id) == []
+
+
+def test_import_without_valid_rows_changes_nothing(client, auth, category):
+    etag = client.get(f"{API}/transactions", headers=auth).headers["ETag"]
+    response = upload(client, auth, "date,amount,category\n2024-02-01,abc,Food\n")
+    assert (response.json()["imported"], response.json()["failed"]) == (0, 1)
+    assert client.get(f"{API}/transactions", headers={**auth, "If-None-Match": etag}).status_code == 304
+
+
+def test_ofx_import(client, auth, category):
+    ofx = (
+        "OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"
+        "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240205120000<TRNAMT>-4.20<NAME>Café<MEMO>Coffee</STMTTRN>\n"
+        "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>2024<TRNAMT>-1</STMTTRN>\n"
+        "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+    )
+    response = upload(client, auth, ofx, name="statement.ofx", default_category_id=str(category["id"]))
+    assert response.status_code == 200, response.text
+    assert (response.json()["imported"], response.json()["failed"]) == (1, 1)
+    (row,) = client.get(f"{API}/transactions", headers=auth).json()
+    assert (row["date"], row["amount"], row["description"]) == ("2024-02-05", 4.2, "Café - Coffee")
+
+
+def test_ofx_characters_split_across_reads():
+    data = "<STMTTRN><DTPOSTED>20240205<TRNAMT>-1<NAME>Crème brûlée</STMTTRN>".encode()
+    for chunk_size in range(1, 8):
+        ((_, fields),) = list(iter_ofx_rows(io.BytesIO(data), chunk_size=chunk_size))
+        assert fields["description"] == "Crème brûlée"
+
+
+def test_ofx_import_needs_a_default_category(client, auth, category):
+    assert upload(client, auth, "<OFX></OFX>", name="statement.ofx").status_code == 400
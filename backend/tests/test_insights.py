@@ -0,0 +1,144 @@
+"""
+Insight analytics tests (NumPy-backed /analytics/insights/* endpoints).
+
+The expected values are worked out by hand from the `march` fixture.
+"""
+
+import pytest
+
+from app.core import changes, columnar
+from app.core.columnar import snapshot_cache
+from conftest import API
+
+pytest.importorskip("numpy")
+
+PERIOD = {"start_date": "2024-02-01", "end_date": "2024-02-29"}
+
+
+@pytest.fixture
+def march(client, auth) -> dict:
+    """
+    Expenses in Food and Rent plus one income, in March 2024 (the 4th and
+    11th are Mondays):
+
+        Mon 4   Food 10
+        Tue 5   Food 20, Rent 90
+        Thu 7   Food 30
+        Mon 11  Food 40, Salary 1000 (income)
+    """
+    ids = {}
+    for name, kind in (("Food", "expense"), ("Rent", "expense"), ("Salary", "income")):
+        response = client.post(f"{API}/categories/", json={"name": name, "type": kind}, headers=auth)
+        ids[name] = response.json()["id"]
+    rows = [(4, "Food", 10), (5, "Food", 20), (5, "Rent", 90), (7, "Food", 30), (11, "Food", 40), (11, "Salary", 1000)]
+    for day, name, amount in rows:
+        kind = "income" if name == "Salary" else "expense"
+        response = client.post(
+            f"{API}/transactions",
+            json={"amount": amount, "date": f"2024-03-{day:02d}", "category_id": ids[name], "type": kind},
+            headers=auth,
+        )
+        assert response.status_code == 201, response.text
+    return ids
+
+
+def insight(client, auth, name: str, **params):
+    response = client.get(f"{API}/analytics/insights/{name}", params=params, headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_rolling_average(client, auth, march):
+    series = insight(client, auth, "rolling", window=3, start_date="2024-03-05", end_date="2024-03-08")
+    assert series["window"] == 3
+    # The first average reaches back before start_date, to the 4th
+    assert [(p["date"], p["total"], p["rolling_average"]) for p in series["points"]] == [
+        ("2024-03-05", 110, pytest.approx(40)),
+        ("2024-03-06", 0, pytest.approx(40)),
+        ("2024-03-07", 30, pytest.approx(140 / 3)),
+        ("2024-03-08", 0, pytest.approx(10)),
+    ]
+
+
+def test_rolling_average_income(client, auth, march):
+    series = insight(client, auth, "rolling", window=2, type="income", start_date="2024-03-11", end_date="2024-03-12")
+    assert [(p["total"], p["rolling_average"]) for p in series["points"]] == [(1000, 500), (0, 500)]
+
+
+def test_percentiles(client, auth, march):
+    # Expenses sorted: 10, 20, 30, 40, 90 (linear interpolation between ranks)
+    result = insight(client, auth, "percentiles", p=[0, 50, 90, 100], start_date="2024-03-01", end_date="2024-03-31")
+    assert result["count"] == 5
+    assert result["mean"] == pytest.approx(38)
+    assert result["percentiles"] == {"p0": 10, "p50": 30, "p90": pytest.approx(70), "p100": 90}
+
+    both = insight(client, auth, "percentiles", p=[50], type="all", start_date="2024-03-01", end_date="2024-03-31")
+    assert (both["count"], both["percentiles"]) == (6, {"p50": 35})
+
+
+def test_percentiles_of_an_empty_range(client, auth, march):
+    result = insight(client, auth, "percentiles", start_date="2024-04-01", end_date="2024-04-30")
+    assert result == {"type": "expense", "count": 0, "mean": 0, "percentiles": {"p50": 0, "p90": 0, "p99": 0}}
+
+
+def test_category_stats(client, auth, march):
+    stats = insight(client, auth, "categories", start_date="2024-03-01", end_date="2024-03-31")
+    assert [
+        (s["category_id"], s["category_name"], s["transaction_count"], s["total_amount"], s["mean_amount"],
+         s["median_amount"], s["p90_amount"])
+        for s in stats
+    ] == [
+        (march["Food"], "Food", 4, 100, 25, 25, pytest.approx(37)),
+        (march["Rent"], "Rent", 1, 90, 90, 90, 90),
+    ]
+    # Without the 4th and the 11th, Rent has the larger total
+    stats = insight(client, auth, "categories", start_date="2024-03-05", end_date="2024-03-10")
+    assert [(s["category_name"], s["total_amount"], s["median_amount"]) for s in stats] == [
+        ("Rent", 90, 90),
+        ("Food", 50, 25),
+    ]
+
+
+def test_weekday_heatmap(client, auth, march):
+    heatmap = insight(client, auth, "weekdays", start_date="2024-03-05", end_date="2024-03-11")
+    assert heatmap["weekdays"] == ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    assert heatmap["weeks"] == ["2024-03-04", "2024-03-11"]
+    # Monday the 4th is before start_date
+    assert heatmap["totals"] == [[0, 40], [110, 0], [0, 0], [30, 0], [0, 0], [0, 0], [0, 0]]
+    assert heatmap["weekday_totals"] == [40, 110, 0, 30, 0, 0, 0]
+    assert heatmap["weekday_counts"] == [1, 2, 0, 1, 0, 0, 0]
+
+
+def test_insights_without_numpy(client, auth, monkeypatch):
+    monkeypatch.setattr(columnar, "np", None)
+    monkeypatch.setattr(columnar, "NUMPY_AVAILABLE", False)
+    response = client.get(f"{API}/analytics/insights/rolling", params=PERIOD, headers=auth)
+    assert response.status_code == 501
+
+
+def test_snapshot_follows_data_version_of_other_processes(client, auth, add_transactions, monkeypatch):
+    add_transactions(1)
+    url = f"{API}/analytics/insights/percentiles"
+    first = client.get(url, params=PERIOD, headers=auth)
+    assert first.json()["count"] == 1
+
+    # Another worker's commit bumps the data version without reaching this process's cache
+    listeners = [listener for listener in changes._listeners if listener != snapshot_cache.invalidate]
+    monkeypatch.setattr(changes, "_listeners", listeners)
+    add_transactions(1)
+
+    second = client.get(url, params=PERIOD, headers={**auth, "If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert second.json()["count"] == 2
+
+
+@pytest.mark.parametrize("name,days", [("rolling", 90), ("weekdays", 364)])
+def test_default_range_ends_at_end_date(client, auth, march, name, days):
+    result = insight(client, auth, name, end_date="2024-03-31")
+    if name == "rolling":
+        assert len(result["points"]) == days
+        assert (result["points"][0]["date"], result["points"][-1]["date"]) == ("2024-01-02", "2024-03-31")
+    else:
+        # 364 days from Monday 2023-04-03 are exactly 52 weeks
+        assert (len(result["weeks"]), result["weeks"][0]) == (52, "2023-04-03")
@@ -0,0 +1,55 @@
+"""
+Monitoring endpoints: a bare liveness check, and metrics and status for
+operators only.
+"""
+
+import uuid
+
+import pytest
+
+from app.api import deps
+from conftest import API
+
+
+@pytest.fixture
+def admin(client, monkeypatch) -> dict:
+    """Authorization headers of a user listed in ADMIN_EMAILS"""
+    email = f"{uuid.uuid4().hex}@example.com"
+    monkeypatch.setattr(deps, "ADMIN_EMAILS", {email})
+    client.post(f"{API}/auth/users", json={"email": email, "password": "pw"})
+    token = client.post(f"{API}/auth/token", data={"username": email, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_health_is_a_liveness_answer(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "healthy", "version": "1.0.0"}
+
+
+def test_metrics_need_credentials(client, auth, monkeypatch):
+    monkeypatch.setattr(deps, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    # A user's own token is not enough
+    assert client.get("/metrics", headers=auth).status_code == 403
+
+
+def test_metrics_with_the_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(deps, "METRICS_TOKEN", "scrape-secret")
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "db_pool_checked_out" in response.text
+
+
+def test_metrics_without_a_token_configured(client, admin, monkeypatch):
+    monkeypatch.setattr(deps, "METRICS_TOKEN", "")
+    assert client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 401
+    assert client.get("/metrics", headers=admin).status_code == 200
+
+
+def test_status_is_for_admins(client, auth, admin):
+    assert client.get(f"{API}/admin/status", headers=auth).status_code == 403
+    response = client.get(f"{API}/admin/status", headers=admin)
+    assert response.status_code == 200
+    assert {"user_cache", "password_hashing", "database_pool", "analytics_cache"} <= response.json().keys()
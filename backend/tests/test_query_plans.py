@@ -0,0 +1,71 @@
+"""
+The per-user queries behind the hot endpoints must be served by an index.
+
+Each case calls an endpoint, takes the SELECTs it ran and checks their
+EXPLAIN QUERY PLAN for a full scan of a per-user table. SQLite only:
+PostgreSQL rightly prefers sequential scans on tables as small as the test
+database's, so its plans say nothing about production.
+"""
+
+import re
+
+import pytest
+from app.database import read_engine
+
+from conftest import API
+
+pytestmark = pytest.mark.skipif(read_engine.dialect.name != "sqlite", reason="plans are checked on SQLite")
+
+# "SCAN transactions" and "SCAN transactions USING INDEX ..." both read the whole table
+FULL_SCAN = re.compile(r"^SCAN (transactions|categories|monthly_rollups)\b")
+
+ENDPOINTS = [
+    ("/transactions", {"limit": 20}),
+    ("/transactions", {"skip": 20, "limit": 20}),
+    ("/transactions", {"type": "expense"}),
+    ("/transactions", {"category_id": "{category}"}),
+    ("/transactions", {"start_date": "2024-02-01", "end_date": "2024-02-15"}),
+    ("/transactions/export", {}),
+    ("/categories/", {}),
+    ("/analytics/monthly/2024/2", {}),
+    ("/analytics/categories", {}),
+    ("/analytics/categories", {"start_date": "2024-02-01", "end_date": "2024-02-29"}),
+    ("/analytics/trends", {"start_date": "2024-01-01", "end_date": "2024-03-31"}),
+    ("/analytics/trends", {"granularity": "week", "start_date": "2024-01-01", "end_date": "2024-03-31"}),
+    ("/analytics/trends", {"granularity": "day", "start_date": "2024-02-01", "end_date": "2024-02-29"}),
+]
+
+
+def plan_of(statement: str, parameters) -> list:
+    with read_engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def full_scans(statements) -> list:
+    scans = []
+    for statement, parameters in list(statements.statements):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            scans += [(statement, step) for step in plan_of(statement, parameters) if FULL_SCAN.match(step)]
+    return scans
+
+
+@pytest.mark.parametrize("path,params", ENDPOINTS)
+def test_endpoint_uses_indexes(client, auth, category, add_transactions, statements, path, params):
+    add_transactions(30)
+    params = {key: str(value).format(category=category["id"]) for key, value in params.items()}
+    statements.clear()
+    response = client.get(f"{API}{path}", params=params, headers=auth)
+    assert response.status_code == 200, response.text
+    assert len(statements), "no statements recorded"
+    assert full_scans(statements) == []
+
+
+def test_keyset_page_uses_indexes(client, auth, add_transactions, statements):
+    add_transactions(30)
+    first = client.get(f"{API}/transactions", params={"limit": 10}, headers=auth)
+    statements.clear()
+    response = client.get(
+        f"{API}/transactions", params={"limit": 10, "cursor": first.headers["X-Next-Cursor"]}, headers=auth
+    )
+    assert response.status_code == 200, response.text
+    assert full_scans(statements) == []
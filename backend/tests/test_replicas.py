@@ -0,0 +1,103 @@
+"""
+Read-replica routing, with a copy of the test database as the replica.
+"""
+
+import os
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import database
+from app.core import changes
+from app.core.replicas import Replica, ReplicaRouter
+from conftest import API
+
+pytestmark = pytest.mark.skipif(
+    database.read_engine.dialect.name != "sqlite" or not database.read_engine.url.database,
+    reason="the replica is a copy of the SQLite test database",
+)
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """A replica copied from the primary now, routed to by ReadSession"""
+    path = tmp_path / "replica.db"
+    with sqlite3.connect(database.read_engine.url.database) as source, sqlite3.connect(path) as target:
+        source.backup(target)
+    replica = Replica("replica", create_engine(f"sqlite:///{path}"))
+    if database.DATABASE_ASYNC:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        replica.async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    # Registering the router's write listener must not outlive the test
+    monkeypatch.setattr(changes, "_listeners", list(changes._listeners))
+    router = ReplicaRouter(sticky_seconds=60)
+    router.configure(database.read_engine, [replica])
+    # Health is checked by hand below
+    monkeypatch.setattr(router, "_ensure_checker", lambda: None)
+    router.check()
+    assert replica.healthy, replica.last_error
+    monkeypatch.setattr(database, "replica_router", router)
+    yield replica
+    replica.engine.dispose()
+
+
+def on_replica(replica, sql: str, **params):
+    with replica.engine.begin() as conn:
+        conn.execute(text(sql), params)
+
+
+@pytest.fixture
+def transaction(client, auth, add_transactions):
+    (created,) = add_transactions(1)
+    return created
+
+
+def describe(client, auth, transaction) -> str:
+    response = client.get(f"{API}/transactions/{transaction['id']}", headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()["description"]
+
+
+def test_reads_go_to_the_replica(client, auth, transaction, replica):
+    on_replica(replica, "UPDATE transactions SET description = 'replica' WHERE id = :id", id=transaction["id"])
+    assert describe(client, auth, transaction) == "replica"
+    assert replica.reads > 0
+    assert database.replica_router.primary_reads == 0
+
+
+def test_writes_use_the_primary_and_stick(client, auth, transaction, replica):
+    on_replica(replica, "UPDATE transactions SET description = 'replica' WHERE id = :id", id=transaction["id"])
+    response = client.put(f"{API}/transactions/{transaction['id']}", json={"description": "primary"}, headers=auth)
+    assert response.status_code == 200, response.text
+
+    # The user just wrote, so they read the primary until the window passes
+    assert describe(client, auth, transaction) == "primary"
+    assert database.replica_router.sticky_reads > 0
+    database.replica_router.sticky_seconds = 0
+    assert describe(client, auth, transaction) == "replica"
+
+
+def test_unavailable_replica_falls_back_to_the_primary(client, auth, transaction, replica, tmp_path):
+    on_replica(replica, "UPDATE transactions SET description = 'replica' WHERE id = :id", id=transaction["id"])
+    assert describe(client, auth, transaction) == "replica"
+
+    # The replica's file disappears behind a directory that does not exist
+    replica.engine.dispose()
+    replica.engine = create_engine(f"sqlite:///{tmp_path / 'gone' / 'replica.db'}")
+    database.replica_router.check()
+    assert not replica.healthy
+
+    reads = replica.reads
+    assert describe(client, auth, transaction) is None
+    assert replica.reads == reads
+    assert database.replica_router.primary_reads > 0
+
+
+def test_unauthenticated_lookups_use_the_primary(client, replica):
+    # Registered after the copy: a replica read would not find them
+    email = f"{os.urandom(8).hex()}@example.com"
+    assert client.post(f"{API}/auth/users", json={"email": email, "password": "pw"}).status_code == 200
+    assert client.post(f"{API}/auth/token", data={"username": email, "password": "pw"}).status_code == 200
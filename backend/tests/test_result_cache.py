@@ -0,0 +1,170 @@
+"""
+Analytics result cache tests, with a dict standing in for the shared store.
+"""
+
+import asyncio
+import threading
+
+from app.core.result_cache import MemoryBackend, ResultCache, SharedBackend
+
+
+class FakeClient:
+    """The part of redis.Redis that SharedBackend uses, backed by a dict"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.fail = False
+
+    def get(self, name):
+        if self.fail:
+            raise ConnectionError("store down")
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None):
+        if self.fail:
+            raise ConnectionError("store down")
+        self.data[name] = value.encode()
+        self.expiry[name] = ex
+
+
+class Counter:
+    """compute/refresh functions that count their calls"""
+
+    def __init__(self, value="v"):
+        self.value = value
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    async def compute(self):
+        self.calls += 1
+        return self.value
+
+    def refresh(self):
+        with self.lock:
+            self.calls += 1
+        return self.value
+
+
+def run(cache: ResultCache, *lookups):
+    """Run get_or_compute calls in order, then wait for background refreshes"""
+
+    async def main():
+        results = [await cache.get_or_compute(*args, **kwargs) for args, kwargs in lookups]
+        while cache._tasks:
+            await asyncio.gather(*cache._tasks)
+        return results
+
+    return asyncio.run(main())
+
+
+def lookup(counter: Counter, data_version: int = 1, params=None, refresh=False):
+    return (
+        (7, data_version, "monthly", params or {"year": 2024, "month": 2}, counter.compute),
+        {"refresh": counter.refresh if refresh else None},
+    )
+
+
+def test_shared_backend_hit_across_caches():
+    client = FakeClient()
+    counter = Counter({"total": 1.5})
+    # Two processes sharing one store
+    assert run(ResultCache(SharedBackend(client)), lookup(counter)) == [{"total": 1.5}]
+    assert run(ResultCache(SharedBackend(client)), lookup(counter)) == [{"total": 1.5}]
+    assert counter.calls == 1
+    (name,) = client.data
+    assert name.startswith("mm:analytics:7:1:monthly:")
+    assert client.expiry[name] == 360
+
+
+def test_new_data_version_misses():
+    cache = ResultCache(SharedBackend(FakeClient()))
+    counter = Counter()
+    run(cache, lookup(counter, 1), lookup(counter, 1), lookup(counter, 2))
+    assert counter.calls == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_params_are_part_of_the_key():
+    cache = ResultCache(MemoryBackend())
+    counter = Counter()
+    run(cache, lookup(counter, params={"year": 2024, "month": 2}), lookup(counter, params={"month": 2, "year": 2024}))
+    run(cache, lookup(counter, params={"year": 2024, "month": 3}))
+    assert counter.calls == 2
+
+
+def test_stale_entry_served_with_one_background_refresh():
+    client = FakeClient()
+    # Everything is stale as soon as it is stored
+    cache = ResultCache(SharedBackend(client), ttl=0, stale_ttl=60)
+    run(cache, lookup(Counter("old")))
+
+    counter = Counter("new")
+    release = threading.Event()
+    refresh = counter.refresh
+
+    def slow_refresh():
+        release.wait(5)
+        return refresh()
+
+    counter.refresh = slow_refresh
+
+    async def main():
+        # Concurrent requests while the refresh is still running
+        args, kwargs = lookup(counter, refresh=True)
+        results = await asyncio.gather(*[cache.get_or_compute(*args, **kwargs) for _ in range(5)])
+        release.set()
+        await asyncio.gather(*cache._tasks)
+        return results
+
+    assert asyncio.run(main()) == ["old"] * 5
+    assert counter.calls == 1
+    assert (cache.stale_hits, cache.refreshes) == (5, 1)
+    assert run(cache, lookup(counter, refresh=True)) == ["new"]
+
+
+def test_stale_entry_without_refresh_is_recomputed():
+    cache = ResultCache(SharedBackend(FakeClient()), ttl=0, stale_ttl=60)
+    run(cache, lookup(Counter("old")))
+    assert run(cache, lookup(Counter("new"))) == ["new"]
+
+
+def test_invalidate_drops_memory_entries():
+    cache = ResultCache(MemoryBackend())
+    counter = Counter()
+    run(cache, lookup(counter))
+    cache.invalidate({7})
+    run(cache, lookup(counter))
+    assert counter.calls == 2
+
+
+def test_backend_errors_degrade_to_misses():
+    client = FakeClient()
+    backend = SharedBackend(client)
+    cache = ResultCache(backend)
+    counter = Counter()
+    client.fail = True
+    assert run(cache, lookup(counter), lookup(counter)) == ["v", "v"]
+    assert counter.calls == 2
+    assert backend.errors == 4
+    assert cache.stats()["errors"] == 4
+
+
+def test_undecodable_value_is_a_miss():
+    client = FakeClient()
+    backend = SharedBackend(client)
+    cache = ResultCache(backend)
+    run(cache, lookup(Counter()))
+    (name,) = client.data
+    client.data[name] = b"not json"
+    counter = Counter("recomputed")
+    assert run(cache, lookup(counter)) == ["recomputed"]
+    assert backend.errors == 1
+
+
+def test_disabled_cache_always_computes():
+    cache = ResultCache(None)
+    counter = Counter()
+    run(cache, lookup(counter), lookup(counter))
+    assert counter.calls == 2
+    assert cache.stats()["enabled"] is False
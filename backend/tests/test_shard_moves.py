@@ -0,0 +1,185 @@
+"""
+Moving users between shards, on SQLite files.
+
+Sharding is configured when the app is imported, so these tests need a
+session started with shards: run as part of the normal suite, the last test
+reruns this module in a fresh interpreter with TEST_DATABASE_SHARD_URLS
+pointing at two new SQLite files next to a new primary.
+"""
+
+import os
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select, text
+
+from app import crud
+from app.core.shards import ID_STRIDE, PRIMARY, ShardMoved
+from app.crud.shard import categories, id_sequences, rollups, transactions
+from app.database import SessionLocal, shard_map
+from app.schemas.transaction import TransactionCreate
+from conftest import API
+
+sharded = pytest.mark.skipif(not shard_map.enabled, reason="needs TEST_DATABASE_SHARD_URLS")
+
+
+def new_user(client) -> tuple:
+    """(user id, Authorization headers) of a new user"""
+    email = f"{uuid.uuid4().hex}@example.com"
+    user = client.post(f"{API}/auth/users", json={"email": email, "password": "pw"}).json()
+    token = client.post(f"{API}/auth/token", data={"username": email, "password": "pw"}).json()["access_token"]
+    return user["id"], {"Authorization": f"Bearer {token}"}
+
+
+def add_data(client, headers, count: int = 12) -> list:
+    """Two categories and `count` transactions over two months; returns the transactions"""
+    category_ids = [
+        client.post(f"{API}/categories/", json={"name": f"C{i}", "type": "expense"}, headers=headers).json()["id"]
+        for i in range(2)
+    ]
+    created = []
+    for i in range(count):
+        response = client.post(
+            f"{API}/transactions",
+            json={"amount": i + 1, "date": f"2024-0{i % 2 + 1}-{i % 28 + 1:02d}",
+                  "category_id": category_ids[i % 2], "type": "expense"},
+            headers=headers,
+        )
+        assert response.status_code == 201, response.text
+        created.append(response.json())
+    return created
+
+
+def shard_of(user_id: int) -> str:
+    with shard_map.primary.read_engine.connect() as conn:
+        return conn.execute(text("SELECT shard FROM users WHERE id = :id"), {"id": user_id}).scalar() or PRIMARY
+
+
+def rows_on(name: str, table, user_id: int) -> list:
+    """The user's rows of a table on one shard, without their ids for rollups"""
+    columns = [c for c in table.c if table is not rollups or c.name != "id"]
+    with shard_map.get(name).read_engine.connect() as conn:
+        return sorted(tuple(row) for row in conn.execute(select(*columns).where(table.c.user_id == user_id)))
+
+
+def snapshot(user_id: int, name: str) -> dict:
+    return {table.name: rows_on(name, table, user_id) for table in (categories, transactions, rollups)}
+
+
+def other_shard(name: str) -> str:
+    return next(shard for shard in shard_map.placement if shard != name)
+
+
+@sharded
+def test_move_user(client):
+    user_id, headers = new_user(client)
+    add_data(client, headers)
+    source = shard_of(user_id)
+    before = snapshot(user_id, source)
+    listing = client.get(f"{API}/transactions", params={"limit": 100}, headers=headers).json()
+    summary = client.get(f"{API}/analytics/monthly/2024/2", headers=headers).json()
+
+    target = other_shard(source)
+    moved = crud.move_user(user_id, target)
+
+    assert (moved.source, moved.target) == (source, target)
+    assert (moved.categories, moved.transactions) == (2, 12)
+    assert moved.rollups == len(before["monthly_rollups"])
+    assert shard_of(user_id) == target
+    # Every row arrived with its id, rollups included, and none stayed behind
+    assert snapshot(user_id, target) == before
+    assert snapshot(user_id, source) == {name: [] for name in before}
+    assert client.get(f"{API}/transactions", params={"limit": 100}, headers=headers).json() == listing
+    assert client.get(f"{API}/analytics/monthly/2024/2", headers=headers).json() == summary
+
+    # Writes land on the new shard and keep the rollups right
+    response = client.post(
+        f"{API}/transactions",
+        json={"amount": 100, "date": "2024-02-10", "category_id": listing[0]["category_id"], "type": "expense"},
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    after = client.get(f"{API}/analytics/monthly/2024/2", headers=headers).json()
+    assert after["total_expense"] == summary["total_expense"] + 100
+
+
+@sharded
+def test_writes_during_move_are_fenced(client):
+    user_id, headers = new_user(client)
+    (transaction,) = add_data(client, headers, count=1)
+    source = shard_map.get(shard_of(user_id))
+
+    # Step 1 of move_user, as if the copy were still running
+    with source.engine.begin() as conn:
+        conn.execute(
+            text("UPDATE users SET moving_to = :to WHERE id = :id"), {"to": other_shard(source.name), "id": user_id}
+        )
+    try:
+        db = SessionLocal(info={"user_id": user_id})
+        with pytest.raises(ShardMoved):
+            crud.create_transaction(
+                db,
+                TransactionCreate(amount=1, date="2024-02-01", category_id=transaction["category_id"], type="expense"),
+                user_id=user_id,
+            )
+        db.close()
+
+        response = client.put(f"{API}/transactions/{transaction['id']}", json={"amount": 5}, headers=headers)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        # Reads keep being served from the source
+        assert client.get(f"{API}/transactions/{transaction['id']}", headers=headers).json()["amount"] == 1
+    finally:
+        with source.engine.begin() as conn:
+            conn.execute(text("UPDATE users SET moving_to = NULL WHERE id = :id"), {"id": user_id})
+
+    response = client.put(f"{API}/transactions/{transaction['id']}", json={"amount": 5}, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+@sharded
+def test_global_ids_do_not_collide(client):
+    users = [new_user(client) for _ in range(6)]
+    for _, headers in users:
+        add_data(client, headers, count=3)
+    # Move some users both ways, so shards hold ids handed out elsewhere
+    for user_id, _ in users[:3]:
+        crud.move_user(user_id, other_shard(shard_of(user_id)))
+    for user_id, _ in users[:2]:
+        crud.move_user(user_id, PRIMARY)
+    _, headers = users[0]
+    add_data(client, headers, count=3)
+
+    ordinals = {}
+    for table in (categories, transactions):
+        ids = []
+        for name, shard in shard_map.shards.items():
+            with shard.read_engine.connect() as conn:
+                ids += conn.execute(select(table.c.id)).scalars().all()
+                ordinals[name] = conn.execute(select(func.max(id_sequences.c.ordinal))).scalar()
+        assert len(ids) == len(set(ids)), f"duplicate {table.name} ids"
+    assert ordinals[PRIMARY] == 0
+    assert len(set(ordinals.values())) == len(ordinals)
+
+    # New rows carry the ordinal of the database that created them
+    user_id, headers = users[-1]
+    created = add_data(client, headers, count=2)
+    assert {row["id"] % ID_STRIDE for row in created} == {ordinals[shard_of(user_id)]}
+
+
+@pytest.mark.skipif(shard_map.enabled, reason="already running with shards")
+def test_sharded(tmp_path):
+    env = dict(os.environ)
+    env.update(
+        TEST_DATABASE_URL=f"sqlite:///{tmp_path / 'primary.db'}",
+        TEST_DATABASE_SHARD_URLS=f"a=sqlite:///{tmp_path / 'a.db'},b=sqlite:///{tmp_path / 'b.db'}",
+    )
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", __file__],
+        env=env, cwd=Path(__file__).resolve().parents[1], capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stdout[-4000:]
+    assert "3 passed" in result.stdout, result.stdout[-2000:]
@@ -0,0 +1,209 @@
+"""
+Statement-count regression tests.
+
+Each endpoint is pinned to the number of statements it runs (transaction
+control not counted), whatever the page size: a lazy load sneaking back into
+serialization, or an extra round trip in a mutation, fails here. The user's
+row comes from the user cache; most read endpoints run the ETag version
+check plus their query.
+"""
+
+import uuid
+
+import pytest
+
+from conftest import API
+
+
+@pytest.fixture
+def categories(client, auth):
+    return [
+        client.post(f"{API}/categories/", json={"name": f"C{i}", "type": "expense"}, headers=auth).json()
+        for i in range(5)
+    ]
+
+
+@pytest.fixture
+def spread(client, auth, categories):
+    """40 transactions over 5 categories and 2 months"""
+    created = []
+    for i in range(40):
+        response = client.post(
+            f"{API}/transactions",
+            json={
+                "amount": i + 1,
+                "date": f"2024-0{i % 2 + 1}-{i % 28 + 1:02d}",
+                "category_id": categories[i % 5]["id"],
+                "type": "expense",
+            },
+            headers=auth,
+        )
+        assert response.status_code == 201, response.text
+        created.append(response.json())
+    return created
+
+
+@pytest.mark.parametrize("limit", [1, 10, 100])
+def test_list_transactions(client, auth, spread, statements, limit):
+    with statements.expect(2):
+        response = client.get(f"{API}/transactions", params={"limit": limit}, headers=auth)
+    assert len(response.json()) == min(limit, 40)
+    assert {row["category"]["name"] for row in response.json()} <= {f"C{i}" for i in range(5)}
+
+
+def test_list_transactions_keyset_page(client, auth, spread, statements):
+    cursor = client.get(f"{API}/transactions", params={"limit": 10}, headers=auth).headers["X-Next-Cursor"]
+    with statements.expect(2):
+        response = client.get(f"{API}/transactions", params={"limit": 30, "cursor": cursor}, headers=auth)
+    assert len(response.json()) == 30
+
+
+@pytest.mark.parametrize("params", [{"category_id": 0}, {"type": "expense"}, {"start_date": "2024-02-01"}])
+def test_list_transactions_filtered(client, auth, categories, spread, statements, params):
+    if "category_id" in params:
+        params = {"category_id": categories[0]["id"]}
+    with statements.expect(2):
+        assert client.get(f"{API}/transactions", params=params, headers=auth).status_code == 200
+
+
+def test_read_transaction(client, auth, spread, statements):
+    with statements.expect(2):
+        response = client.get(f"{API}/transactions/{spread[0]['id']}", headers=auth)
+    assert response.json()["category"]["name"] == "C0"
+
+
+def test_export_transactions(client, auth, spread, statements):
+    # Streamed from one query; no ETag check
+    with statements.expect(1):
+        response = client.get(f"{API}/transactions/export", headers=auth)
+    assert len(response.text.splitlines()) == 41
+
+
+def test_list_categories(client, auth, categories, statements):
+    with statements.expect(2):
+        assert len(client.get(f"{API}/categories/", headers=auth).json()) == 5
+
+
+def test_read_category(client, auth, categories, statements):
+    with statements.expect(2):
+        assert client.get(f"{API}/categories/{categories[0]['id']}", headers=auth).status_code == 200
+
+
+# Mutations: ownership is checked by the UPDATE/DELETE itself (RETURNING),
+# then the rollup delta and the user's data_version are written
+
+def test_create_transaction(client, auth, categories, statements):
+    # Category ownership check, insert, rollup delta, data_version, reload
+    with statements.expect(5):
+        response = client.post(
+            f"{API}/transactions",
+            json={"amount": 5, "date": "2024-02-01", "category_id": categories[0]["id"], "type": "expense"},
+            headers=auth,
+        )
+    assert response.status_code == 201
+
+
+def test_update_transaction_description(client, auth, spread, statements):
+    # No rollup change
+    with statements.expect(2):
+        response = client.put(f"{API}/transactions/{spread[0]['id']}", json={"description": "x"}, headers=auth)
+    assert response.json()["description"] == "x"
+
+
+def test_update_transaction_amount(client, auth, spread, statements):
+    with statements.expect(4):
+        response = client.put(f"{API}/transactions/{spread[0]['id']}", json={"amount": 99}, headers=auth)
+    assert response.json()["amount"] == 99
+
+
+def test_update_transaction_category(client, auth, categories, spread, statements):
+    # The rollup moves from the old category's row to the new one's
+    with statements.expect(6):
+        response = client.put(
+            f"{API}/transactions/{spread[0]['id']}", json={"category_id": categories[1]["id"]}, headers=auth
+        )
+    assert response.json()["category"]["name"] == "C1"
+
+
+def test_update_missing_transaction(client, auth, spread, statements):
+    with statements.expect(1):
+        assert client.put(f"{API}/transactions/999999", json={"amount": 1}, headers=auth).status_code == 404
+
+
+def test_update_transaction_missing_category(client, auth, spread, statements):
+    # The read of the old values checks the category too
+    with statements.expect(1):
+        response = client.put(f"{API}/transactions/{spread[0]['id']}", json={"category_id": 999999}, headers=auth)
+    assert response.status_code == 400
+
+
+def test_delete_transaction(client, auth, spread, statements):
+    with statements.expect(4):
+        assert client.delete(f"{API}/transactions/{spread[0]['id']}", headers=auth).status_code == 200
+
+
+def test_delete_missing_transaction(client, auth, spread, statements):
+    with statements.expect(1):
+        assert client.delete(f"{API}/transactions/999999", headers=auth).status_code == 404
+
+
+def test_create_category(client, auth, statements):
+    # Insert, data_version, reload
+    with statements.expect(3):
+        assert client.post(f"{API}/categories/", json={"name": "N", "type": "expense"}, headers=auth).status_code == 201
+
+
+def test_update_category(client, auth, categories, statements):
+    with statements.expect(2):
+        response = client.put(f"{API}/categories/{categories[0]['id']}", json={"name": "x"}, headers=auth)
+    assert response.json()["name"] == "x"
+
+
+def test_delete_category(client, auth, categories, spread, statements):
+    # Its rollups, transactions and the category go in one DELETE each
+    with statements.expect(4):
+        assert client.delete(f"{API}/categories/{categories[0]['id']}", headers=auth).status_code == 200
+
+
+@pytest.fixture
+def intruder(client):
+    """Headers of another user"""
+    email = f"{uuid.uuid4().hex}@example.com"
+    client.post(f"{API}/auth/users", json={"email": email, "password": "pw"})
+    token = client.post(f"{API}/auth/token", data={"username": email, "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get(f"{API}/categories/", headers=headers)
+    return headers
+
+
+def test_update_other_users_transaction(client, intruder, spread, statements):
+    with statements.expect(1):
+        assert client.put(f"{API}/transactions/{spread[0]['id']}", json={"amount": 1}, headers=intruder).status_code == 404
+
+
+def test_delete_other_users_category(client, intruder, categories, spread, statements):
+    # The transactions DELETE matches nothing, so no rollups are touched
+    with statements.expect(2):
+        assert client.delete(f"{API}/categories/{categories[0]['id']}", headers=intruder).status_code == 404
+
+
+def test_update_transaction_other_users_category(client, auth, intruder, spread, statements):
+    foreign = client.post(f"{API}/categories/", json={"name": "Theirs", "type": "expense"}, headers=intruder).json()
+    # The ownership check fails before anything is written
+    with statements.expect(1):
+        response = client.put(f"{API}/transactions/{spread[0]['id']}", json={"category_id": foreign["id"]}, headers=auth)
+    assert response.status_code == 400
+    assert not [statement for statement, _ in statements.statements if statement.lstrip().upper().startswith("UPDATE")]
+    assert client.get(f"{API}/transactions/{spread[0]['id']}", headers=auth).json()["category"]["name"] == "C0"
+
+
+def test_create_transaction_other_users_category(client, auth, intruder, statements):
+    foreign = client.post(f"{API}/categories/", json={"name": "Theirs", "type": "expense"}, headers=intruder).json()
+    with statements.expect(1):
+        response = client.post(
+            f"{API}/transactions",
+            json={"amount": 5, "date": "2024-02-01", "category_id": foreign["id"], "type": "expense"},
+            headers=auth,
+        )
+    assert response.status_code == 400
+    assert client.get(f"{API}/transactions", headers=intruder).json() == []
@@ -0,0 +1,60 @@
+"""
+The authenticated-user cache must forget users whose row changes.
+"""
+
+import uuid
+
+import pytest
+
+from app.core.user_cache import user_cache
+from app.database import SessionLocal
+from app.models import User
+from conftest import API
+
+
+@pytest.fixture
+def user(client) -> tuple:
+    """(user id, Authorization headers) of a new user, cached by a first request"""
+    email = f"{uuid.uuid4().hex}@example.com"
+    user_id = client.post(f"{API}/auth/users", json={"email": email, "password": "pw"}).json()["id"]
+    token = client.post(f"{API}/auth/token", data={"username": email, "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get(f"{API}/categories/", headers=headers).status_code == 200
+    assert user_cache.get(user_id) is not None
+    return user_id, headers
+
+
+def update_user(user_id: int, **values):
+    with SessionLocal() as db:
+        db_user = db.get(User, user_id)
+        for name, value in values.items():
+            setattr(db_user, name, value)
+        db.commit()
+
+
+def test_deactivated_user_is_evicted(client, user):
+    user_id, headers = user
+    update_user(user_id, is_active=False)
+    assert user_cache.get(user_id) is None
+    # The token was issued while the user was active
+    assert client.get(f"{API}/categories/", headers=headers).status_code == 401
+    assert user_cache.get(user_id) is None
+
+
+def test_password_change_evicts_the_user(client, user):
+    user_id, headers = user
+    update_user(user_id, hashed_password="changed")
+    assert user_cache.get(user_id) is None
+    assert client.get(f"{API}/categories/", headers=headers).status_code == 200
+    assert user_cache.get(user_id) is not None
+
+
+def test_rolled_back_change_keeps_nothing_stale(client, user):
+    user_id, headers = user
+    with SessionLocal() as db:
+        db.get(User, user_id).is_active = False
+        db.flush()
+        # Evicted at the flush already, before the commit is known
+        assert user_cache.get(user_id) is None
+        db.rollback()
+    assert client.get(f"{API}/categories/", headers=headers).status_code == 200